@@ -0,0 +1,194 @@
+"""
+Бенчмарк TeacherDataHandler на синтетических данных.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_data_handler --teachers 50 --students 5000
+    python -m benchmarks.bench_data_handler --compare benchmarks/results/<предыдущий>.json
+
+Результаты (мс на операцию) сохраняются в json (по умолчанию benchmarks/results/), что позволяет
+отслеживать регрессии между версиями.
+"""
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import contextlib
+from pathlib import Path
+from datetime import datetime
+from benchmarks.dataset import build_dataset
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def measure(func, repeat: int) -> dict:
+    """Время выполнения func(i) для i in range(repeat), мс."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):  # обработчик печатает диагностику
+        for i in range(repeat):
+            start = time.perf_counter()
+            func(i)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "n": repeat,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "max_ms": round(max(timings), 4),
+    }
+
+
+def run_benchmarks(teachers_file, repeat: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    results = {}
+
+    # Загрузка
+    results["load"] = measure(lambda i: TeacherDataHandler(teachers_file), max(1, repeat // 10))
+    th = TeacherDataHandler(teachers_file)
+    teachers = th.get_teachers()
+    students = th.get_students_list()
+    ids_t = th.get_teachers_id()
+    ids_s = list(th.get_data_link_students().keys())
+    groups = th.get_groups()
+    statuses = list(th.get_statuses().keys())
+    text_keys = [key for key, status_type in th.get_status_types().items() if status_type.kind == "text"]
+    pick_t = [rnd.choice(teachers) for _ in range(repeat)]
+    pick_s = [rnd.choice(ids_s) for _ in range(repeat)]
+
+    def student_of(i):
+        id_s = pick_s[i]
+        return th.get_teacher_by_id(th.get_teacher_of_student(id_s)), th.get_student_name_by_id(id_s)
+
+    # Поиск
+    results["get_teachers"] = measure(lambda i: th.get_teachers(), repeat)
+    results["get_teachers_id"] = measure(lambda i: th.get_teachers_id(), repeat)
+    results["get_teacher_by_name"] = measure(lambda i: th.get_teacher_by_name(pick_t[i]), repeat)
+    results["get_teacher_by_id"] = measure(lambda i: th.get_teacher_by_id(rnd.choice(ids_t)), repeat)
+    results["get_teacher_students"] = measure(lambda i: th.get_teacher_students(pick_t[i]), repeat)
+    results["get_teacher_students_by_id"] = measure(lambda i: th.get_teacher_students_by_id(rnd.choice(ids_t)), repeat)
+    results["get_teacher_of_student"] = measure(lambda i: th.get_teacher_of_student(pick_s[i]), repeat)
+    results["get_student_id_by_name"] = measure(lambda i: th.get_student_id_by_name(rnd.choice(students)), repeat)
+    results["get_student_name_by_id"] = measure(lambda i: th.get_student_name_by_id(pick_s[i]), repeat)
+    results["get_student_data_by_id"] = measure(
+        lambda i: th.get_student_data_by_id(th.get_teacher_of_student(pick_s[i]), pick_s[i]), repeat)
+    results["get_student_data_by_name"] = measure(lambda i: th.get_student_data_by_name(*student_of(i)), repeat)
+    results["get_students_list"] = measure(lambda i: th.get_students_list(), repeat)
+    results["get_statuses"] = measure(lambda i: th.get_statuses(), repeat)
+    results["get_groups"] = measure(lambda i: th.get_groups(), repeat)
+    th.student_files.clear()
+    results["get_student_file_data_cold"] = measure(lambda i: th.get_student_file_data(*student_of(i)), repeat)
+    results["get_student_file_data_warm"] = measure(lambda i: th.get_student_file_data(*student_of(i)), repeat)
+
+    # Группы и полная выгрузка
+    results["get_student_for_group"] = measure(lambda i: th.get_student_for_group(groups[i % len(groups)]), repeat)
+    results["export_rows"] = measure(lambda i: sum(1 for _ in th.export_rows()), max(1, repeat // 10))
+
+    # Изменения
+    results["change_student_status"] = measure(
+        lambda i: th.change_student_status(*student_of(i), rnd.choice(text_keys), f"v{i}"), repeat)
+    mutations = max(1, repeat // 10)
+    new_teachers = [f"Бенчмарк{chr(0x430 + i % 32)}{i} Т.Т." for i in range(mutations)]
+    new_students = [{"name": f"Бенчмарков{chr(0x430 + i % 32)}{i} Студент Тестович", "group": groups[0]}
+                    for i in range(mutations)]
+    results["add_teacher"] = measure(lambda i: th.add_teacher(new_teachers[i]), mutations)
+    results["add_student"] = measure(lambda i: th.add_student(new_teachers[i], new_students[i]), mutations)
+    batch = [{"name": f"Пакетов{chr(0x430 + i % 32)}{i} Студент Тестович", "group": groups[0]} for i in range(mutations)]
+
+    def add_batch(i):
+        with th.transaction():
+            for student in batch:
+                th.add_student(new_teachers[i], student)
+
+    results["add_students_batch"] = measure(add_batch, 1)  # mutations студентов одной транзакцией
+    results["transfer_student"] = measure(
+        lambda i: th.transfer_student(new_students[i]["name"], new_teachers[(i + 1) % mutations], new_teachers[i]),
+        mutations)
+    results["duplicate_access"] = measure(
+        lambda i: th.duplicate_access(new_teachers[i], new_teachers[(i + 1) % mutations], new_students[i]["name"]),
+        mutations)
+    fuzzy_targets = [th.get_student_name_by_id(rnd.choice(ids_s)).split()[0] for _ in range(mutations)]
+    results["remove_student_by_name_fuzzy"] = measure(lambda i: th.remove_student_by_name(fuzzy_targets[i]), mutations)
+    results["remove_teacher"] = measure(lambda i: th.remove_teacher(new_teachers[i]), mutations)
+    results["add_status"] = measure(lambda i: th.add_status(f"bench_status_{i}", f"Статус {i}"), mutations)
+    results["delete_statuses"] = measure(lambda i: th.delete_statuses(statuses[i % len(statuses)]), 1)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: dict, previous_file) -> None:
+    """Вывод изменения медианы относительно предыдущего запуска."""
+    previous = json.loads(Path(previous_file).read_text(encoding="utf-8"))["results"]
+    print(f"\n{'операция':<32}{'было, мс':>12}{'стало, мс':>12}{'изм.':>10}")
+    for name, item in results.items():
+        if name not in previous:
+            continue
+        before, after = previous[name]["median_ms"], item["median_ms"]
+        ratio = f"{after / before:.2f}x" if before else "-"
+        print(f"{name:<32}{before:>12.4f}{after:>12.4f}{ratio:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк TeacherDataHandler")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=12)
+    parser.add_argument("--statuses", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200, help="повторов для каждой операции")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (json)")
+    parser.add_argument("--compare", help="предыдущий файл результатов для сравнения")
+    parser.add_argument("--keep", action="store_true", help="не удалять сгенерированные данные")
+    args = parser.parse_args(argv)
+
+    params = {"teachers": args.teachers, "students": args.students, "groups": args.groups,
+              "statuses": args.statuses, "seed": args.seed}
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_bench_"))
+    try:
+        start = time.perf_counter()
+        teachers_file = build_dataset(work_dir, **params)
+        print(f"Данные созданы за {time.perf_counter() - start:.2f} с: {work_dir}")
+        results = run_benchmarks(teachers_file, args.repeat, args.seed)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, item in results.items():
+        print(f"{name:<32} median {item['median_ms']:>10.4f} мс  (n={item['n']})")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {**params, "repeat": args.repeat},
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"data_handler_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Результаты сохранены: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Сравнение памяти: вложенные словари (текущее представление TeacherDataHandler) и компактная
+модель models.Dataset (__slots__, интернированные строки, коды статусов).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_memory --teachers 50 --students 20000
+"""
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from benchmarks.dataset import build_dataset
+from benchmarks.bench_data_handler import RESULTS_DIR, git_revision
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.models import Dataset, StudentRecord
+
+
+def load_dicts(teachers_file):
+    """Текущее представление: teachers.json и все файлы статусов как словари."""
+    data = TeacherDataHandler.load(teachers_file)
+    data_dir = Path(teachers_file).parent
+    files = {item["file"]: TeacherDataHandler.load(data_dir / item["file"])
+             for students in data["teachers"].values() for item in students.values()}
+    return data, files
+
+
+def traced(build):
+    """Память (байт), удерживаемая результатом build(), и время построения (мс)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = (time.perf_counter() - start) * 1000
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def run_benchmarks(teachers_file) -> dict:
+    (data, files), dict_bytes, dict_ms = traced(lambda: load_dicts(teachers_file))
+    del data, files
+    model, model_bytes, model_ms = traced(lambda: Dataset.from_json(*load_dicts(teachers_file)))
+
+    # Проверка обратного преобразования в формат json
+    data, files = load_dicts(teachers_file)
+    assert model.to_json() == (data, files), "модель не совпадает с исходными данными"
+    # Неизвестные ключи записи студента и структуры сохраняются
+    item = {"file": "student.json", "group": "G1", "work": "", "supervisor": "Иванов И.И."}
+    assert StudentRecord.from_json(item).to_json() == item, "потеряны ключи записи студента"
+    data["comment"] = "дополнительный раздел"
+    assert Dataset.from_json(data).to_json()[0] == data, "потеряны разделы структуры"
+    return {
+        "students": len(files),
+        "dicts": {"bytes": dict_bytes, "build_ms": round(dict_ms, 3)},
+        "model": {"bytes": model_bytes, "build_ms": round(model_ms, 3)},
+        "ratio": round(dict_bytes / model_bytes, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память: словари и компактная модель")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--groups", type=int, default=12)
+    parser.add_argument("--statuses", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (json)")
+    args = parser.parse_args(argv)
+
+    params = {"teachers": args.teachers, "students": args.students, "groups": args.groups,
+              "statuses": args.statuses, "seed": args.seed}
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_memory_"))
+    try:
+        teachers_file = build_dataset(work_dir, **params)
+        # Заполняем значения статусов, чтобы сравнение учитывало повторяющиеся даты
+        th = TeacherDataHandler(teachers_file)
+        keys = list(th.get_statuses())
+        ids_s = list(th.get_data_link_students())
+        th.set_statuses({id_s: {key: f"{(id_s + i) % 28 + 1:02}.05.25" for i, key in enumerate(keys)}
+                         for id_s in ids_s})
+        results = run_benchmarks(teachers_file)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name in ("dicts", "model"):
+        item = results[name]
+        print(f"{name:<8} {item['bytes'] / 2 ** 20:>10.2f} МиБ  построение {item['build_ms']:>10.1f} мс")
+    print(f"Студентов: {results['students']}, экономия памяти: {results['ratio']}x")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"memory_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Результаты сохранены: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Бенчмарк запуска TeacherDataHandler: загрузка из json (структура и все файлы статусов)
+против загрузки бинарного снимка.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup --teachers 50 --students 5000
+
+Замеры выполняются с прогретым кэшем файловой системы ОС, поэтому показывают стоимость
+разбора данных, а не чтения с диска.
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from benchmarks.dataset import build_dataset
+from benchmarks.bench_data_handler import RESULTS_DIR, measure, git_revision
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+
+
+def json_startup(teachers_file):
+    th = TeacherDataHandler(teachers_file)
+    th.preload_student_files()
+    return th
+
+
+def run_benchmarks(teachers_file, repeat: int) -> dict:
+    snapshot_file = Path(teachers_file).with_suffix(".snapshot")
+    reference = json_startup(teachers_file)
+    reference.snapshot_file = snapshot_file
+    results = {"save_snapshot": measure(lambda i: reference.save_binary_snapshot(), repeat)}
+
+    results["json_structure"] = measure(lambda i: TeacherDataHandler(teachers_file), repeat)
+    results["json_full"] = measure(lambda i: json_startup(teachers_file), repeat)
+    results["snapshot_full"] = measure(lambda i: TeacherDataHandler(teachers_file, snapshot_file=snapshot_file), repeat)
+
+    # Проверка, что снимок дает те же данные
+    th = TeacherDataHandler(teachers_file, snapshot_file=snapshot_file)
+    assert th.snapshot_loaded, "снимок не загружен"
+    assert th.data == reference.data and th.data_links == reference.data_links
+    assert th.student_files == reference.student_files
+
+    data_dir = reference.get_data_dir()
+    json_bytes = Path(teachers_file).stat().st_size + sum((data_dir / name).stat().st_size
+                                                          for name in reference.student_files)
+    sizes = {"json_bytes": json_bytes, "snapshot_bytes": snapshot_file.stat().st_size,
+             "files": len(reference.student_files) + 1}
+    return results, sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска: json и бинарный снимок")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=12)
+    parser.add_argument("--statuses", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=10, help="повторов для каждого варианта")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл результатов (json)")
+    args = parser.parse_args(argv)
+
+    params = {"teachers": args.teachers, "students": args.students, "groups": args.groups,
+              "statuses": args.statuses, "seed": args.seed}
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_startup_"))
+    try:
+        teachers_file = build_dataset(work_dir, **params)
+        results, sizes = run_benchmarks(teachers_file, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, item in results.items():
+        print(f"{name:<20} median {item['median_ms']:>10.3f} мс  (n={item['n']})")
+    print(f"Файлов json: {sizes['files']}, {sizes['json_bytes']} байт; снимок: {sizes['snapshot_bytes']} байт")
+    speedup = results["json_full"]["median_ms"] / results["snapshot_full"]["median_ms"]
+    print(f"Ускорение запуска: {speedup:.1f}x")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {**params, "repeat": args.repeat},
+        },
+        "sizes": sizes,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Результаты сохранены: {output}")
+
+
+if __name__ == "__main__":
+    main()
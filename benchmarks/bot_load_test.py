@@ -0,0 +1,138 @@
+"""
+Нагрузочный тест диалогов бота без обращения к Telegram.
+
+Дерево ConversationHandler из create_bot_app получает синтетические Update/CallbackQuery,
+а заглушка StubBot записывает вызовы edit_message_text/reply_text. N "преподавателей"
+одновременно проходят сценарий: /start -> выбор преподавателя -> выбор студента ->
+изменение статуса. По каждому переходу выводятся p50/p99 задержки, а также количество
+изменений меню, пропущенных без обращения к Bot API.
+
+Запуск из корня проекта:
+    python -m benchmarks.bot_load_test --users 50 --rounds 5 --latency 0.02
+"""
+import os
+import json
+import time
+import asyncio
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from collections import defaultdict
+from benchmarks.stub_bot import StubBot, make_message_update, make_callback_update
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def simulate_user(az_bot, app, user_id: int, id_t: int, rounds: int, timings, counter):
+    """Сценарий одного преподавателя."""
+    message_id = user_id * 1000
+
+    async def send(transition, payload):
+        counter[0] += 1
+        update = az_bot.Update.de_json(payload, app.bot)
+        start = time.perf_counter()
+        await app.process_update(update)
+        timings[transition].append((time.perf_counter() - start) * 1000)
+
+    await send("start", make_message_update(counter[0], user_id, message_id, "/start"))
+    await send("select_teacher", make_callback_update(counter[0], user_id, message_id, str(az_bot.SELECT_TEACHER)))
+    await send("teacher_selected", make_callback_update(counter[0], user_id, message_id, f"teacher_{id_t}"))
+    # "Снять все" без отметок - меню не изменилось, запрос к Bot API не отправляется
+    await send("bulk_start", make_callback_update(counter[0], user_id, message_id, str(az_bot.BULK_SELECT)))
+    await send("bulk_none", make_callback_update(counter[0], user_id, message_id, "bulk_none"))
+    await send("bulk_back", make_callback_update(counter[0], user_id, message_id, str(az_bot.TEACHER_IS_SET)))
+    ids_s = az_bot.tcr_handler.get_teacher_students_by_id(id_t)
+    # Значения-даты подходят статусам типов text и date (bool отклоняет их и запрашивает ввод повторно)
+    statuses = [key for key, status_type in az_bot.tcr_handler.get_status_types().items() if status_type.kind != "bool"]
+    for i in range(rounds):
+        id_s = ids_s[(user_id + i) % len(ids_s)]
+        await send("select_student_list",
+                   make_callback_update(counter[0], user_id, message_id, str(az_bot.TEACHERS_STUDENT_SELECT)))
+        await send("student_selected", make_callback_update(counter[0], user_id, message_id, f"student_{id_s}"))
+        await send("status_selected",
+                   make_callback_update(counter[0], user_id, message_id, f"status_{statuses[i % len(statuses)]}"))
+        await send("status_input", make_message_update(counter[0], user_id, message_id + i + 1, f"{i % 28 + 1}.05.25"))
+
+
+async def run(args, az_bot) -> dict:
+    bot = StubBot(latency=args.latency)
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+
+    # Пользователи - преподаватели со своими записями (роли только в памяти)
+    ids_t = [id_t for id_t in az_bot.tcr_handler.get_teachers_id() if az_bot.tcr_handler.get_teacher_students_by_id(id_t)]
+    users = {}
+    for i in range(args.users):
+        id_t = ids_t[i % len(ids_t)]
+        users[10_000 + i] = id_t
+        az_bot.access.roles[10_000 + i] = {"role": "teacher", "teacher": az_bot.tcr_handler.get_teacher_by_id(id_t)}
+    az_bot.access.rebuild()
+
+    timings = defaultdict(list)
+    counter = [1]
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate_user(az_bot, app, user_id, id_t, args.rounds, timings, counter)
+                           for user_id, id_t in users.items()))
+    elapsed = time.perf_counter() - start
+    await app.shutdown()
+
+    total = sum(len(values) for values in timings.values())
+    return {
+        "params": vars(args),
+        "elapsed_s": round(elapsed, 3),
+        "updates": total,
+        "updates_per_s": round(total / elapsed, 1),
+        "bot_calls": {endpoint: len(calls) for endpoint, calls in bot.calls.items()},
+        "menu": dict(az_bot.menu.stats),
+        "transitions": {
+            name: {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "mean_ms": round(statistics.fmean(values), 3),
+            } for name, values in timings.items()
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест диалогов бота")
+    parser.add_argument("--users", type=int, default=20, help="одновременных преподавателей")
+    parser.add_argument("--rounds", type=int, default=3, help="изменений статуса на пользователя")
+    parser.add_argument("--teachers", type=int, default=10)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="имитация задержки Bot API, сек.")
+    parser.add_argument("--output", help="файл результатов (json)")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bot_load_"))
+    # Бот использует временный каталог данных и пишет лог только в консоль. Конфигурация
+    # читается при первом импорте, поэтому модули проекта импортируются после настройки окружения.
+    os.environ.update({"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+                       "LOG_FILE": "", "LOG_LEVEL": "WARNING", "ADMIN_IDS": ""})
+    from benchmarks.dataset import build_dataset
+    try:
+        build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot import az_bot
+        report = asyncio.run(run(args, az_bot))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Обновлений: {report['updates']} за {report['elapsed_s']} с ({report['updates_per_s']}/с)")
+    print(f"Вызовы Bot API: {report['bot_calls']}")
+    print(f"Изменения меню: {report['menu']}")
+    print(f"{'переход':<22}{'n':>6}{'p50, мс':>10}{'p99, мс':>10}")
+    for name, item in report["transitions"].items():
+        print(f"{name:<22}{item['n']:>6}{item['p50_ms']:>10.3f}{item['p99_ms']:>10.3f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Проверка очереди рассылок (OutboundDispatcher) на заглушке StubBot: рассылка достигает
+заданной частоты, не превышая ее, а при RetryAfter приостанавливается и доставляет все сообщения.
+BadRequest (например, "chat not found") не повторяется, сетевые ошибки повторяются с задержкой.
+
+Запуск из корня проекта:
+    python -m benchmarks.broadcast_check --chats 300 --rate 100 --latency 0.02 --flood-every 120
+"""
+import time
+import asyncio
+import argparse
+from telegram.error import BadRequest, TimedOut
+from benchmarks.stub_bot import StubBot
+from benchmarks.reminder_check import max_per_window
+from src.status_control_bot.dispatcher import OutboundDispatcher
+from src.status_control_bot.rate_limiter import TokenBucket
+
+
+async def run(args) -> dict:
+    bot = StubBot(latency=args.latency, flood_every=args.flood_every, retry_after=1)
+    await bot.initialize()
+    bucket = TokenBucket(rate=args.rate)
+    dispatcher = OutboundDispatcher(bucket, concurrency=args.concurrency, progress_interval=0.5)
+    worker = asyncio.create_task(dispatcher.run(bot.send_message))
+
+    progress = []
+
+    async def on_progress(item):
+        progress.append((item.processed, item.total))
+
+    start = time.monotonic()
+    broadcast = dispatcher.submit(range(1, args.chats + 1), "Объявление", on_progress=on_progress)
+    await broadcast.done.wait()
+    elapsed = time.monotonic() - start
+    worker.cancel()
+    await bot.shutdown()
+
+    times = [moment for moment, _ in bot.calls["sendMessage"]]
+    return {
+        "sent": broadcast.sent,
+        "failed": broadcast.failed,
+        "floods": bot.count("flood"),
+        "elapsed_s": elapsed,
+        "rate": broadcast.sent / elapsed,
+        "peak_per_s": max_per_window(times),
+        "progress_reports": len(progress),
+        "capacity": bucket.capacity,
+    }
+
+
+async def check_errors() -> dict:
+    """BadRequest - сразу ошибка доставки, TimedOut - повтор; задержки повторов только записываются."""
+    attempts, delays = {}, []
+
+    async def send(chat_id, text):
+        attempts[chat_id] = attempts.get(chat_id, 0) + 1
+        if chat_id == 1:
+            raise BadRequest("Chat not found")
+        if chat_id == 2 and attempts[chat_id] < 3:
+            raise TimedOut()
+
+    async def sleep(seconds):
+        delays.append(seconds)
+
+    dispatcher = OutboundDispatcher(TokenBucket(rate=1000), chat_rate=1000, sleep=sleep)
+    dispatcher.send = send
+    results = [await dispatcher.deliver(chat_id, "Объявление") for chat_id in (1, 2)]
+    return {"results": results, "attempts": attempts, "delays": delays}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка частоты рассылки на заглушке бота")
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=100.0, help="сообщений в секунду")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="имитация задержки Bot API, сек.")
+    parser.add_argument("--flood-every", type=int, default=0, help="RetryAfter на каждый N-й запрос")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(f"Отправлено {report['sent']}/{args.chats}, ошибок {report['failed']}, RetryAfter: {report['floods']}")
+    print(f"Время {report['elapsed_s']:.2f} с, средняя частота {report['rate']:.1f}/с, "
+          f"пик за 1 с: {report['peak_per_s']} (лимит {args.rate:g}/с, запас {report['capacity']:g})")
+    print(f"Отчетов о ходе рассылки: {report['progress_reports']}")
+    assert report["sent"] == args.chats, "доставлены не все сообщения"
+    assert report["peak_per_s"] <= args.rate + report["capacity"], "превышен лимит отправки"
+    if not args.flood_every:
+        assert report["rate"] >= 0.8 * args.rate or report["elapsed_s"] < 1.5, "частота ниже целевой"
+
+    errors = asyncio.run(check_errors())
+    assert errors["results"] == [False, True] and errors["attempts"] == {1: 1, 2: 3}, errors
+    print(f"BadRequest: без повторов; TimedOut: {errors['attempts'][2]} попытки, задержки {errors['delays']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Проверка согласованности каталога данных на синтетических данных:
+    - время проверки (один проход os.scandir) для каталога с большим количеством файлов;
+    - внесенные проблемы (удаленные файлы, лишние и временные файлы, дублированный доступ
+      к удаленному студенту и метка дубликата у исходной записи) находятся и исправляются,
+      повторная проверка проблем не находит;
+    - фоновая проверка (ConsistencyScanner) пропускает неизменившийся каталог;
+    - фоновое исправление переносит повторный лишний файл, не заменяя ранее перенесенный с тем же именем.
+
+Запуск из корня проекта:
+    python -m benchmarks.consistency_check --teachers 50 --students 50000
+"""
+import io
+import os
+import time
+import asyncio
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+from pathlib import Path
+from benchmarks.dataset import build_dataset
+
+
+def timed(func, repeat: int = 5) -> tuple[float, object]:
+    """Медиана времени func() (мс) и результат последнего вызова."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def damage(handler, count: int) -> dict:
+    """Внесение проблем, возвращает ожидаемое количество по видам."""
+    data_dir = handler.get_data_dir()
+    teachers = handler.get_teachers()
+    old = time.time() - 3600
+
+    # Отсутствующие файлы
+    students = [(teacher, name) for teacher in teachers[:count] for name in handler.get_teacher_students(teacher)[:1]]
+    for teacher, name in students:
+        (data_dir / handler.get_student_data_by_name(teacher, name)["file"]).unlink()
+    # Лишние и временные файлы (старые - проверяются, новый - пропускается как незавершенная запись)
+    for n in range(count):
+        path = data_dir / f"orphan__{n}.json"
+        path.write_text("{}")
+        os.utime(path, (old, old))
+    tmp = data_dir / "teachers.json.1234.tmp"
+    tmp.write_text("{")
+    os.utime(tmp, (old, old))
+    (data_dir / "orphan__recent.json").write_text("{}")
+
+    # Связи дублированного доступа: с удаленной записью, с самим владельцем и удаленного преподавателя
+    owner, guest, legacy = teachers[-1], teachers[-2], teachers[-3]
+    with contextlib.redirect_stdout(io.StringIO()):
+        name = handler.get_teacher_students(owner)[0]
+        assert handler.duplicate_access(guest, owner, name)
+        with handler.transaction() as tx:
+            record = tx.edit_teacher(owner).pop(name)  # удаление записи без удаления связей
+            tx.delete_file(record["file"])
+            own = handler.get_teacher_students(legacy)[0]
+            tx.share(legacy, own, legacy)
+            tx.share("Удаленный преподаватель", own, legacy)
+    return {"dangling": len(students), "orphans": count, "temp": 1, "duplicates": 3}
+
+async def check_background(handler):
+    from src.status_control_bot.consistency import ConsistencyScanner
+
+    scanner = ConsistencyScanner(handler, interval=0)
+    start = time.perf_counter()
+    await scanner.check()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    await scanner.check()
+    skipped = time.perf_counter() - start
+    student = next(iter(handler.get_data_link_students()))
+    handler.set_statuses({student: {next(iter(handler.get_statuses())): "x"}})
+    start = time.perf_counter()
+    await scanner.check()
+    changed = time.perf_counter() - start
+    print(f"Фоновая проверка: первая {first * 1000:.0f} мс, без изменений {skipped * 1000:.2f} мс, "
+          f"после записи файла {changed * 1000:.0f} мс")
+
+
+async def check_repair(handler):
+    from src.status_control_bot.consistency import ConsistencyScanner, QUARANTINE_DIR
+
+    data_dir = handler.get_data_dir()
+    path = data_dir / "orphan__0.json"  # то же имя, что у перенесенного ранее файла
+    path.write_text('{"copy": "2"}')
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    scanner = ConsistencyScanner(handler, interval=0, repair=True)
+    report = await scanner.check(force=True)
+    assert report["orphans"] == [path.name] and not path.exists(), report
+    quarantine = data_dir / QUARANTINE_DIR
+    assert (quarantine / "orphan__0.json").read_text() == "{}", "ранее перенесенный файл заменен"
+    assert (quarantine / "orphan__0.1.json").read_text() == '{"copy": "2"}'
+    print("Фоновое исправление: повторный лишний файл перенесен как orphan__0.1.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка согласованности каталога данных")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--problems", type=int, default=20, help="внесенных проблем каждого вида")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_consistency_"))
+    os.environ.update({"DATA_DIR": str(work_dir), "LOG_FILE": "", "LOG_LEVEL": "CRITICAL"})
+    try:
+        start = time.perf_counter()
+        teachers_file = build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        print(f"Данные: {args.students} студентов за {time.perf_counter() - start:.1f} с")
+        from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+        from src.status_control_bot.consistency import scan_handler, repair, has_problems, QUARANTINE_DIR
+
+        handler = TeacherDataHandler(teachers_file)
+        elapsed, report = timed(lambda: scan_handler(handler))
+        assert not has_problems(report), report
+        print(f"Проверка {report['files']} файлов, {report['entries']} записей: {elapsed:.0f} мс")
+
+        expected = damage(handler, args.problems)
+        elapsed, report = timed(lambda: scan_handler(handler))
+        found = {key: len(report[key]) for key in expected}
+        print(f"Внесено {expected}, найдено {found} за {elapsed:.0f} мс (пропущено недавних: {report['recent']})")
+        assert report["recent"] == 1
+        assert found["dangling"] >= expected["dangling"] and found["duplicates"] == expected["duplicates"]
+        assert found["orphans"] == expected["orphans"] and found["temp"] == expected["temp"]
+
+        fixed = repair(handler, report)
+        report = scan_handler(handler)
+        quarantined = len(list((handler.get_data_dir() / QUARANTINE_DIR).iterdir()))
+        print(f"Исправлено {fixed}, перенесено в {QUARANTINE_DIR}: {quarantined}")
+        assert not has_problems(report), report
+        asyncio.run(check_background(handler))
+        asyncio.run(check_repair(handler))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
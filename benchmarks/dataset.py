@@ -0,0 +1,71 @@
+import random
+from pathlib import Path
+from src.status_control_bot.utils import make_json_from_parsing
+
+
+"""
+Генератор синтетических данных в формате входных файлов make_json_from_parsing:
+    raw_data.txt      - 'ФИО студента<TAB>группа<TAB>ФИО преподавателя'
+    raw_statuses.txt  - 'ключ<TAB>название статуса'
+Имена строятся из слогов по номеру, поэтому уникальны и дают уникальные имена файлов.
+"""
+
+SYLLABLES = ("ба", "ве", "го", "ду", "же", "зи", "ко", "ла", "ми", "но", "пу", "ре", "со", "ту", "фе",
+             "хо", "це", "ча", "шу", "ры", "ли", "мо", "да", "ки", "ро", "лу", "ти", "се", "ва")
+NAMES = ("Иван", "Мария", "Пётр", "Анна", "Олег", "Елена", "Юрий", "Ольга", "Денис", "Нина")
+PATRONYMICS = ("Иванович", "Петровна", "Сергеевич", "Андреевна", "Олегович", "Юрьевна")
+STATUS_TITLES = ("Готовность ВКР на 15.04.25", "Готовность ВКР на 01.05.25", "Готовность ВКР на 15.05.25",
+                 "Допуск к АП", "Дата проверки АП", "Допуск к НК", "Дата прохождения НК", "Дата сдачи ВКР в ЭБС")
+
+
+def make_surname(index: int, suffix: str = "ов") -> str:
+    """Уникальная фамилия по номеру (запись номера 'слогами')."""
+    parts = []
+    while True:
+        index, rest = divmod(index, len(SYLLABLES))
+        parts.append(SYLLABLES[rest])
+        if index == 0:
+            break
+    return ("".join(parts) + suffix).capitalize()
+
+
+def generate_raw_files(out_dir, teachers=10, students=300, groups=12, statuses=8, seed=0):
+    """
+    Создание raw_data.txt и raw_statuses.txt в каталоге out_dir.
+
+    Returns:
+        tuple: пути (raw_data, raw_statuses).
+    """
+    rnd = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    teacher_names = [f"{make_surname(i, 'ин')} {rnd.choice(NAMES)[0]}.{rnd.choice(NAMES)[0]}." for i in range(teachers)]
+    group_names = [f"ГР-{100 + i}" for i in range(groups)]
+
+    raw_data = out_dir / "raw_data.txt"
+    with open(raw_data, 'w', encoding='utf-8') as f:
+        for i in range(students):
+            student = f"{make_surname(i)} {rnd.choice(NAMES)} {rnd.choice(PATRONYMICS)}"
+            f.write(f"{student}\t{rnd.choice(group_names)}\t{teacher_names[i % teachers]}\n")
+
+    raw_statuses = out_dir / "raw_statuses.txt"
+    with open(raw_statuses, 'w', encoding='utf-8') as f:
+        for i in range(statuses):
+            title = STATUS_TITLES[i] if i < len(STATUS_TITLES) else f"Статус {i}"
+            f.write(f"st_{i}\t{title}\n")
+    return raw_data, raw_statuses
+
+
+def build_dataset(out_dir, **params):
+    """
+    Полный синтетический набор: исходные файлы и структура TeacherDataHandler (teachers.json и
+    файлы статусов) в out_dir/students.
+
+    Returns:
+        Path: путь к teachers.json.
+    """
+    raw_data, raw_statuses = generate_raw_files(Path(out_dir) / "parsing", **params)
+    students_dir = Path(out_dir) / "students"
+    make_json_from_parsing(raw_data, raw_statuses, output_dir=students_dir)
+    return students_dir / "teachers.json"
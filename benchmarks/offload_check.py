@@ -0,0 +1,254 @@
+"""
+Проверка выполнения пакетных заданий в пуле процессов на синтетических данных:
+    - отчет (CSV) и импорт с нечетким сопоставлением имен дают тот же результат, что и выполнение
+      в процессе бота;
+    - задержка цикла событий (максимальное опоздание таймера 10 мс) во время задания: в цикле
+      событий, в потоке и в пуле процессов;
+    - сопоставление имен по индексу совпадает с перебором всех студентов, в том числе для фамилии
+      без имени, фамилии с опечаткой и сокращенного ФИО;
+    - отмена задания после первой части: оставшиеся части не выполняются, отмененный импорт
+      не вносит изменений;
+    - изменение структуры во время импорта (id_s перенумерованы): значения записываются тем же
+      студентам, что и при импорте по текущим данным;
+    - сквозной сценарий через обработчики бота: "Просмотр всех" присылает CSV, "Назад" во время
+      формирования отменяет его.
+
+Запуск из корня проекта:
+    python -m benchmarks.offload_check --teachers 20 --students 2000 --rows 100 --workers 2
+"""
+import io
+import os
+import csv
+import time
+import random
+import asyncio
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from benchmarks.stub_bot import StubBot, make_message_update, make_callback_update
+
+
+async def measure_lag(job) -> tuple[float, object]:
+    """Выполнение job() с таймером 10 мс в том же цикле событий: (макс. опоздание таймера, результат)."""
+    lag = [0.0]
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag[0] = max(lag[0], time.perf_counter() - start - 0.01)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        result = await job()
+    finally:
+        done.set()
+        await task
+    return lag[0], result
+
+
+def make_import_csv(handler, rows: int, seed: int = 0) -> bytes:
+    """CSV импорта: половина имен с опечаткой в одной букве (нечеткое сопоставление)."""
+    rnd = random.Random(seed)
+    names = list(handler.get_data_link_students().values())
+    status_keys = list(handler.get_statuses())
+    stream = io.StringIO()
+    writer = csv.writer(stream, delimiter=";")
+    for n in range(rows):
+        name = rnd.choice(names)
+        if n % 2:
+            i = rnd.randrange(1, len(name.split()[0]))
+            name = name[:i] + ("а" if name[i] != "а" else "о") + name[i + 1:]
+        writer.writerow([name, rnd.choice(status_keys), f"{n % 28 + 1:02d}.04.25"])
+    return stream.getvalue().encode("utf-8")
+
+
+def check_resolver(handler, args):
+    from src.status_control_bot.importer import StudentResolver, RESOLVED, AMBIGUOUS, MISSING
+    from src.status_control_bot.az_teacher_data_handler import match_two_strings, clean_text
+
+    students = handler.get_data_link_students()
+    start = time.perf_counter()
+    resolver = StudentResolver(students)
+    print(f"Индекс имен: {len(resolver.units)} строк, построение {(time.perf_counter() - start) * 1000:.0f} мс")
+    rnd = random.Random(1)
+    queries = []
+    for id_s in rnd.sample(sorted(students), min(args.rows, len(students))):
+        words = students[id_s].split()
+        i = rnd.randrange(1, len(words[0]))
+        queries += [words[0], words[0][:i] + ("а" if words[0][i] != "а" else "о") + words[0][i + 1:],
+                    " ".join(words[:2]), words[0][:3]]
+    elapsed = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        kind, found = resolver.resolve(query)
+        elapsed += time.perf_counter() - start
+        # Перебор: те же правила, что и при сопоставлении по индексу
+        key = clean_text(query).lower()
+        exact = sorted(id_s for id_s, name in students.items() if clean_text(name).lower() == key)
+        matches = exact or sorted(id_s for id_s, name in students.items() if match_two_strings(query, name))
+        names = sorted({clean_text(students[id_s]).lower() for id_s in matches})
+        if kind == RESOLVED:
+            assert exact == sorted(found) or len(names) == 1 and sorted(found) == matches, f"'{query}': {found}"
+        elif kind == AMBIGUOUS:
+            assert not exact and len(names) > 1 and len(found) == len(names), f"'{query}': {found}"
+        else:
+            assert kind == MISSING and not matches, f"'{query}': не найдено, перебор - {matches}"
+    print(f"Сопоставление имен ({len(queries)} запросов: фамилия, с опечаткой, фамилия и имя, начало фамилии) "
+          f"совпадает с перебором, {elapsed / len(queries) * 1000:.2f} мс на запрос")
+
+
+async def check_jobs(handler, args):
+    from src.status_control_bot.offload import JobPool
+    from src.status_control_bot.reports import build_report, report_header, encode_rows
+    from src.status_control_bot.importer import import_csv, import_csv_stream, RESOLVE_CHUNK
+    from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+
+    expected = report_header(handler.get_statuses()) + encode_rows(list(handler.export_rows())[1:])
+    raw = make_import_csv(handler, args.rows)
+    expected_import = import_csv(handler, io.StringIO(raw.decode("utf-8"), newline=""), dry_run=True)
+
+    async def in_loop_report():
+        statuses = handler.get_statuses()
+        return report_header(statuses) + encode_rows(list(handler.export_rows())[1:])
+
+    async def in_loop_import():
+        return import_csv(handler, io.StringIO(raw.decode("utf-8"), newline=""), dry_run=True)
+
+    lag, data = await measure_lag(in_loop_report)
+    print(f"В цикле событий: отчет - задержка цикла {lag * 1000:.0f} мс", end="")
+    lag, _ = await measure_lag(in_loop_import)
+    print(f", импорт ({args.rows} строк) - {lag * 1000:.0f} мс")
+
+    for title, pool in (("потоки", JobPool(0)), (f"пул процессов ({args.workers})", JobPool(args.workers))):
+        # Первый вызов запускает процессы пула, замер - по второму
+        await build_report(handler, pool)
+        start = time.perf_counter()
+        lag, data = await measure_lag(lambda: build_report(handler, pool))
+        elapsed = time.perf_counter() - start
+        assert data == expected, "отчет из пула отличается от export_rows"
+        start = time.perf_counter()
+        import_lag, report = await measure_lag(lambda: import_csv_stream(handler, raw, pool, dry_run=True))
+        import_elapsed = time.perf_counter() - start
+        assert report == expected_import, "результат импорта отличается"
+        print(f"{title}: отчет {elapsed * 1000:.0f} мс (задержка цикла {lag * 1000:.0f} мс), "
+              f"импорт {import_elapsed * 1000:.0f} мс (задержка цикла {import_lag * 1000:.0f} мс)")
+
+        # Отмена после первой части (задача отменяет сама себя при первом сообщении о ходе выполнения).
+        # Частей больше, чем передается пулу одновременно, иначе отмена не влияет на их число
+        submitted = pool.submitted
+        chunk = max(1, len(handler.get_data_link_students()) // (4 * (pool.max_pending + 1)))
+        total = -(-len(handler.get_data_link_students()) // chunk)
+
+        async def on_progress(done, total):
+            asyncio.current_task().cancel()
+
+        job = asyncio.create_task(build_report(handler, pool, on_progress=on_progress, chunk=chunk))
+        try:
+            await job
+        except asyncio.CancelledError:
+            pass
+        assert job.cancelled(), "задание не отменено"
+        assert pool.submitted - submitted <= pool.max_pending + 1 < total, "отмена не остановила передачу частей"
+        print(f"  отмена после первой части: передано {pool.submitted - submitted} из {total} частей")
+
+        # Отмена импорта во время сопоставления имен: запись не начинается
+        before = list(handler.export_rows())
+        job = asyncio.create_task(import_csv_stream(handler, raw, pool, on_progress=on_progress))
+        try:
+            await job
+        except asyncio.CancelledError:
+            pass
+        assert job.cancelled() and list(handler.export_rows()) == before, "отмененный импорт внес изменения"
+        pool.close()
+
+    # Удаление первого студента во время сопоставления перенумеровывает id_s остальных
+    writes = []
+    set_statuses = TeacherDataHandler.set_statuses
+    TeacherDataHandler.set_statuses = lambda self, updates: writes.append(updates) or True
+    try:
+        async def remove_first(done, total):
+            if done == min(total, RESOLVE_CHUNK):
+                handler.remove_student_by_id(0)
+
+        pool = JobPool(args.workers)
+        await import_csv_stream(handler, raw, pool, on_progress=remove_first)
+        pool.close()
+        import_csv(handler, io.StringIO(raw.decode("utf-8"), newline=""))
+    finally:
+        TeacherDataHandler.set_statuses = set_statuses
+    assert len(writes) == 2 and writes[0] == writes[1], "импорт записал значения по устаревшим id_s"
+    print(f"Изменение структуры во время импорта: значения записаны {len(writes[0])} студентам по текущим id_s")
+    print(f"Импорт: строк {expected_import['rows']}, применено {expected_import['applied']}, "
+          f"неоднозначно {len(expected_import['ambiguous'])}, не найдено {len(expected_import['missing'])}")
+
+
+async def check_bot(az_bot):
+    bot = StubBot()
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+    await app.start()  # задания создаются через Application.create_task - как в работающем боте
+    user_id = 20_000
+    counter = [1]
+
+    async def send(payload):
+        counter[0] += 1
+        await app.process_update(az_bot.Update.de_json(payload, app.bot))
+
+    async def open_list(message_id):
+        await send(make_message_update(counter[0], user_id, message_id, "/start"))
+        menu_id = bot._stub_message_id  # последнее отправленное сообщение - начальное меню
+        await send(make_callback_update(counter[0], user_id, menu_id, str(az_bot.VIEW_ALL)))
+        await send(make_callback_update(counter[0], user_id, menu_id, str(az_bot.VIEW_LIST_STUDENTS)))
+        return menu_id, az_bot.background_jobs[user_id]
+
+    # Список формируется в фоне и присылается файлом
+    menu_id, task = await open_list(100)
+    await task
+    document = bot.calls["sendDocument"][-1][1]["document"]
+    rows = document.input_file_content.decode("utf-8-sig").splitlines()
+    assert len(rows) == len(az_bot.tcr_handler.get_data_link_students()) + 1, "в списке не все студенты"
+
+    # "Назад" во время формирования отменяет задание
+    sent = bot.count("sendDocument")
+    menu_id, task = await open_list(200)
+    await asyncio.sleep(0)  # задание начато
+    await send(make_callback_update(counter[0], user_id, menu_id, str(az_bot.END)))
+    await asyncio.sleep(0.5)
+    assert task.cancelled() and bot.count("sendDocument") == sent, "формирование списка не отменено"
+    await app.stop()
+    await az_bot.post_shutdown(app)
+    await app.shutdown()
+    print(f"Бот: список студентов ({len(rows) - 1}) отправлен файлом, 'Назад' отменяет формирование; "
+          f"вызовы Bot API {dict((key, len(value)) for key, value in bot.calls.items())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка пакетных заданий в пуле процессов")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=100, help="строк CSV импорта (половина - с опечаткой)")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_offload_"))
+    # Конфигурация читается при первом импорте, поэтому модули бота импортируются после настройки окружения
+    os.environ.update({"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+                       "LOG_FILE": "", "LOG_LEVEL": "WARNING", "ADMIN_IDS": "20000", "SNAPSHOT_FILE": "",
+                       "POOL_WORKERS": str(args.workers)})
+    from benchmarks.dataset import build_dataset
+    try:
+        build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot import az_bot
+        check_resolver(az_bot.tcr_handler, args)
+        asyncio.run(check_jobs(az_bot.tcr_handler, args))
+        asyncio.run(check_bot(az_bot))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Проверка выборки студентов (TeacherDataHandler.query_students) на синтетических данных:
+    - результаты случайных запросов (преподаватели, группы, условия на статусы, сортировка, страницы)
+      совпадают с полным перебором;
+    - первая страница запроса по индексам в сравнении с перебором всех студентов;
+    - индексы обновляются после записи значений без перестройки;
+    - сквозной сценарий бота: меню фильтра -> условие -> сортировка -> страницы результатов;
+      страницы выбора преподавателя, условие на значение enum с длинными кириллическими ключом и кодами,
+      callback_data всех кнопок не длиннее 64 байт.
+
+Запуск из корня проекта:
+    python -m benchmarks.query_check --teachers 50 --students 10000
+"""
+import io
+import os
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from datetime import date, timedelta
+from benchmarks.stub_bot import StubBot, make_message_update, make_callback_update
+
+
+def naive_query(handler, query) -> list:
+    """Полный перебор: чтение записей и значений всех студентов и сортировка."""
+    from src.status_control_bot.student_query import EMPTY, FILLED, EQUALS, BEFORE, SINCE, SORT_NAME, SORT_GROUP, \
+        SORT_TEACHER
+
+    types = handler.get_status_types()
+    data_dir = handler.get_data_dir()
+    rows = []
+    for id_s, name in handler.get_data_link_students().items():
+        id_t = handler.get_teacher_of_student(id_s)
+        data_s = handler.get_student_data_by_id(id_t, id_s)
+        if data_s is None:
+            continue
+        if query.teachers is not None and not query.teachers & set(handler.get_student_teachers(id_s)):
+            continue
+        if query.groups is not None and data_s["group"] not in query.groups:
+            continue
+        data_f = handler.load_student_file(data_dir / data_s["file"]) or {}
+        ok = True
+        for condition in query.conditions:
+            status_type = types[condition.key]
+            value = data_f.get(condition.key, "")
+            if condition.op == EMPTY:
+                ok = not value
+            elif condition.op == FILLED:
+                ok = bool(value)
+            elif condition.op == EQUALS:
+                ok = status_type.normalize(value) == status_type.parse(condition.value)
+            else:
+                day = status_type.date_of(value)
+                ok = day is not None and (day < condition.value if condition.op == BEFORE else day >= condition.value)
+            if not ok:
+                break
+        if ok:
+            rows.append((id_s, name, data_s["group"], id_t, data_f))
+    if query.sort == SORT_NAME:
+        rows.sort(key=lambda row: (row[1], row[0]), reverse=query.descending)
+    elif query.sort in (SORT_GROUP, SORT_TEACHER):
+        column = 2 if query.sort == SORT_GROUP else 3
+        rows.sort(key=lambda row: (row[column], row[1], row[0]), reverse=query.descending)
+    else:
+        status_type = types[query.sort]
+        if status_type.kind == "date":
+            dated = sorted(((status_type.date_of(row[4].get(query.sort)), row[0]) for row in rows
+                            if status_type.date_of(row[4].get(query.sort)) is not None), reverse=query.descending)
+            dated_ids = {id_s for _, id_s in dated}
+            rest = sorted((row for row in rows if row[0] not in dated_ids), key=lambda row: (row[1], row[0]))
+            ids = [id_s for _, id_s in dated] + [row[0] for row in rest]
+            return ids[query.offset:None if query.limit is None else query.offset + query.limit]
+        keyed = sorted(rows, key=lambda row: (not row[4].get(query.sort), status_type.normalize(
+            row[4].get(query.sort, "")) or "", row[1], row[0]))
+        filled = [row[0] for row in keyed if row[4].get(query.sort)]
+        empty = [row[0] for row in keyed if not row[4].get(query.sort)]
+        ids = [*reversed(filled), *empty] if query.descending else [*filled, *empty]
+        return ids[query.offset:None if query.limit is None else query.offset + query.limit]
+    ids = [row[0] for row in rows]
+    return ids[query.offset:None if query.limit is None else query.offset + query.limit]
+
+
+def random_query(handler, rnd):
+    from src.status_control_bot.student_query import StudentQuery, Condition, EMPTY, FILLED, EQUALS, BEFORE, SINCE, \
+        SORT_NAME, SORT_GROUP, SORT_TEACHER
+
+    types = handler.get_status_types()
+    query = StudentQuery(sort=rnd.choice([SORT_NAME, SORT_GROUP, SORT_TEACHER, *types]),
+                         descending=rnd.random() < 0.3, offset=rnd.choice([0, 0, 5, 40]),
+                         limit=rnd.choice([None, 10, 25]))
+    if rnd.random() < 0.4:
+        query.teachers = set(rnd.sample(handler.get_teachers_id(), rnd.randint(1, 3)))
+    if rnd.random() < 0.4:
+        query.groups = set(rnd.sample(handler.get_groups(), rnd.randint(1, 2)))
+    for _ in range(rnd.randint(0, 2)):
+        key = rnd.choice(list(types))
+        kind = types[key].kind
+        if kind == "date" and rnd.random() < 0.6:
+            query.conditions.append(Condition(key, rnd.choice([BEFORE, SINCE]),
+                                              date(2025, 3, 1) + timedelta(days=rnd.randrange(120))))
+        elif kind == "bool" and rnd.random() < 0.6:
+            query.conditions.append(Condition(key, EQUALS, rnd.choice(["да", "нет"])))
+        elif kind == "text" and rnd.random() < 0.3:
+            query.conditions.append(Condition(key, EQUALS, "готово"))
+        else:
+            query.conditions.append(Condition(key, rnd.choice([EMPTY, FILLED])))
+    return query
+
+
+def fill_values(handler, rnd):
+    types = handler.get_status_types()
+    updates = {}
+    for id_s in handler.get_data_link_students():
+        values = {}
+        for key, status_type in types.items():
+            if rnd.random() < 0.4:
+                continue
+            if status_type.kind == "date":
+                values[key] = (date(2025, 3, 1) + timedelta(days=rnd.randrange(120))).strftime("%d.%m.%y")
+            elif status_type.kind == "bool":
+                values[key] = rnd.choice(["да", "нет"])
+            else:
+                values[key] = rnd.choice(["готово", "в работе", "нет"])
+        updates[id_s] = values
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler.set_statuses(updates)
+
+
+def check_queries(handler, args):
+    from src.status_control_bot.student_query import StudentQuery, Condition, EMPTY, SORT_GROUP
+
+    rnd = random.Random(0)
+    fill_values(handler, rnd)
+    for n in range(args.queries):
+        query = random_query(handler, rnd)
+        found, expected = list(handler.query_students(query)), naive_query(handler, query)
+        assert found == expected, (n, query, found[:5], expected[:5])
+    print(f"Случайные запросы: {args.queries} совпадают с полным перебором")
+
+    # "Студенты преподавателя с незаполненной датой сдачи, по группам" - первая страница
+    key = next(key for key, status_type in handler.get_status_types().items() if status_type.kind == "date")
+    id_t = handler.get_teachers_id()[0]
+    query = StudentQuery(teachers={id_t}, conditions=[Condition(key, EMPTY)], sort=SORT_GROUP, limit=20)
+    engine = handler.student_query
+    engine.links = engine.value_index.key = handler.date_index.key = None  # индексы строятся заново
+    start = time.perf_counter()
+    list(handler.query_students(query))
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(20):
+        page = list(handler.query_students(query))
+    indexed = (time.perf_counter() - start) / 20
+    start = time.perf_counter()
+    expected = naive_query(handler, query)
+    naive = time.perf_counter() - start
+    assert page == expected, (page, expected)
+    everyone = StudentQuery(conditions=[Condition(key, EMPTY)], sort=SORT_GROUP, limit=20)
+    start = time.perf_counter()
+    for _ in range(20):
+        first = list(handler.query_students(everyone))
+    lazy = (time.perf_counter() - start) / 20
+    assert first == naive_query(handler, everyone)
+    print(f"Преподаватель + пустая дата, по группам: индексы {indexed * 1000:.2f} мс, перебор {naive * 1000:.0f} мс "
+          f"(построение индексов {build * 1000:.0f} мс); все преподаватели, первая страница {lazy * 1000:.2f} мс")
+
+    # Запись значений - индексы обновляются по журналу без перестройки
+    rebuilds = [0]
+    index = handler.student_query.value_index
+    rebuild = index.rebuild
+
+    def counting():
+        rebuilds[0] += 1
+        rebuild()
+
+    index.rebuild = counting
+    changed = page[:5]
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler.set_statuses({id_s: {key: "01.06.25"} for id_s in changed})
+    page = list(handler.query_students(query))
+    assert not set(changed) & set(page) and page == naive_query(handler, query)
+    assert rebuilds[0] == 0, "индекс перестроен"
+    del index.rebuild
+    print(f"После записи {len(changed)} значений результаты обновлены без перестройки индексов")
+
+
+def callback_data(sent) -> list:
+    markup = sent.get("reply_markup")
+    if markup is None:
+        return []
+    markup = markup.to_dict() if hasattr(markup, "to_dict") else markup
+    return [button["callback_data"] for row in markup["inline_keyboard"] for button in row if "callback_data" in button]
+
+
+async def check_bot(az_bot):
+    bot = StubBot()
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+    handler = az_bot.tcr_handler
+    user_id = 10_000
+    az_bot.access.roles[user_id] = {"role": "admin"}
+    az_bot.access.rebuild()
+    key = next(key for key, status_type in handler.get_status_types().items() if status_type.kind == "date")
+    # Статус с длинными кириллическими ключом и кодами значений (2 байта на символ в callback_data)
+    long_key = "дата_представления_выпускной_квалификационной_работы"
+    options = {f"вариант_согласования_номер_{i}_с_руководителем": f"Вариант {i}" for i in range(3)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert handler.add_status(long_key, "Согласование ВКР")
+        assert handler.set_status_type(long_key, "enum", options)
+    counter = [0]
+
+    async def callback(data):
+        counter[0] += 1
+        await app.process_update(az_bot.Update.de_json(make_callback_update(counter[0], user_id, 5001, data), app.bot))
+        sent = bot.calls["editMessageText"][-1][1]
+        assert all(len(item.encode()) <= 64 for item in callback_data(sent)), callback_data(sent)
+        return sent
+
+    await app.process_update(az_bot.Update.de_json(make_message_update(0, user_id, 5000, "/start"), app.bot))
+    await callback(str(az_bot.VIEW_ALL))
+    sent = await callback(str(az_bot.VIEW_FILTER))
+    assert "Фильтр" in sent["text"], sent["text"]
+
+    # Преподаватели - страницами, выбор на последней странице
+    teachers = handler.get_teachers_id()
+    pages = -(-len(teachers) // az_bot.FILTER_OPTIONS_PAGE_SIZE)
+    sent = await callback("filterby_teacher")
+    assert len(callback_data(sent)) <= az_bot.FILTER_OPTIONS_PAGE_SIZE + 3, len(callback_data(sent))
+    sent = await callback(f"filterby_teacher:{pages - 1}")
+    assert f"filterset:teacher:{teachers[-1]}" in callback_data(sent), callback_data(sent)
+    sent = await callback(f"filterset:teacher:{teachers[-1]}")
+    assert handler.get_teacher_by_id(teachers[-1]) in sent["text"], sent["text"]
+    await callback("filterset:teacher:")
+
+    # Условие "равно" для enum с длинными кодами
+    statuses = list(handler.get_statuses())
+    await callback("filterby_status")
+    sent = await callback(f"filterkey_{statuses.index(long_key)}")
+    choice = next(item for item in callback_data(sent) if item.startswith("filterset:status:") and ":eq:" in item)
+    sent = await callback(choice)
+    assert "Вариант 0" in sent["text"], sent["text"]
+    assert app.user_data[user_id][az_bot.FILTER]["status"] == (long_key, "eq", next(iter(options)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler.delete_statuses(long_key)
+
+    statuses = list(handler.get_statuses())
+    await callback("filterby_status")
+    await callback(f"filterkey_{statuses.index(key)}")
+    await callback(f"filterset:status:{statuses.index(key)}:empty")
+    sent = await callback("filterset:sort:group")
+    assert "группе" in sent["text"], sent["text"]
+    sent = await callback("filterpage_0")
+    from src.status_control_bot.student_query import StudentQuery, Condition, SORT_GROUP
+    expected = list(handler.query_students(StudentQuery(conditions=[Condition(key, "empty")], sort=SORT_GROUP,
+                                                        limit=az_bot.FILTER_PAGE_SIZE)))
+    assert all(handler.get_student_name_by_id(id_s) in sent["text"] for id_s in expected), sent["text"]
+    sent = await callback("filterpage_1")
+    second = list(handler.query_students(StudentQuery(conditions=[Condition(key, "empty")], sort=SORT_GROUP,
+                                                      offset=az_bot.FILTER_PAGE_SIZE, limit=az_bot.FILTER_PAGE_SIZE)))
+    assert all(handler.get_student_name_by_id(id_s) in sent["text"] for id_s in second), sent["text"]
+    await app.shutdown()
+    print(f"Бот: фильтр 'пустая дата', сортировка по группе, 2 страницы по {az_bot.FILTER_PAGE_SIZE}; "
+          f"вызовы Bot API {dict((name, len(value)) for name, value in bot.calls.items())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка выборки студентов")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200, help="случайных запросов для сравнения")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_query_"))
+    # Конфигурация читается при первом импорте, поэтому модули бота импортируются после настройки окружения
+    os.environ.update({"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+                       "LOG_FILE": "", "LOG_LEVEL": "WARNING", "ADMIN_IDS": "", "SNAPSHOT_FILE": ""})
+    from benchmarks.dataset import build_dataset
+    try:
+        build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot import az_bot
+        check_queries(az_bot.tcr_handler, args)
+        asyncio.run(check_bot(az_bot))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
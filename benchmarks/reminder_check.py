@@ -0,0 +1,108 @@
+"""
+Проверка планировщика напоминаний на синтетических данных с подменой часов (FakeClock):
+напоминания получают только преподаватели с просроченными пустыми статусами, частота отправки
+не превышает лимит TokenBucket, повтор отправляется не раньше заданного периода, длинная сводка
+укладывается в ограничение длины сообщения Telegram, студент с очищенным после заполнения
+значением снова попадает в напоминания.
+
+Запуск из корня проекта:
+    python -m benchmarks.reminder_check --teachers 20 --students 2000 --rate 5
+"""
+import time
+import asyncio
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from benchmarks.dataset import build_dataset
+from benchmarks.stub_bot import FakeClock
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.rate_limiter import TokenBucket
+from src.status_control_bot.reminders import ReminderScheduler, parse_deadline, MESSAGE_LIMIT
+
+
+def max_per_window(times: list[float], window: float = 1.0) -> int:
+    """Наибольшее число событий в скользящем окне window сек."""
+    best, left = 0, 0
+    for right, moment in enumerate(times):
+        while moment - times[left] >= window:
+            left += 1
+        best = max(best, right - left + 1)
+    return best
+
+
+async def run(teachers_file, args) -> None:
+    th = TeacherDataHandler(teachers_file)
+    clock = FakeClock(datetime(2025, 5, 10, 9, 0))
+    bucket = TokenBucket(rate=args.rate, clock=clock.monotonic, sleep=clock.sleep)
+    chats = {id_t: [100_000 + id_t * 10 + i for i in range(args.chats)] for id_t in th.get_teachers_id()}
+    sent = []  # [(время, chat_id)]
+    lengths = []
+
+    async def send(chat_id, text):
+        sent.append((clock.monotonic(), chat_id))
+        lengths.append(len(text))
+
+    scheduler = ReminderScheduler(th, lambda id_t: chats.get(id_t, []), send, bucket, repeat=86400, clock=clock.now)
+
+    # Половина преподавателей заполнила все просроченные статусы
+    today = clock.now().date()
+    overdue_keys = [key for key, title in th.get_statuses().items() if (d := parse_deadline(title)) and d < today]
+    done_teachers = set(th.get_teachers_id()[::2])
+    th.set_statuses({id_s: {key: "01.05.25" for key in overdue_keys} for id_s in th.get_data_link_students()
+                     if th.get_teacher_of_student(id_s) in done_teachers})
+    expected = sum(len(chats[id_t]) for id_t in th.get_teachers_id()
+                   if id_t not in done_teachers and th.get_teacher_students_by_id(id_t))
+
+    start = time.perf_counter()
+    first = await scheduler.tick()
+    elapsed = time.perf_counter() - start
+    peak = max_per_window([moment for moment, _ in sent])
+    print(f"Просроченных статусов: {len(overdue_keys)}, отправлено: {first} (ожидалось {expected}), "
+          f"за {elapsed * 1000:.1f} мс, модельное время {clock.monotonic():.1f} с")
+    print(f"Максимум сообщений за 1 с: {peak} (лимит {args.rate:g}/с, запас {bucket.capacity:g})")
+    assert first == expected, "неверное число напоминаний"
+    assert peak <= bucket.capacity + args.rate, "превышен лимит отправки"
+    print(f"Длина сводки: до {max(lengths, default=0)} символов (лимит {MESSAGE_LIMIT})")
+    assert max(lengths, default=0) <= MESSAGE_LIMIT, "сводка длиннее сообщения Telegram"
+
+    clock.advance(3600)
+    repeated = await scheduler.tick()
+    print(f"Через час: {repeated} (ожидалось 0)")
+    assert repeated == 0, "повтор раньше периода"
+
+    clock.advance(86400)
+    start = time.perf_counter()
+    again = await scheduler.tick()
+    print(f"Через сутки: {again} (ожидалось {expected}), проверка {(time.perf_counter() - start) * 1000:.1f} мс")
+    assert again == expected
+
+    # Очищенное значение: преподаватель, заполнивший статусы, снова получает напоминание
+    id_t = next(id_t for id_t in done_teachers if th.get_teacher_students_by_id(id_t))
+    id_s = th.get_teacher_students_by_id(id_t)[0]
+    th.set_statuses({id_s: {overdue_keys[0]: ""}})
+    clock.advance(86400)
+    cleared = await scheduler.tick()
+    print(f"После очистки значения: {cleared} (ожидалось {expected + len(chats[id_t])})")
+    assert cleared == expected + len(chats[id_t]), "очищенное значение не попало в напоминания"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка напоминаний с подменой часов")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=2, help="получателей на преподавателя")
+    parser.add_argument("--rate", type=float, default=5.0, help="сообщений в секунду")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_reminders_"))
+    try:
+        teachers_file = build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        asyncio.run(run(teachers_file, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
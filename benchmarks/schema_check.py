@@ -0,0 +1,140 @@
+"""
+Проверка изменения перечня статусов без перезаписи файлов студентов на синтетических данных:
+    - добавление и удаление статуса: время и количество записанных файлов (только teachers.json);
+    - новый статус читается пустым значением, удаленный не возвращается, при записи значения
+      удаленный ключ исчезает из файла;
+    - повторное добавление удаленного до уплотнения статуса не возвращает прежние значения, уплотнение
+      выполняется во внешней транзакции (учитывает ее записи и откатывается вместе с ней);
+    - фоновое уплотнение (StatusCompactor): перезаписываются только устаревшие файлы, задержка
+      цикла событий ограничена одним пакетом, после уплотнения все файлы соответствуют перечню.
+
+Запуск из корня проекта:
+    python -m benchmarks.schema_check --teachers 50 --students 10000 --batch 500
+"""
+import io
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from benchmarks.dataset import build_dataset
+from benchmarks.offload_check import measure_lag
+
+
+@contextlib.contextmanager
+def counting_writes(handler):
+    """Подсчет записей файлов через save_json: [файлов статусов, файлов структуры]."""
+    writes = [0, 0]
+    save_json = handler.save_json
+
+    def counting(json_path, data, mode='w'):
+        writes[Path(json_path) == Path(handler.current_file)] += 1
+        return save_json(json_path, data, mode)
+
+    handler.save_json = counting
+    try:
+        yield writes
+    finally:
+        del handler.save_json
+
+
+def disk_values(handler, id_s) -> dict:
+    name = handler.get_student_data_by_id(handler.get_teacher_of_student(id_s), id_s)["file"]
+    return json.loads((handler.get_data_dir() / name).read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка изменения перечня статусов")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=500, help="файлов в пакете уплотнения")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_schema_"))
+    os.environ.update({"DATA_DIR": str(work_dir), "LOG_FILE": "", "LOG_LEVEL": "CRITICAL"})
+    try:
+        teachers_file = build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+        from src.status_control_bot.schema_evolution import StatusCompactor, schema_state
+
+        handler = TeacherDataHandler(teachers_file)
+        handler.preload_student_files()
+        ids = list(handler.get_data_link_students())
+        first, second, third = ids[0], ids[1], ids[2]
+        old_key = next(iter(handler.get_statuses()))
+        handler.set_statuses({second: {old_key: "old-value"}, third: {old_key: "old-value"}})
+
+        # Добавление и удаление статуса - только запись структуры
+        with counting_writes(handler) as writes:
+            start = time.perf_counter()
+            assert handler.add_status("extra", "Дополнительный статус")
+            added = time.perf_counter() - start
+            start = time.perf_counter()
+            handler.delete_statuses(old_key)
+            dropped = time.perf_counter() - start
+        assert writes == [0, 2], writes
+        print(f"Добавление статуса для {len(ids)} студентов: {added * 1000:.1f} мс, удаление: {dropped * 1000:.1f} мс "
+              f"(записано файлов статусов: {writes[0]}, структуры: {writes[1]})")
+
+        _, data_f = handler.get_student_file_data(handler.get_teacher_by_id(handler.get_teacher_of_student(first)),
+                                                  handler.get_student_name_by_id(first))
+        assert data_f["extra"] == "" and old_key not in data_f and list(data_f) == list(handler.get_statuses())
+        assert old_key in disk_values(handler, first), "удаленный ключ удален из файла без записи"
+        assert handler.set_statuses({first: {"extra": "1"}}) == 1
+        on_disk = disk_values(handler, first)
+        assert on_disk["extra"] == "1" and old_key not in on_disk, on_disk
+        print("Чтение: новый статус пустой, удаленный скрыт; запись значения удаляет удаленный ключ из файла")
+
+        # Повторное добавление удаленного статуса в отмененной внешней транзакции: файлы и перечень прежние
+        before, state = disk_values(handler, second), schema_state(handler.data)
+        with contextlib.suppress(RuntimeError), contextlib.redirect_stdout(io.StringIO()):
+            with handler.transaction():
+                assert handler.add_status(old_key, "Статус снова")
+                raise RuntimeError("отмена")
+        assert disk_values(handler, second) == before and before[old_key] == "old-value", "уплотнение не откатилось"
+        assert schema_state(handler.data) == state and old_key not in handler.get_statuses()
+
+        # Повторное добавление удаленного статуса до уплотнения - уплотнение в той же транзакции,
+        # с учетом значений, записанных в ней ранее
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            with handler.transaction():
+                assert handler.set_statuses({second: {"extra": "2"}}) == 1
+                assert handler.add_status(old_key, "Статус снова")
+            readded = time.perf_counter() - start
+        values = handler.get_student_file_data(handler.get_teacher_by_id(handler.get_teacher_of_student(second)),
+                                               handler.get_student_name_by_id(second))[1]
+        assert values[old_key] == "", "вернулось значение удаленного статуса"
+        on_disk = disk_values(handler, second)
+        assert on_disk["extra"] == "2" and on_disk.get(old_key, "") == "", on_disk
+        assert disk_values(handler, third).get(old_key, "") == "", "значение удаленного статуса осталось в файле"
+        state = schema_state(handler.data)
+        assert state["compacted"] == state["version"] - 1, state
+        print(f"Повторное добавление удаленного статуса: уплотнение {readded * 1000:.0f} мс, прежние значения "
+              f"не вернулись")
+
+        # Фоновое уплотнение после добавления статуса
+        assert handler.add_status("extra2", "Еще один статус")
+        compactor = StatusCompactor(handler, interval=0, batch=args.batch)
+        handler.student_files.clear()  # как после перезапуска: файлы читаются в потоке
+        start = time.perf_counter()
+        lag, written = asyncio.run(measure_lag(compactor.check))
+        elapsed = time.perf_counter() - start
+        assert written == len(ids), written
+        assert not compactor.pending() and asyncio.run(compactor.check()) == 0
+        keys = set(handler.get_statuses())
+        stale = [name for name in handler.get_status_files()
+                 if set(json.loads((handler.get_data_dir() / name).read_text(encoding="utf-8"))) != keys]
+        assert not stale, stale[:5]
+        print(f"Уплотнение {written} файлов пакетами по {args.batch}: {elapsed:.1f} с, "
+              f"задержка цикла событий {lag * 1000:.0f} мс")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
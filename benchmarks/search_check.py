@@ -0,0 +1,136 @@
+"""
+Проверка inline-поиска студентов на синтетических данных:
+    - каждый студент находится по полному ФИО, по фамилии с опечаткой и по префиксу фамилии;
+    - постраничная выдача покрывает весь результат без повторов;
+    - время запроса по индексу (без кэша и из кэша) против перебора всех студентов;
+    - сквозной сценарий через дерево обработчиков бота: inline-запрос -> /student <id> (без /start)
+      -> изменение статуса из открытого меню.
+
+Запуск из корня проекта:
+    python -m benchmarks.search_check --teachers 20 --students 3000
+"""
+import os
+import time
+import random
+import asyncio
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from benchmarks.stub_bot import StubBot, make_message_update, make_callback_update
+
+
+def typo(word: str, rnd: random.Random) -> str:
+    """Замена одной буквы (кроме первой)."""
+    i = rnd.randrange(1, len(word))
+    return word[:i] + ("а" if word[i] != "а" else "о") + word[i + 1:]
+
+
+def check_index(handler, args):
+    from src.status_control_bot.search import StudentSearch
+    from src.status_control_bot.az_teacher_data_handler import match_two_strings
+
+    search = StudentSearch(handler)
+    start = time.perf_counter()
+    search.rebuild()
+    print(f"Индекс: {len(search.keys)} слов, построение {(time.perf_counter() - start) * 1000:.1f} мс")
+
+    rnd = random.Random(0)
+    students = handler.get_data_link_students()
+    sample = rnd.sample(sorted(students), min(args.queries, len(students)))
+    cold, warm, naive = [], [], []
+    for id_s in sample:
+        name = students[id_s]
+        surname = name.split()[0]
+        for query in (name, typo(surname, rnd), surname[:3]):
+            start = time.perf_counter()
+            ids = search.search(query)
+            cold.append(time.perf_counter() - start)
+            assert id_s in ids, f"'{query}': студент {name} не найден"
+            start = time.perf_counter()
+            assert search.search(query) is ids
+            warm.append(time.perf_counter() - start)
+        # Перебор всех студентов (как при выборе через списки преподавателей)
+        query = typo(surname, rnd)
+        start = time.perf_counter()
+        found = [item for item, item_name in students.items() if match_two_strings(query, item_name)]
+        naive.append(time.perf_counter() - start)
+        assert id_s in found
+
+    ids = search.search("")
+    pages, offset = [], "0"
+    while offset:
+        page, offset = search.page(ids, int(offset), 50)
+        pages.extend(page)
+    assert pages == list(ids) and len(set(pages)) == len(students), "пагинация потеряла результаты"
+
+    def ms(values):
+        return sum(values) / len(values) * 1000
+
+    print(f"Запрос: индекс {ms(cold):.3f} мс, кэш {ms(warm):.4f} мс, перебор {ms(naive):.1f} мс "
+          f"({len(sample)} студентов, ускорение x{ms(naive) / ms(cold):.0f})")
+
+
+async def check_bot(az_bot):
+    bot = StubBot()
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+    handler = az_bot.tcr_handler
+    id_t = next(id_t for id_t in handler.get_teachers_id() if handler.get_teacher_students_by_id(id_t))
+    user_id = 10_000
+    az_bot.access.roles[user_id] = {"role": "teacher", "teacher": handler.get_teacher_by_id(id_t)}
+    az_bot.access.rebuild()
+    id_s = handler.get_teacher_students_by_id(id_t)[0]
+    surname = handler.get_student_name_by_id(id_s).split()[0]
+
+    update = az_bot.Update.de_json({"update_id": 1, "inline_query": {
+        "id": "1", "from": {"id": user_id, "is_bot": False, "first_name": "User"}, "query": surname, "offset": ""}},
+        app.bot)
+    await app.process_update(update)
+    results = bot.calls["answerInlineQuery"][-1][1]["results"]
+    assert any(item["id"] == str(id_s) for item in results), "inline-запрос не вернул студента"
+    # Студенты других преподавателей недоступны
+    assert all(handler.get_teacher_of_student(int(item["id"])) == id_t for item in results)
+
+    message_id = 5000
+    await app.process_update(az_bot.Update.de_json(make_message_update(2, user_id, message_id, f"/student {id_s}"),
+                                                   app.bot))
+    sent = bot.calls["sendMessage"][-1][1]
+    assert handler.get_student_name_by_id(id_s) in sent["text"], "меню студента не открыто"
+
+    status_key = next(iter(handler.get_statuses()))
+    menu_id = message_id + 1
+    await app.process_update(az_bot.Update.de_json(
+        make_callback_update(3, user_id, menu_id, f"status_{status_key}"), app.bot))
+    await app.process_update(az_bot.Update.de_json(make_message_update(4, user_id, menu_id + 1, "20.05.25"), app.bot))
+    teacher_name = handler.get_teacher_by_id(id_t)
+    _, data_s = handler.get_student_file_data(teacher_name, handler.get_student_name_by_id(id_s))
+    assert data_s[status_key] == "20.05.25", "статус не изменен"
+    await app.shutdown()
+    print(f"Бот: inline-запрос -> /student {id_s} -> изменение статуса выполнено, "
+          f"вызовы Bot API {dict((key, len(value)) for key, value in bot.calls.items())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка inline-поиска студентов")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=50, help="студентов в выборке запросов")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_search_"))
+    # Конфигурация читается при первом импорте, поэтому модули бота импортируются после настройки окружения
+    os.environ.update({"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+                       "LOG_FILE": "", "LOG_LEVEL": "WARNING", "ADMIN_IDS": "", "SNAPSHOT_FILE": ""})
+    from benchmarks.dataset import build_dataset
+    try:
+        build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot import az_bot
+        check_index(az_bot.tcr_handler, args)
+        asyncio.run(check_bot(az_bot))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Проверка модели дублированного доступа (одна запись у владельца + связи "shared") на синтетических данных:
+    - файл прежнего формата (копии записей с ключом "duplicate") преобразуется при загрузке, после
+      записи структуры ключей "duplicate" не остается, размер файла структуры уменьшается;
+    - поиск преподавателей студента и вида доступа - O(1) независимо от количества связей;
+    - значения статусов, измененные через преподавателя с дублированным доступом, видны владельцу;
+    - отмена доступа, удаление студента и преподавателя-владельца, перемещение студента
+      сохраняют связи согласованными (consistency не находит проблем).
+
+Запуск из корня проекта:
+    python -m benchmarks.sharing_check --teachers 50 --students 20000 --shared 5000
+"""
+import io
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+from pathlib import Path
+from benchmarks.dataset import build_dataset
+
+
+def measure(func, repeat: int) -> float:
+    """Медианное время вызова func(i), мкс."""
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def make_legacy(teachers_file, count: int, seed: int = 0) -> list[tuple]:
+    """Дублированный доступ в прежнем формате: копии записей с меткой "duplicate" и метки у исходных записей."""
+    data = json.loads(Path(teachers_file).read_text(encoding="utf-8"))
+    data.pop("shared", None)
+    rnd = random.Random(seed)
+    teachers = list(data["teachers"])
+    links = []
+    for _ in range(count):
+        owner, guest = rnd.sample(teachers, 2)
+        student = rnd.choice(list(data["teachers"][owner]))
+        record = data["teachers"][owner][student]
+        if student in data["teachers"][guest] or record.get("duplicate", {owner: student}) != {owner: student}:
+            continue
+        data["teachers"][guest][student] = {**record, "duplicate": {owner: student}}
+        # Прежний duplicate_access помечал и исходную запись (метка указывает сама на себя)
+        data["teachers"][owner][student] = {**record, "duplicate": {owner: student}}
+        links.append((guest, student, owner))
+    Path(teachers_file).write_text(json.dumps(data, ensure_ascii=False, indent=4), encoding="utf-8")
+    return links
+
+
+def check_behavior(handler, links):
+    from src.status_control_bot.az_teacher_data_handler import OWNER, SHARED
+    from src.status_control_bot.consistency import scan_handler
+
+    guest, student, owner = links[0]
+    id_s = handler.get_student_id_by_name(student)
+    id_owner, id_guest = handler.get_teacher_by_name(owner), handler.get_teacher_by_name(guest)
+    if handler.get_teacher_of_student(id_s) != id_owner:
+        id_s = next(i for i in handler.get_teacher_students_by_id(id_owner)
+                    if handler.get_student_name_by_id(i) == student)
+    assert handler.get_access(id_owner, id_s) == OWNER and handler.get_access(id_guest, id_s) == SHARED
+    assert id_guest in handler.get_student_teachers(id_s) and id_s in handler.get_teacher_students_by_id(id_guest)
+    assert student in handler.get_teacher_students(guest)
+
+    # Значение, измененное через дублированный доступ, видно владельцу
+    key = next(iter(handler.get_statuses()))
+    assert handler.change_student_status(guest, student, key, "shared-value")
+    assert handler.get_student_file_data(owner, student)[1][key] == "shared-value"
+
+    teachers = handler.get_teachers()
+    third = next(t for t in teachers if t not in (owner, guest) and student not in handler.get_teacher_students(t))
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Доступом делится преподаватель с дублированным доступом - связь указывает на владельца
+        assert handler.duplicate_access(third, guest, student)
+        assert handler.data["shared"][third][student] == owner
+        assert not handler.duplicate_access(third, owner, student), "повторное дублирование"
+        assert handler.unshare_access(third, student) and student not in handler.get_teacher_students(third)
+
+        # Перемещение: связи переходят к новому владельцу, удаление дублированного доступа не удаляет запись
+        assert not handler.transfer_student(student, third, from_teacher=guest), "перемещение от гостя"
+        assert handler.transfer_student(student, third)
+        assert handler.data["shared"][guest][student] == third
+        removed = handler.remove_student_by_name(student, full_match=True, teacher_name=guest)
+        assert removed and "file" not in removed and student in handler.data["teachers"][third]
+
+        # Удаление записи владельца и преподавателя-владельца удаляет связи с ними
+        guest2, student2, owner2 = next(link for link in links[1:] if link[2] != third and link[1] != student
+                                        and link[1] in handler.data["teachers"].get(link[2], {}))
+        assert handler.remove_student_by_name(student2, full_match=True, teacher_name=owner2)
+        assert student2 not in handler.data["shared"].get(guest2, {})
+        guest3, student3, owner3 = next(link for link in links if link[2] in handler.data["teachers"]
+                                        and link[1] in handler.data["teachers"][link[2]]
+                                        and link[1] in handler.data["shared"].get(link[0], {}))
+        assert handler.remove_teacher(owner3)
+    assert all(owner3 not in shared.values() for shared in handler.data["shared"].values())
+    # Файлы студентов удаленного преподавателя remove_teacher не удаляет - проверяются только связи и записи
+    report = scan_handler(handler, grace=0)
+    assert not report["duplicates"] and not report["dangling"], report["duplicates"]
+    print("Поведение: изменение через дублированный доступ, повторное дублирование, отмена, перемещение, "
+          "удаление студента и владельца - связи согласованы")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка модели дублированного доступа")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--shared", type=int, default=5000, help="связей дублированного доступа")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_sharing_"))
+    os.environ.update({"DATA_DIR": str(work_dir), "LOG_FILE": "", "LOG_LEVEL": "CRITICAL"})
+    try:
+        teachers_file = build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        links = make_legacy(teachers_file, args.shared)
+        legacy_size = Path(teachers_file).stat().st_size
+        from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+
+        start = time.perf_counter()
+        handler = TeacherDataHandler(teachers_file)
+        elapsed = time.perf_counter() - start
+        shared = sum(len(students) for students in handler.data["shared"].values())
+        assert shared == len(links), (shared, len(links))
+        assert not any("duplicate" in record for students in handler.data["teachers"].values()
+                       for record in students.values())
+        assert len(handler.get_data_link_students()) == args.students, "записи дублированного доступа получили id"
+        with handler.transaction() as tx:
+            tx.edit("groups")  # запись структуры в новом формате
+        size = Path(teachers_file).stat().st_size
+        assert "duplicate" not in Path(teachers_file).read_text(encoding="utf-8")
+        print(f"Преобразование {len(links)} связей прежнего формата при загрузке: {elapsed * 1000:.0f} мс, "
+              f"teachers.json {legacy_size // 1024} -> {size // 1024} КБ")
+
+        ids = list(handler.get_data_link_students())
+        shared_ids = [id_s for id_s in ids if len(handler.get_student_teachers(id_s)) > 1]
+        teachers_ids = handler.get_teachers_id()
+        rnd = random.Random(1)
+        pick_s = [rnd.choice(shared_ids) for _ in range(args.repeat)]
+        pick_t = [rnd.choice(teachers_ids) for _ in range(args.repeat)]
+        results = {
+            "get_student_teachers": measure(lambda i: handler.get_student_teachers(pick_s[i]), args.repeat),
+            "get_access": measure(lambda i: handler.get_access(pick_t[i], pick_s[i]), args.repeat),
+            "get_student_data_by_id (shared)": measure(
+                lambda i: handler.get_student_data_by_id(handler.get_student_teachers(pick_s[i])[-1], pick_s[i]),
+                args.repeat),
+        }
+        for name, value in results.items():
+            print(f"  {name:<34} {value:8.2f} мкс")
+        check_behavior(handler, links)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Проверка типов статусов на синтетических данных:
+    - разбор и отображение значений (date, bool, enum), отклонение некорректного ввода;
+    - хранение в нормализованном виде (даты - 'ГГГГ-ММ-ДД'), пропуск некорректных значений
+      в пакетной записи;
+    - запрос диапазона дат через отсортированный индекс в сравнении с разбором строк всех студентов,
+      обновление индекса только по измененным файлам;
+    - сквозной сценарий бота: некорректная дата отклоняется с повторным запросом, корректная записывается.
+
+Запуск из корня проекта:
+    python -m benchmarks.status_types_check --teachers 50 --students 10000
+"""
+import io
+import os
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from datetime import date, timedelta
+from benchmarks.stub_bot import StubBot, make_message_update, make_callback_update
+
+
+def check_types():
+    from src.status_control_bot.status_types import StatusType, infer_type, DATE, BOOL, ENUM, TEXT
+
+    status_date = StatusType(DATE)
+    assert status_date.parse("2.05.25") == "2025-05-02" and status_date.parse("02/05/2025") == "2025-05-02"
+    assert status_date.format("2025-05-02") == "02.05.2025" and status_date.format("2.05.25") == "02.05.2025"
+    assert status_date.parse(" ") == "" and status_date.date_of("2025-05-02") == date(2025, 5, 2)
+    status_bool = StatusType(BOOL)
+    assert status_bool.parse("Да") == "1" and status_bool.parse("-") == "0" and status_bool.format("1") == "да"
+    status_enum = StatusType(ENUM, {"draft": "Черновик", "final": "Окончательный"})
+    assert status_enum.parse("черновик") == "draft" and status_enum.format("final") == "Окончательный"
+    for status_type, text in ((status_date, "32.13.25"), (status_date, "завтра"), (status_bool, "может быть"),
+                              (status_enum, "другой")):
+        try:
+            status_type.parse(text)
+        except ValueError:
+            continue
+        raise AssertionError(f"принято некорректное значение '{text}' ({status_type.kind})")
+    assert infer_type("Дата сдачи ВКР в ЭБС").kind == DATE and infer_type("Допуск к АП").kind == BOOL
+    assert infer_type("Готовность ВКР на 15.05.25").kind == TEXT
+    print("Типы: разбор, отображение и отклонение некорректного ввода")
+
+
+def naive_range(handler, key, start, end) -> list:
+    """Разбор строк значений всех студентов (без индекса)."""
+    from src.status_control_bot.status_types import parse_date
+
+    result = []
+    data_dir = handler.get_data_dir()
+    for id_s in handler.get_data_link_students():
+        data_s = handler.get_student_data_by_id(handler.get_teacher_of_student(id_s), id_s)
+        value = (handler.load_student_file(data_dir / data_s["file"]) or {}).get(key)
+        if not value:
+            continue
+        day = parse_date(value)
+        if start <= day < end:
+            result.append((day, id_s))
+    return sorted(result)
+
+
+def check_index(handler, args):
+    rnd = random.Random(0)
+    key = next(key for key, status_type in handler.get_status_types().items() if status_type.kind == "date")
+    flag = next(key for key, status_type in handler.get_status_types().items() if status_type.kind == "bool")
+    ids = list(handler.get_data_link_students())
+    first = date(2025, 3, 1)
+    # Значения в формате ввода пользователей (ДД.ММ.ГГ), у части студентов - не заполнены
+    updates = {id_s: {key: (first + timedelta(days=rnd.randrange(120))).strftime("%d.%m.%y")}
+               for id_s in ids if id_s == ids[0] or rnd.random() < 0.8}
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert handler.set_statuses(updates) == len(updates)
+        assert handler.set_statuses({ids[0]: {key: "32.13.25", flag: "да"}}) == 1
+    name = handler.get_student_data_by_id(handler.get_teacher_of_student(ids[0]), ids[0])["file"]
+    data_f = handler.load_student_file(handler.get_data_dir() / name)
+    assert data_f[flag] == "1" and data_f[key] == handler.parse_status_value(key, updates[ids[0]][key]), data_f
+    print("Хранение: даты в виде ГГГГ-ММ-ДД, некорректное значение в пакете пропущено")
+
+    start, end = date(2025, 4, 1), date(2025, 4, 15)
+    begin = time.perf_counter()
+    expected = naive_range(handler, key, start, end)
+    naive = time.perf_counter() - begin
+    begin = time.perf_counter()
+    found = handler.find_by_date(key, start, end)
+    build = time.perf_counter() - begin
+    assert found == expected, (len(found), len(expected))
+    begin = time.perf_counter()
+    for _ in range(args.queries):
+        handler.find_by_date(key, start, end)
+    query = (time.perf_counter() - begin) / args.queries
+    assert handler.find_by_date(flag) is None
+    print(f"Диапазон {start:%d.%m}-{end:%d.%m} ({len(found)} из {len(ids)}): разбор строк {naive * 1000:.1f} мс, "
+          f"построение индекса {build * 1000:.1f} мс, запрос по индексу {query * 1000:.3f} мс")
+
+    # Изменение нескольких значений - индекс обновляется без перестройки
+    rebuilds = [0]
+    rebuild = handler.date_index.rebuild
+
+    def counting():
+        rebuilds[0] += 1
+        rebuild()
+
+    handler.date_index.rebuild = counting
+    changed = rnd.sample(ids, 20)
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler.set_statuses({id_s: {key: "10.04.25"} for id_s in changed[:10]})
+        handler.set_statuses({id_s: {key: ""} for id_s in changed[10:]})
+    begin = time.perf_counter()
+    found = handler.find_by_date(key, start, end)
+    refresh = time.perf_counter() - begin
+    assert found == naive_range(handler, key, start, end)
+    assert all((date(2025, 4, 10), id_s) in found for id_s in changed[:10])
+    assert rebuilds[0] == 0, "индекс перестроен"
+    del handler.date_index.rebuild
+    print(f"Изменено {len(changed)} значений: обновление индекса {refresh * 1000:.2f} мс без перестройки")
+
+
+async def check_bot(az_bot):
+    bot = StubBot()
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+    handler = az_bot.tcr_handler
+    id_t = next(id_t for id_t in handler.get_teachers_id() if handler.get_teacher_students_by_id(id_t))
+    user_id = 10_000
+    az_bot.access.roles[user_id] = {"role": "teacher", "teacher": handler.get_teacher_by_id(id_t)}
+    az_bot.access.rebuild()
+    id_s = handler.get_teacher_students_by_id(id_t)[0]
+    key = next(key for key, status_type in handler.get_status_types().items() if status_type.kind == "date")
+
+    message_id = 5000
+    await app.process_update(az_bot.Update.de_json(make_message_update(1, user_id, message_id, f"/student {id_s}"),
+                                                   app.bot))
+    menu_id = message_id + 1
+    await app.process_update(az_bot.Update.de_json(make_callback_update(2, user_id, menu_id, f"status_{key}"), app.bot))
+    assert "ДД.ММ.ГГГГ" in bot.calls["editMessageText"][-1][1]["text"], "нет подсказки формата"
+    await app.process_update(az_bot.Update.de_json(make_message_update(3, user_id, menu_id + 1, "32.13.25"), app.bot))
+    assert "Некорректное значение" in bot.calls["editMessageText"][-1][1]["text"], "некорректная дата не отклонена"
+    teacher_name = handler.get_teacher_by_id(id_t)
+    student_name = handler.get_student_name_by_id(id_s)
+    assert handler.get_student_file_data(teacher_name, student_name)[1][key] != "32.13.25"
+    # Состояние ввода сохранено: следующее сообщение - повторный ввод значения
+    await app.process_update(az_bot.Update.de_json(make_message_update(4, user_id, menu_id + 2, "1.06.25"), app.bot))
+    assert handler.get_student_file_data(teacher_name, student_name)[1][key] == "2025-06-01"
+    assert "01.06.2025" in bot.calls["editMessageText"][-1][1]["text"], "значение не отображено"
+    await app.shutdown()
+    print("Бот: некорректная дата отклонена с повторным запросом, корректная записана и отображена")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка типов статусов")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=100, help="повторов запроса по индексу")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_types_"))
+    # Конфигурация читается при первом импорте, поэтому модули бота импортируются после настройки окружения
+    os.environ.update({"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+                       "LOG_FILE": "", "LOG_LEVEL": "WARNING", "ADMIN_IDS": "", "SNAPSHOT_FILE": ""})
+    from benchmarks.dataset import build_dataset
+    try:
+        build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        check_types()
+        from src.status_control_bot import az_bot
+        check_index(az_bot.tcr_handler, args)
+        asyncio.run(check_bot(az_bot))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
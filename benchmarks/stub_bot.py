@@ -0,0 +1,111 @@
+import time
+import asyncio
+from datetime import datetime, timedelta
+from collections import defaultdict
+from telegram.ext import ExtBot
+from telegram.error import RetryAfter
+
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "StubBot", "username": "stub_bot"}
+
+
+class StubBot(ExtBot):
+    """
+    Заглушка Telegram-бота: вместо обращения к Bot API запоминает вызовы и возвращает
+    правдоподобные ответы. latency - имитация сетевой задержки одного запроса, сек.
+    flood_every - каждый N-й вызов sendMessage завершается RetryAfter(retry_after) (0 - никогда).
+    """
+
+    def __init__(self, latency: float = 0.0, flood_every: int = 0, retry_after: int = 1, **kwargs):
+        super().__init__(token="0:stub", **kwargs)
+        with self._unfrozen():
+            self._stub_latency = latency
+            self._stub_message_id = 1000
+            self._stub_flood = (flood_every, retry_after)
+            self.calls = defaultdict(list)  # {метод Bot API: [(время, параметры), ...]}
+
+    async def _do_post(self, endpoint, data, **kwargs):
+        flood_every, retry_after = self._stub_flood
+        if endpoint == "sendMessage" and flood_every and \
+                (self.count(endpoint) + self.count("flood") + 1) % flood_every == 0:
+            self.calls["flood"].append((time.monotonic(), data))
+            raise RetryAfter(retry_after)
+        self.calls[endpoint].append((time.monotonic(), data))
+        if self._stub_latency:
+            await asyncio.sleep(self._stub_latency)
+        if endpoint == "getMe":
+            return dict(BOT_USER)
+        if endpoint in ("sendMessage", "sendDocument", "editMessageText"):
+            if endpoint != "editMessageText":
+                self._stub_message_id += 1
+            message_id = data.get("message_id", self._stub_message_id)
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": data.get("chat_id", 0), "type": "private"},
+                "from": dict(BOT_USER),
+                "text": data.get("text", ""),
+            }
+        return True
+
+    def count(self, endpoint: str) -> int:
+        return len(self.calls[endpoint])
+
+
+class FakeClock:
+    """Подменяемые часы: время идет только через sleep() и advance()."""
+
+    def __init__(self, start: datetime):
+        self.start = start
+        self.elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def advance(self, seconds: float):
+        self.elapsed += seconds
+
+    async def sleep(self, seconds: float):
+        self.elapsed += max(0.0, seconds)
+        await asyncio.sleep(0)
+
+
+# region Синтетические обновления
+def make_user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+
+
+def make_message(user_id: int, message_id: int, text: str) -> dict:
+    item = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": make_user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        item["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return item
+
+
+def make_message_update(update_id: int, user_id: int, message_id: int, text: str) -> dict:
+    return {"update_id": update_id, "message": make_message(user_id, message_id, text)}
+
+
+def make_callback_update(update_id: int, user_id: int, message_id: int, data: str) -> dict:
+    message = make_message(user_id, message_id, "menu")
+    message["from"] = dict(BOT_USER)
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": make_user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": message,
+        },
+    }
+# endregion
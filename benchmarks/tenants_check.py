@@ -0,0 +1,164 @@
+"""
+Проверка нескольких наборов данных (подразделений) в одном процессе бота на синтетических данных:
+    - при запуске загружен только набор по умолчанию, остальные - при первом обращении;
+    - одновременные обращения к незагруженному набору выполняют одну загрузку;
+    - в памяти не более DATASET_MAX_LOADED наборов, простаивающие выгружаются (с подменой часов),
+      повторная загрузка идет из бинарного снимка;
+    - проверка сроков (напоминания) во всех наборах не меняет загруженные наборы и время их использования;
+    - пользователи, выбравшие разные наборы (/dataset), видят и изменяют только свои данные;
+    - /broadcast рассылается пользователям с ролями во всех наборах, в т.ч. не загруженных.
+
+Запуск из корня проекта:
+    python -m benchmarks.tenants_check --datasets 5 --max-loaded 2 --students 2000
+"""
+import os
+import time
+import asyncio
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from benchmarks.stub_bot import StubBot, FakeClock, make_message_update, make_callback_update
+
+
+async def run(az_bot, args) -> None:
+    registry = az_bot.registry
+    names = registry.names()
+    assert [tenant.name for tenant in registry.loaded()] == [names[0]], "при запуске загружены лишние наборы"
+
+    loads = []
+    factory = registry.factory
+
+    def counting_factory(name, teachers_file):
+        start = time.perf_counter()
+        tenant = factory(name, teachers_file)
+        loads.append((name, time.perf_counter() - start, tenant.handler.snapshot_loaded))
+        return tenant
+
+    registry.factory = counting_factory
+    fake = FakeClock(datetime.now())
+    registry.clock = fake.monotonic
+    for tenant in registry.loaded():
+        tenant.last_used = 0.0
+
+    # Одновременные обращения к незагруженному набору
+    tenants = await asyncio.gather(*(registry.acquire(names[1]) for _ in range(20)))
+    assert len({id(tenant) for tenant in tenants}) == 1 and len(loads) == 1, "повторная загрузка набора"
+
+    bot = StubBot()
+    app = az_bot.create_bot_app(bot=bot)
+    await app.initialize()
+    counter = [1]
+    peak = 0
+
+    async def send(payload):
+        nonlocal peak
+        counter[0] += 1
+        await app.process_update(az_bot.Update.de_json(payload, app.bot))
+        peak = max(peak, len(registry.tenants))
+
+    users = {20_000 + i: names[i % len(names)] for i in range(args.users)}
+    for user_id, name in users.items():
+        await send(make_message_update(counter[0], user_id, 1, f"/dataset {name}"))
+        assert registry.selected(user_id) == name
+
+    # Каждый пользователь находит студентов своего набора и изменяет статус первого из них
+    for user_id, name in users.items():
+        await send({"update_id": counter[0], "inline_query": {
+            "id": str(counter[0]), "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "query": "", "offset": ""}})
+        results = bot.calls["answerInlineQuery"][-1][1]["results"]
+        handler = (await registry.acquire(name)).handler
+        students = handler.get_data_link_students()
+        assert results and all(students.get(int(item["id"])) == item["title"] for item in results), \
+            f"результаты поиска не из набора '{name}'"
+        id_s = int(results[0]["id"])
+        message_id = user_id * 10
+        await send(make_message_update(counter[0], user_id, message_id, f"/student {id_s}"))
+        status_key = next(iter(handler.get_statuses()))
+        await send(make_callback_update(counter[0], user_id, message_id + 1, f"status_{status_key}"))
+        value = f"{user_id % 28 + 1:02d}.05.25"
+        await send(make_message_update(counter[0], user_id, message_id + 2, value))
+        handler = (await registry.acquire(name)).handler
+        teacher_name = handler.get_teacher_by_id(handler.get_teacher_of_student(id_s))
+        _, data_s = handler.get_student_file_data(teacher_name, handler.get_student_name_by_id(id_s))
+        assert data_s[status_key] == value, f"статус в наборе '{name}' не изменен"
+
+    assert peak <= args.max_loaded, f"загружено {peak} наборов при ограничении {args.max_loaded}"
+
+    # Роль в наборе последнего пользователя, рассылка - из набора по умолчанию
+    last_user, first_user = max(users), min(users)
+    await send(make_message_update(counter[0], last_user, 5, "/grant 777001 reader"))
+    submitted = []
+    submit = az_bot.dispatcher.submit
+    az_bot.dispatcher.submit = lambda chat_ids, text, **kwargs: submitted.append(set(chat_ids))
+    try:
+        await send(make_message_update(counter[0], first_user, 6, "/broadcast Проверка"))
+    finally:
+        az_bot.dispatcher.submit = submit
+    assert users[last_user] != users[first_user] and submitted and 777001 in submitted[0], \
+        "рассылка не учитывает роли других наборов"
+    before = [(name, tenant, tenant.last_used) for name, tenant in registry.tenants.items()]
+    fake.advance(60)
+    reminders = await az_bot.check_reminders(app.bot)
+    assert [(name, tenant, tenant.last_used) for name, tenant in registry.tenants.items()] == before, \
+        "напоминания изменили загруженные наборы"
+    await app.shutdown()
+
+    first = [item for item in loads if not item[2]]
+    fake.advance(registry.idle_timeout + 1)
+    unloaded = await registry.unload_idle()
+    assert not registry.tenants, "простаивающие наборы не выгружены"
+    reload = []
+    for name in names:
+        start = time.perf_counter()
+        await registry.acquire(name)
+        reload.append(time.perf_counter() - start)
+    assert all(snapshot for _, _, snapshot in loads[-len(names):]), "повторная загрузка не из снимка"
+    registry.close()
+
+    def ms(values):
+        return sum(values) / len(values) * 1000
+
+    print(f"Наборов: {len(names)}, пользователей: {len(users)}, загрузок: {len(loads)} "
+          f"(максимум в памяти {peak} из {args.max_loaded})")
+    if first:
+        print(f"Загрузка из json: {ms([elapsed for _, elapsed, _ in first]):.1f} мс, "
+              f"повторная из снимка (вместе со значениями статусов): {ms(reload):.1f} мс")
+    print(f"Напоминаний: {reminders}, загруженные наборы после проверки сроков не изменились")
+    print(f"Выгружено по простою: {len(unloaded)}, вызовы Bot API "
+          f"{dict((key, len(value)) for key, value in bot.calls.items())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка нескольких наборов данных")
+    parser.add_argument("--datasets", type=int, default=5)
+    parser.add_argument("--max-loaded", type=int, default=2)
+    parser.add_argument("--teachers", type=int, default=10)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_tenants_"))
+    datasets = {f"dept{i}": work_dir / f"dept{i}" / "students" / "teachers.json" for i in range(args.datasets)}
+    # Конфигурация читается при первом импорте, поэтому модули проекта импортируются после настройки окружения
+    os.environ.update({
+        "DATA_DIR": str(work_dir), "LOG_FILE": "", "LOG_LEVEL": "WARNING",
+        "DATASETS": ";".join(f"{name}={path}" for name, path in datasets.items()),
+        "DATASET_MAX_LOADED": str(args.max_loaded), "TEACHERS_FILE": str(datasets["dept0"]),
+        "SNAPSHOT_FILE": str(datasets["dept0"].with_suffix(".snapshot")),
+        "ADMIN_IDS": ",".join(str(20_000 + i) for i in range(args.users)),
+    })
+    from benchmarks.dataset import build_dataset
+    try:
+        for i, path in enumerate(datasets.values()):
+            build_dataset(path.parent.parent, teachers=args.teachers, students=args.students, seed=i)
+        from src.status_control_bot import az_bot
+        asyncio.run(run(az_bot, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
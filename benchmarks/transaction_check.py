@@ -0,0 +1,163 @@
+"""
+Проверка транзакций TeacherDataHandler на синтетических данных:
+    - сбой записи файла структуры или одного из файлов статусов (внедряется подменой save_json):
+      данные в памяти и на диске остаются прежними, созданные файлы удаляются, перезаписанные -
+      восстанавливаются; пакетное изменение статусов (set_statuses) без внешней транзакции
+      при сбое не изменяет ни один файл;
+    - после серии добавлений, перемещений и удалений структура ссылается только на существующие
+      файлы, а лишних файлов статусов нет;
+    - добавление студентов по одному и одной транзакцией (количество записей файла структуры).
+
+Запуск из корня проекта:
+    python -m benchmarks.transaction_check --teachers 20 --students 2000 --batch 200
+"""
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from benchmarks.dataset import build_dataset
+
+
+def disk_state(handler) -> dict:
+    """{имя файла: содержимое} каталога данных и файла структуры."""
+    files = {path.name: path.read_bytes() for path in handler.get_data_dir().glob("*.json")}
+    files["teachers.json"] = Path(handler.current_file).read_bytes()
+    return files
+
+
+def check_consistency(handler):
+    referenced = {data_s["file"] for students in handler.data["teachers"].values() for data_s in students.values()}
+    on_disk = {path.name for path in handler.get_data_dir().glob("*.json")} - {Path(handler.current_file).name}
+    assert referenced <= on_disk, f"нет файлов: {sorted(referenced - on_disk)[:5]}"
+    assert on_disk <= referenced, f"лишние файлы: {sorted(on_disk - referenced)[:5]}"
+
+
+@contextlib.contextmanager
+def failing_writes(handler, fail):
+    """Подмена save_json: fail(путь) == True - ошибка записи."""
+    save_json = handler.save_json
+
+    def patched(json_path, data, mode='w'):
+        if fail(Path(json_path)):
+            return False
+        return save_json(json_path, data, mode)
+
+    handler.save_json = patched
+    try:
+        yield
+    finally:
+        del handler.save_json
+
+
+def check_rollback(handler):
+    teachers = handler.get_teachers()
+    name = handler.get_teacher_students(teachers[0])[0]
+    before, data = disk_state(handler), handler.data
+
+    # Сбой записи структуры при перемещении: новый файл удаляется, старый остается
+    with failing_writes(handler, lambda path: path.name == "teachers.json"):
+        assert not handler.transfer_student(name, teachers[1], teachers[0])
+    assert disk_state(handler) == before and handler.data is data, "перемещение не откатилось"
+
+    # Сбой третьего файла в пакете: записанные файлы статусов восстанавливаются
+    ids = list(handler.get_data_link_students())[:5]
+    key = next(iter(handler.get_statuses()))
+    calls = [0]
+
+    def third(path):
+        calls[0] += 1
+        return calls[0] == 3
+
+    with failing_writes(handler, third):
+        try:
+            with handler.transaction():
+                handler.set_status_bulk(ids, key, "01.01.25")
+                handler.add_student(teachers[0], {"name": "Откатов Студент Тестович", "group": ""})
+        except OSError:
+            pass
+        else:
+            raise AssertionError("ошибка записи не передана")
+    assert disk_state(handler) == before and handler.data is data, "пакет не откатился"
+    for id_s in ids:
+        _, data_f = handler.get_student_file_data(handler.get_teacher_by_id(handler.get_teacher_of_student(id_s)),
+                                                  handler.get_student_name_by_id(id_s))
+        assert data_f[key] != "01.01.25", "кэш содержит отмененные значения"
+
+    # Пакетное изменение статусов без внешней транзакции (как импорт CSV): сбой третьего файла
+    calls[0] = 0
+    with failing_writes(handler, third):
+        assert handler.set_statuses({id_s: {key: "02.01.25"} for id_s in ids}) is None, "ошибка записи не передана"
+    assert disk_state(handler) == before, "пакетное изменение статусов применено частично"
+    print("Откат: сбой записи структуры, файла статусов в пакете и в set_statuses - данные и файлы прежние")
+
+
+def check_operations(handler, batch: int):
+    teachers = handler.get_teachers()
+    students = [{"name": f"Транзакций{n} Студент Тестович", "group": "T-1"} for n in range(batch)]
+    writes = [0]
+    save_json = handler.save_json
+
+    def counting(json_path, data, mode='w'):
+        writes[0] += Path(json_path).name == "teachers.json"
+        return save_json(json_path, data, mode)
+
+    handler.save_json = counting
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for student in students[:batch // 2]:
+            assert handler.add_student(teachers[0], student)
+        single = time.perf_counter() - start
+        single_writes, writes[0] = writes[0], 0
+
+        start = time.perf_counter()
+        with handler.transaction():
+            for student in students[batch // 2:]:
+                assert handler.add_student(teachers[1], student)
+            assert not handler.add_student(teachers[1], students[-1]), "повторное добавление в транзакции"
+        bulk = time.perf_counter() - start
+        bulk_writes = writes[0]
+
+        with handler.transaction():
+            for student in students[:batch // 4]:
+                assert handler.transfer_student(student["name"], teachers[2])
+            for student in students[batch // 4:batch // 2]:
+                assert handler.remove_student_by_name(student["name"], full_match=True)
+            assert handler.duplicate_access(teachers[3], teachers[1], students[-1]["name"])
+    del handler.save_json
+    check_consistency(handler)
+    name = students[-1]["name"]
+    assert handler.get_student_data_by_name(teachers[3], name) is handler.get_student_data_by_name(teachers[1], name)
+    assert name not in handler.data["teachers"][teachers[3]], "дублирование скопировало запись"
+    half = batch // 2
+    print(f"Добавление {half} студентов: по одному {single * 1000:.0f} мс ({single_writes} записей структуры), "
+          f"одной транзакцией {bulk * 1000:.0f} мс ({bulk_writes} запись)")
+    print("Согласованность после добавлений, перемещений и удалений: лишних и отсутствующих файлов нет")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка транзакций TeacherDataHandler")
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=200, help="студентов в проверке пакетных изменений")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_tx_"))
+    os.environ.update({"DATA_DIR": str(work_dir), "LOG_FILE": "", "LOG_LEVEL": "CRITICAL"})
+    try:
+        teachers_file = build_dataset(work_dir, teachers=args.teachers, students=args.students)
+        from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+
+        handler = TeacherDataHandler(teachers_file)
+        check_consistency(handler)
+        check_rollback(handler)
+        check_operations(handler, args.batch)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Проверка нескольких процессов бота с общим каталогом данных на синтетических данных:
+    - процессы одновременно изменяют разные статусы одних и тех же студентов и добавляют
+      студентов; после завершения на диске должны быть последние значения каждого процесса
+      и все добавленные студенты, а кэш каждого процесса после синхронизации - совпадать с диском
+      (--no-store - то же без общего хранилища, показывает потерянные изменения);
+    - роли, запросы на регистрацию и объявления, одновременно изменяемые процессами: в файлах
+      сохраняются изменения всех процессов, и каждый процесс видит изменения остальных;
+    - распределение обновлений по обработчикам: один чат - всегда один обработчик;
+    - сквозной сценарий: обработчики бота (workers.start_workers, заглушка Bot API) принимают
+      обновления от распределителя, пользователи разных обработчиков изменяют статусы одних студентов.
+
+Запуск из корня проекта:
+    python -m benchmarks.workers_check --processes 4 --edits 200
+"""
+import os
+import time
+import queue
+import random
+import asyncio
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+
+def open_handler(env: dict, store: bool):
+    os.environ.update(env)
+    from src.status_control_bot.config import TEACHERS_FILE
+    from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+    from src.status_control_bot.coordination import SharedStore
+
+    handler = TeacherDataHandler(TEACHERS_FILE)
+    if store:
+        handler.store = SharedStore(handler)
+    return handler
+
+
+def sync(handler):
+    if handler.store is not None:
+        handler.store.sync()
+
+
+def text_statuses(handler) -> list:
+    """Статусы типа text: значение записывается как введено и сравнивается с отправленным."""
+    return [key for key, status_type in handler.get_status_types().items() if status_type.kind == "text"]
+
+
+def edit_worker(index: int, env: dict, args, barrier, results):
+    """Процесс-редактор: свой ключ статуса у общих студентов и свои новые студенты."""
+    handler = open_handler(env, not args.no_store)
+    rnd = random.Random(index)
+    statuses = text_statuses(handler)
+    status_key = statuses[index % len(statuses)]
+    students = sorted(handler.get_data_link_students().items())[:args.shared]
+    teachers = handler.get_teachers()
+    expected, added = {}, []
+    barrier.wait()
+    start = time.perf_counter()
+    for n in range(args.edits):
+        sync(handler)  # как при получении обновления (DatasetRegistry.with_tenant)
+        if n % 20 == 19:
+            name = f"Добавленный{index} Студент{n} Тестович"
+            assert handler.add_student(rnd.choice(teachers), {"name": name, "group": f"W{index}"}), name
+            added.append(name)
+        elif n % 5 == 4:
+            batch = dict(rnd.sample(students, 3))
+            value = f"{index}-{n}"
+            assert handler.set_statuses({id_s: {status_key: value} for id_s in batch}) == len(batch)
+            expected.update({name: value for name in batch.values()})
+        else:
+            id_s, name = rnd.choice(students)
+            value = f"{index}-{n}"
+            sync(handler)
+            id_t = handler.get_teacher_of_student(id_s)
+            assert handler.change_student_status(handler.get_teacher_by_id(id_t), name, status_key, value)
+            expected[name] = value
+    elapsed = time.perf_counter() - start
+
+    # Все процессы закончили запись - кэш после синхронизации должен совпадать с диском
+    barrier.wait()
+    sync(handler)
+    data_dir = handler.get_data_dir()
+    stale = 0
+    for name, data_f in handler.student_files.items():
+        if handler.load(data_dir / name) != data_f:
+            stale += 1
+    missing = [name for name in added if name not in handler.get_students_list()]
+    results.put((index, status_key, expected, added, elapsed, stale, len(handler.get_students_list()),
+                 len(missing)))
+
+
+def check_edits(env: dict, args):
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(args.processes), ctx.Queue()
+    processes = [ctx.Process(target=edit_worker, args=(index, env, args, barrier, results))
+                 for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    items = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    handler = open_handler(env, False)
+    lost = stale = 0
+    for index, status_key, expected, added, elapsed, stale_files, total, missing in sorted(items):
+        for name, value in expected.items():
+            id_s = handler.get_student_id_by_name(name)
+            id_t = handler.get_teacher_of_student(id_s)
+            _, data_f = handler.get_student_file_data(handler.get_teacher_by_id(id_t), name)
+            lost += data_f[status_key] != value
+        lost += sum(name not in handler.get_students_list() for name in added)
+        stale += stale_files + missing + (total != len(handler.get_students_list()))
+    edits = args.processes * args.edits
+    rate = edits / max(elapsed for *_, elapsed, _, _, _ in items)
+    mode = "без общего хранилища" if args.no_store else "общее хранилище"
+    print(f"Изменения ({mode}): {args.processes} процессов x {args.edits}, {rate:.0f} изменений/с, "
+          f"потеряно {lost}, расхождений кэша с диском {stale}")
+    if not args.no_store:
+        assert lost == 0, f"потеряно изменений: {lost}"
+        assert stale == 0, f"кэш процессов расходится с диском: {stale}"
+
+
+def shared_files_worker(index: int, env: dict, args, barrier, results):
+    """Процесс, назначающий роли, регистрирующий пользователей и добавляющий объявления."""
+    from src.status_control_bot.access_control import AccessControl, READER
+    from src.status_control_bot.registration import RegistrationQueue
+    from src.status_control_bot.announcements import AnnouncementBoard
+    from src.status_control_bot.coordination import FileLock
+
+    handler = open_handler(env, True)
+    data_dir = Path(env["DATA_DIR"])
+    lock = FileLock(data_dir / ".shared.lock")
+    access = AccessControl(data_dir / "roles.json", handler, check_interval=0)
+    registrations = RegistrationQueue(data_dir / "registration_data.json", lock=lock, check_interval=0)
+    board = AnnouncementBoard(data_dir / "important_info.txt", data_dir / "announcements.json", check_interval=0,
+                              lock=lock)
+    barrier.wait()
+    for n in range(args.shared):
+        user_id = 100_000 * (index + 1) + n
+        assert access.grant(user_id, READER)
+        registrations.submit(user_id, f"Пользователь{index}", str(n))
+        if n % 5 == 4:
+            registrations.approve(100_000 * (index + 1) + n - 1)
+            asyncio.run(registrations.flush())
+        assert board.add(f"Объявление {index}-{n}")
+    asyncio.run(registrations.flush())
+    barrier.wait()
+    access.refresh()
+    results.put((set(access.roles), set(registrations.approved()), {item["user_id"] for item in registrations.pending()},
+                 set(board.get_text().splitlines())))
+
+
+def check_shared_files(env: dict, args):
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(args.processes), ctx.Queue()
+    processes = [ctx.Process(target=shared_files_worker, args=(index, env, args, barrier, results))
+                 for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    items = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    users = {100_000 * (index + 1) + n for index in range(args.processes) for n in range(args.shared)}
+    approved = {user_id for user_id in users if user_id % 5 == 3}
+    texts = {f"Объявление {index}-{n}" for index in range(args.processes) for n in range(args.shared)}
+    for roles, seen_approved, seen_pending, seen_texts in items:
+        assert users <= roles, f"потеряно ролей: {len(users - roles)}"
+        assert seen_approved == approved and seen_pending == users - approved, "потеряны запросы на регистрацию"
+        assert texts <= seen_texts, f"потеряно объявлений: {len(texts - seen_texts)}"
+    print(f"Роли, регистрации и объявления: {args.processes} процессов x {args.shared}, изменения всех процессов "
+          f"сохранены и видны каждому процессу")
+
+
+def check_partition(workers: int):
+    from telegram import Update
+    from src.status_control_bot.workers import UpdateRouter
+    from benchmarks.stub_bot import make_message_update, make_callback_update
+
+    queues = [queue.SimpleQueue() for _ in range(workers)]
+    router = UpdateRouter(queues)
+    owner = {}
+    for n in range(3000):
+        user_id = 1000 + n % 500
+        make = make_message_update if n % 2 else make_callback_update
+        index = router.route(Update.de_json(make(n, user_id, n, "x"), None))
+        assert owner.setdefault(user_id, index) == index, "обновления одного чата у разных обработчиков"
+    chats = [0] * workers
+    for index in owner.values():
+        chats[index] += 1
+    print(f"Распределение 500 чатов по {workers} обработчикам: чатов {chats}, обновлений {router.counts}")
+
+
+def bot_worker(index: int, env: dict, updates):
+    """Обработчик бота с заглушкой Bot API (вместо workers.worker_main)."""
+    os.environ.update(env)
+    from benchmarks.stub_bot import StubBot
+    from src.status_control_bot import az_bot
+    from src.status_control_bot.workers import serve_updates
+
+    asyncio.run(serve_updates(az_bot.create_bot_app(bot=StubBot()), updates))
+
+
+def check_bot(env: dict, args):
+    from telegram import Update
+    from src.status_control_bot.workers import UpdateRouter, start_workers, stop_workers, worker_index
+    from benchmarks.stub_bot import make_message_update, make_callback_update
+
+    handler = open_handler(env, False)
+    statuses = text_statuses(handler)
+    students = sorted(handler.get_data_link_students())[:10]
+    # У каждого пользователя свой статус: порядок записей разных обработчиков в один статус не определен
+    users = [20_000 + i for i in range(min(args.processes * 2, len(statuses)))]
+
+    processes, queues = start_workers(args.processes, target=bot_worker)
+    router = UpdateRouter(queues)
+    expected = {}
+    counter = 0
+    start = time.perf_counter()
+    for round_ in range(3):
+        for id_s in students:
+            for i, user_id in enumerate(users):
+                status_key = statuses[i % len(statuses)]
+                message_id = (round_ * 100 + id_s) * 10
+                value = f"{i + 1:02d}.0{round_ + 1}.25"
+                for payload in (make_message_update(counter, user_id, message_id, f"/student {id_s}"),
+                                make_callback_update(counter + 1, user_id, message_id + 1, f"status_{status_key}"),
+                                make_message_update(counter + 2, user_id, message_id + 2, value)):
+                    router.route(Update.de_json(payload, None))
+                counter += 3
+                expected[(id_s, status_key)] = value
+    stop_workers(processes, queues, timeout=120)
+    elapsed = time.perf_counter() - start
+
+    handler = open_handler(env, False)
+    lost = 0
+    for (id_s, status_key), value in expected.items():
+        id_t = handler.get_teacher_of_student(id_s)
+        _, data_f = handler.get_student_file_data(handler.get_teacher_by_id(id_t),
+                                                  handler.get_student_name_by_id(id_s))
+        lost += data_f[status_key] != value
+    spread = sorted({worker_index(user_id, args.processes) for user_id in users})
+    print(f"Бот: {len(users)} пользователей на обработчиках {spread}, {counter} обновлений за {elapsed:.1f} с "
+          f"(с запуском процессов), потеряно изменений {lost}")
+    assert all(process.exitcode == 0 for process in processes), "обработчик завершился с ошибкой"
+    assert lost == 0, f"потеряно изменений: {lost}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка нескольких процессов бота с общими данными")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--edits", type=int, default=200, help="изменений в каждом процессе")
+    parser.add_argument("--shared", type=int, default=20, help="студентов, изменяемых всеми процессами")
+    parser.add_argument("--teachers", type=int, default=10)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--no-store", action="store_true", help="без общего хранилища (потеря изменений)")
+    args = parser.parse_args(argv)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tdh_workers_"))
+    # Процессы читают конфигурацию при первом импорте, поэтому окружение передается им явно
+    env = {"DATA_DIR": str(work_dir), "TEACHERS_FILE": str(work_dir / "students" / "teachers.json"),
+           "LOG_FILE": "", "LOG_LEVEL": "WARNING", "SNAPSHOT_FILE": "", "DATA_RELOAD_INTERVAL": "0",
+           "REMINDER_INTERVAL": "0", "ADMIN_IDS": ",".join(str(20_000 + i) for i in range(args.processes * 2))}
+    os.environ.update(env)
+    from benchmarks.dataset import build_dataset
+    try:
+        # Дополнительные статусы типа text - у каждого процесса-редактора свой ключ
+        build_dataset(work_dir, teachers=args.teachers, students=args.students, statuses=8 + args.processes)
+        check_edits(env, args)
+        if not args.no_store:
+            check_shared_files(env, args)
+            check_partition(args.processes)
+            check_bot(env, args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
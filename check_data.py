@@ -0,0 +1,38 @@
+import sys
+import time
+import argparse
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.consistency import scan_handler, repair, format_report, has_problems, ORPHAN_GRACE
+from src.status_control_bot.config import TEACHERS_FILE
+
+
+"""
+Проверка согласованности каталога файлов статусов и teachers.json (лишние и отсутствующие файлы,
+некорректный дублированный доступ).
+
+    python check_data.py
+    python check_data.py --repair
+"""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка согласованности данных")
+    parser.add_argument("--teachers-file", default=TEACHERS_FILE, help="файл teachers.json")
+    parser.add_argument("--repair", action="store_true",
+                        help="исправить: лишние файлы - в .orphans, отсутствующие - создать пустыми")
+    parser.add_argument("--grace", type=float, default=ORPHAN_GRACE, help="не считать лишними файлы моложе (сек.)")
+    parser.add_argument("--limit", type=int, default=100, help="строк отчета по каждому виду проблем")
+    args = parser.parse_args(argv)
+
+    handler = TeacherDataHandler(args.teachers_file)
+    start = time.perf_counter()
+    report = scan_handler(handler, grace=args.grace)
+    print(format_report(report, limit=args.limit))
+    print(f"Проверка: {(time.perf_counter() - start) * 1000:.0f} мс")
+    if args.repair and has_problems(report):
+        print(f"Исправлено: {repair(handler, report, grace=args.grace)}")
+        report = scan_handler(handler, grace=args.grace)
+    return 1 if has_problems(report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import sys
+import argparse
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.importer import import_csv, format_report
+from src.status_control_bot.offload import JobPool
+from src.status_control_bot.config import TEACHERS_FILE
+
+
+"""
+Импорт значений статусов из CSV (ФИО студента, ключ или название статуса, значение).
+
+    python import_csv.py dates.csv
+    python import_csv.py dates.csv --dry-run
+    python import_csv.py dates.csv --workers 4
+"""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт значений статусов из CSV")
+    parser.add_argument("file", help="CSV-файл: ФИО;статус;значение")
+    parser.add_argument("--encoding", default="utf-8-sig", help="кодировка файла (например, cp1251)")
+    parser.add_argument("--teachers-file", default=TEACHERS_FILE, help="файл teachers.json")
+    parser.add_argument("--dry-run", action="store_true", help="только проверка, без записи")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="процессов для нечеткого сопоставления имен (0 - в текущем процессе)")
+    args = parser.parse_args(argv)
+
+    handler = TeacherDataHandler(args.teachers_file)
+    pool = JobPool(args.workers) if args.workers > 0 else None
+    try:
+        with open(args.file, encoding=args.encoding, newline="") as stream:
+            report = import_csv(handler, stream, dry_run=args.dry_run, pool=pool)
+    finally:
+        if pool is not None:
+            pool.close()
+    print(format_report(report, limit=100))
+    return 1 if report["missing"] or report["ambiguous"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
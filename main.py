@@ -1,7 +1,21 @@
-from src.status_control_bot.az_bot import run_bot
+import argparse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Запуск бота")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="количество процессов-обработчиков (по умолчанию BOT_WORKERS)")
+    args = parser.parse_args(argv)
+    from src.status_control_bot.config import BOT_WORKERS
+
+    workers = args.workers or BOT_WORKERS
+    if workers > 1:
+        from src.status_control_bot.workers import run_workers
+        run_workers(workers)
+    else:
+        from src.status_control_bot.az_bot import run_bot
+        run_bot()
 
-def main():
-    run_bot()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,159 @@
+import time
+import logging
+from pathlib import Path
+from contextlib import nullcontext
+from src.status_control_bot.utils import file_signature, load_json, save_json
+
+
+"""
+Пример структуры файла ролей (ключ - Telegram id пользователя):
+{
+    "123456789": {"role": "admin"},
+    "234567890": {"role": "teacher", "teacher": "Эйлер Л."},
+    "345678901": {"role": "reader"}
+}
+"""
+
+logger = logging.getLogger(__name__)
+
+ADMIN = "admin"  # полный доступ
+TEACHER = "teacher"  # редактирование только своих студентов
+READER = "reader"  # только просмотр
+ROLES = (ADMIN, TEACHER, READER)
+
+
+def read_roles(file_path) -> dict:
+    """Роли из файла {user_id: {"role": str, "teacher": str}} (неизвестные роли пропускаются), без файла - {}."""
+    data = load_json(file_path) if Path(file_path).exists() else None
+    return {int(user_id): item for user_id, item in (data or {}).items() if item.get("role") in ROLES}
+
+
+class AccessControl:
+    """
+    Ролевой доступ пользователей. Проверки выполняются через кэш в памяти
+    {user_id: (роль, id преподавателя)}, который перестраивается только при смене
+    данных TeacherDataHandler (id преподавателей зависят от загруженной структуры).
+
+    Файл ролей изменяется под блокировкой общего хранилища обработчика (если оно подключено)
+    поверх его актуального содержимого, а изменения других процессов бота перечитываются
+    при смене сигнатуры файла (не чаще check_interval).
+    """
+
+    def __init__(self, file_path, handler, admin_ids=(), check_interval: float = 1.0):
+        self.file_path = Path(file_path)
+        self.handler = handler
+        self.admin_ids = set(admin_ids)  # администраторы из конфигурации
+        self.check_interval = check_interval
+        self.roles = {}  # {user_id: {"role": str, "teacher": str}}
+        self.signature = None  # сигнатура файла ролей при последнем чтении или записи
+        self.last_check = 0.0
+        self.cache = {}
+        self.cache_links = None  # data_links, для которых построен кэш
+        self.load()
+
+    def load(self):
+        signature = file_signature(self.file_path)
+        if signature is not None:
+            self.roles = read_roles(self.file_path)
+        self.signature = signature
+        self.rebuild()
+
+    def refresh(self):
+        """Перечитывание файла ролей, измененного другим процессом."""
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        if file_signature(self.file_path) != self.signature:
+            self.load()
+
+    def locked(self):
+        """Блокировка общего хранилища обработчика на время изменения файла ролей."""
+        store = self.handler.store
+        return store.lock if store is not None else nullcontext()
+
+    def rebuild(self):
+        """Построение кэша разрешений для текущих данных преподавателей."""
+        cache = {}
+        for user_id, item in self.roles.items():
+            id_t = None
+            if item["role"] == TEACHER:
+                id_t = self.handler.get_teacher_by_name(item.get("teacher", ""))
+                if id_t is None:
+                    logger.warning(f"Преподаватель '{item.get('teacher')}' пользователя {user_id} не найден.")
+            cache[user_id] = (item["role"], id_t)
+        for user_id in self.admin_ids:
+            cache[user_id] = (ADMIN, None)
+        self.cache = cache
+        self.cache_links = self.handler.data_links
+
+    def get(self, user_id: int) -> tuple:
+        """(роль, id преподавателя) пользователя, либо (None, None)."""
+        self.refresh()
+        if self.cache_links is not self.handler.data_links:
+            self.rebuild()  # данные были перезагружены
+        return self.cache.get(user_id, (None, None))
+
+    def is_admin(self, user_id: int) -> bool:
+        return self.get(user_id)[0] == ADMIN
+
+    def can_view(self, user_id: int) -> bool:
+        """Доступ к просмотру преподавателей и студентов."""
+        return self.get(user_id)[0] is not None
+
+    def can_view_teacher(self, user_id: int, id_t: int) -> bool:
+        role, own_id = self.get(user_id)
+        return role in (ADMIN, READER) or (role == TEACHER and own_id == id_t)
+
+    def can_edit_teacher(self, user_id: int, id_t: int) -> bool:
+        """Изменение статусов студентов преподавателя id_t."""
+        role, own_id = self.get(user_id)
+        return role == ADMIN or (role == TEACHER and own_id == id_t)
+
+    def visible_teachers(self, user_id: int) -> list[int]:
+        """id преподавателей, доступных пользователю для выбора."""
+        role, own_id = self.get(user_id)
+        if role in (ADMIN, READER):
+            return self.handler.get_teachers_id()
+        if role == TEACHER and own_id is not None:
+            return [own_id]
+        return []
+
+    def teacher_users(self, id_t: int) -> list[int]:
+        """Пользователи с ролью преподавателя id_t (получатели напоминаний)."""
+        self.refresh()
+        if self.cache_links is not self.handler.data_links:
+            self.rebuild()
+        return [user_id for user_id, (role, own_id) in self.cache.items() if role == TEACHER and own_id == id_t]
+
+    def grant(self, user_id: int, role: str, teacher_name: str = None) -> bool:
+        """Назначение роли пользователю с сохранением в файл."""
+        if role not in ROLES:
+            return False
+        if role == TEACHER and self.handler.get_teacher_by_name(teacher_name) is None:
+            return False
+        item = {"role": role}
+        if role == TEACHER:
+            item["teacher"] = teacher_name
+        with self.locked():
+            self.load()  # роли, назначенные другими процессами
+            self.roles[user_id] = item
+            self.rebuild()
+            return self.save()
+
+    def revoke(self, user_id: int) -> bool:
+        with self.locked():
+            self.load()
+            if self.roles.pop(user_id, None) is None:
+                return False
+            self.rebuild()
+            return self.save()
+
+    def save(self) -> bool:
+        try:
+            save_json(self.file_path, {str(user_id): item for user_id, item in self.roles.items()})
+            self.signature = file_signature(self.file_path)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении ролей в файл {self.file_path}: {e}")
+            return False
@@ -0,0 +1,101 @@
+import time
+import logging
+from pathlib import Path
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from src.status_control_bot.utils import file_signature, get_important_info, load_json, save_json, write_info
+
+
+logger = logging.getLogger(__name__)
+
+
+class AnnouncementBoard:
+    """
+    Хранение важной информации в памяти. Основное сообщение берется из info_file и
+    перечитывается только при изменении его mtime/размера. Дополнительные объявления
+    имеют срок действия и хранятся в extra_file (json).
+
+    Если extra_file используют несколько процессов бота (lock - coordination.FileLock),
+    объявления изменяются под блокировкой поверх актуального содержимого файла и, как основное
+    сообщение, перечитываются при изменении файла.
+    """
+
+    def __init__(self, info_file, extra_file=None, check_interval: float = 1.0, lock=None):
+        self.info_file = info_file
+        self.extra_file = extra_file
+        self.check_interval = check_interval  # не чаще одного stat() за интервал
+        self.lock = lock
+        self.main_text = ""
+        self.main_signature = None
+        self.last_check = 0.0
+        self.extra = []  # [{"text": str, "expires": iso-строка или None}]
+        self.extra_signature = None
+        self.revalidate(force=True)
+
+    def revalidate(self, force=False):
+        """Перечитывание основного сообщения и объявлений, если файлы изменились."""
+        now = time.monotonic()
+        if not force and now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        if self.extra_file is not None and file_signature(self.extra_file) != self.extra_signature:
+            self.load_extra()
+        signature = file_signature(self.info_file)
+        if signature == self.main_signature:
+            return
+        self.main_signature = signature
+        self.main_text = get_important_info(self.info_file) if signature else ""
+
+    def set_main(self, text: str) -> bool:
+        """Запись нового основного сообщения в файл и в память."""
+        if not write_info(self.info_file, text):
+            return False
+        self.main_text = text
+        self.main_signature = file_signature(self.info_file)
+        return True
+
+    def load_extra(self):
+        if self.extra_file is None or not Path(self.extra_file).exists():
+            return
+        self.extra_signature = file_signature(self.extra_file)
+        data = load_json(self.extra_file)
+        self.extra = data if isinstance(data, list) else []
+
+    def update_extra(self, change) -> bool:
+        """Изменение объявлений change([объявление, ...]) -> [объявление, ...] поверх актуального содержимого файла."""
+        with self.lock if self.lock is not None else nullcontext():
+            self.load_extra()  # объявления других процессов
+            self.extra = change(self.extra)
+            return self.save_extra()
+
+    def add(self, text: str, hours: float = None) -> bool:
+        """Добавление объявления со сроком действия (в часах), None - бессрочно."""
+        expires = None if hours is None else (datetime.now() + timedelta(hours=hours)).isoformat(timespec="minutes")
+        return self.update_extra(lambda extra: [*extra, {"text": text, "expires": expires}])
+
+    def clear(self) -> bool:
+        """Удаление всех дополнительных объявлений."""
+        return self.update_extra(lambda extra: [])
+
+    def save_extra(self) -> bool:
+        if self.extra_file is None:
+            return True
+        try:
+            save_json(self.extra_file, self.extra)
+            self.extra_signature = file_signature(self.extra_file)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении объявлений в файл {self.extra_file}: {e}")
+            return False
+
+    def get_text(self) -> str:
+        """Текущая важная информация: основное сообщение и действующие объявления."""
+        self.revalidate()
+        now = datetime.now().isoformat(timespec="minutes")
+        active = [item for item in self.extra if not item["expires"] or item["expires"] > now]
+        if len(active) != len(self.extra):
+            # Просроченные удаляем лениво
+            self.update_extra(lambda extra: [item for item in extra if not item["expires"] or item["expires"] > now])
+        parts = [self.main_text] if self.main_text else []
+        parts.extend(item["text"] for item in active)
+        return "\n".join(parts)
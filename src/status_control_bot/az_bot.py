@@ -1,16 +1,41 @@
+import time
+import asyncio
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import date
+from collections import defaultdict
 from warnings import filterwarnings
 from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
-from src.status_control_bot.utils import get_important_info, write_info
-from src.status_control_bot.rate_limiter import RateLimiter
-from src.status_control_bot.config import BASE_DIR, DATA_DIR, API_BOT_TOKEN
+from src.status_control_bot.data_watcher import DataWatcher
+from src.status_control_bot.announcements import AnnouncementBoard
+from src.status_control_bot.registration import RegistrationQueue, APPROVED
+from src.status_control_bot.access_control import AccessControl, ROLES, READER, TEACHER as ROLE_TEACHER, read_roles
+from src.status_control_bot.rate_limiter import RateLimiter, TokenBucket
+from src.status_control_bot.reminders import ReminderScheduler
+from src.status_control_bot.dispatcher import OutboundDispatcher
+from src.status_control_bot.menu_render import MenuRenderer
+from src.status_control_bot.search import StudentSearch
+from src.status_control_bot.registry import DatasetRegistry, Tenant
+from src.status_control_bot.coordination import SharedStore, FileLock
+from src.status_control_bot.consistency import ConsistencyScanner
+from src.status_control_bot.schema_evolution import StatusCompactor
+from src.status_control_bot.log_setup import setup_logging, with_log_context
+from src.status_control_bot.metrics import METRICS
+from src.status_control_bot.importer import import_csv_stream, format_report
+from src.status_control_bot.offload import JobPool
+from src.status_control_bot.reports import build_report
+from src.status_control_bot.student_query import StudentQuery, Condition, EMPTY, FILLED, EQUALS, BEFORE, SINCE, \
+    SORT_NAME, SORT_GROUP, SORT_TEACHER
+from src.status_control_bot.config import DATA_DIR, API_BOT_TOKEN, DATA_RELOAD_INTERVAL, ADMIN_IDS, \
+    LOG_LEVEL, LOG_JSON, LOG_FILE, SNAPSHOT_FILE, METRICS_ENABLED, METRICS_PORT, METRICS_DUMP_FILE, \
+    METRICS_DUMP_INTERVAL, REMINDER_INTERVAL, REMINDER_REPEAT, SEND_RATE, SEARCH_CACHE_TTL, DATASETS, \
+    DATASET_IDLE_TIMEOUT, DATASET_MAX_LOADED, SHARED_STORE, POOL_WORKERS, CONSISTENCY_INTERVAL, CONSISTENCY_REPAIR, \
+    STATUS_COMPACT_INTERVAL, STATUS_COMPACT_BATCH
 from src.status_control_bot.ui_text import ui_data as UI_TEXT
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, ReplyKeyboardMarkup, CallbackQuery
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, ReplyKeyboardMarkup, CallbackQuery, \
+    InlineQueryResultArticle, InputTextMessageContent, InlineQueryResultsButton
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, \
-    CallbackQueryHandler, ConversationHandler
-from logging.handlers import RotatingFileHandler
+    CallbackQueryHandler, ConversationHandler, InlineQueryHandler
 from telegram.warnings import PTBUserWarning
 
 
@@ -26,6 +51,7 @@ from telegram.warnings import PTBUserWarning
                 1.2.1.N+1 Назад
             1.2.N ...
             1.2.N+1 Назад
+        1.3 Массовое изменение статуса (отметка студентов, группы или всех сразу).
     1.N ...
     1.N+1 Назад.
 2. Просмотр всех студентов. (B1)
@@ -40,6 +66,14 @@ from telegram.warnings import PTBUserWarning
     1 /start
         1.1 /stop Остановка на любом этапе
         1.2 /message Ввод важного сообщения, которое будет показываться всем при начале работы (из главного меню)
+        1.3 /announce <часы> <текст> Временное объявление, /announce clear - удалить все
+    2 /requests Перечень запросов на регистрацию (администратор)
+    3 /approve <id> Подтверждение запроса на регистрацию (администратор)
+    4 /grant <id> <admin|teacher|reader> [преподаватель], /revoke <id> Управление ролями (администратор)
+    5 /broadcast [текст] Рассылка всем зарегистрированным пользователям, без текста - важная информация (администратор)
+    6 Отправка файла .csv (ФИО;статус;значение) - импорт значений статусов (администратор)
+    7 @<бот> <ФИО, группа или преподаватель> Inline-поиск студента, /student <id> - меню статусов студента
+    8 /dataset [имя] Выбор набора данных (подразделения) пользователя, в группе - чата (администратор)
 """
 
 # TODO: добавить высчитывание статуса группы
@@ -50,23 +84,15 @@ from telegram.warnings import PTBUserWarning
 # region Инициализация
 # Файл с важной информацией для отображения
 INFO_FILE = Path.joinpath(DATA_DIR, "important_info.txt")
-REG_FILE = Path.joinpath(DATA_DIR, "registration_data.txt")
-
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        RotatingFileHandler(
-            "teacher_bot.log",
-            maxBytes=5 * 1024 * 1024,  # максимальный размер 5 Мб
-            backupCount=3,  # количество логбэков 3
-            encoding="utf-8"
-        )
-    ]
-)
+REG_FILE = Path.joinpath(DATA_DIR, "registration_data.json")
+REG_FILE_LEGACY = Path.joinpath(DATA_DIR, "registration_data.txt")
+ANNOUNCEMENTS_FILE = Path.joinpath(DATA_DIR, "announcements.json")
+ROLES_FILE = Path.joinpath(DATA_DIR, "roles.json")
+SELECTIONS_FILE = Path.joinpath(DATA_DIR, "datasets.json")
+
+
+# Настройка логирования (запись в файл выполняется фоновым потоком)
+log_listener = setup_logging(level=LOG_LEVEL, log_file=LOG_FILE, json_format=LOG_JSON)
 
 
 # Отключаем шумные логи httpx
@@ -77,6 +103,16 @@ logger = logging.getLogger(__name__)
 filterwarnings(action="ignore", message=r".*CallbackQueryHandler", category=PTBUserWarning)
 
 # Состояния, этапы
+STATE_NAMES = {}  # {состояние: имя} для логов
+
+
+def state_names(start: int, names: tuple) -> list:
+    """Состояния chr(start), chr(start + 1), ... для имен names (записываются в STATE_NAMES)."""
+    states = [chr(start + i) for i in range(len(names))]
+    STATE_NAMES.update(zip(states, names))
+    return states
+
+
 # Начальный уровень
 (
     DUMMY,
@@ -87,7 +123,16 @@ filterwarnings(action="ignore", message=r".*CallbackQueryHandler", category=PTBU
     START_OVER,
     AWAIT_IMP_MSG,
     REGISTRATION,
-) = map(chr, range(8))
+) = state_names(0, (
+    "DUMMY",
+    "STOPPING",
+    "SELECTING_ACTION",
+    "SELECT_TEACHER",
+    "VIEW_ALL",
+    "START_OVER",
+    "AWAIT_IMP_MSG",
+    "REGISTRATION",
+))
 
 # Меню преподавателя - c возможностью редактирования
 (
@@ -99,19 +144,127 @@ filterwarnings(action="ignore", message=r".*CallbackQueryHandler", category=PTBU
     TEACHERS_STUDENT_SELECT,
     TEACHERS_STUDENT_IS_SET,
     TEACHERS_STUDENT_CHANGE_STATUS,
-) = map(chr, range(10, 18))
+) = state_names(10, (
+    "TEACHER",
+    "STUDENT",
+    "STATUS",
+    "TEACHER_IS_SET",
+    "TEACHERS_STUDENTS",
+    "TEACHERS_STUDENT_SELECT",
+    "TEACHERS_STUDENT_IS_SET",
+    "TEACHERS_STUDENT_CHANGE_STATUS",
+))
 
 # Просмотр студентов
 (
     VIEW_LIST_STUDENTS,
     VIEW_BY_GROUP,
-) = map(chr, range(20, 22))
+    VIEW_FILTER,
+    FILTER,
+) = state_names(20, (
+    "VIEW_LIST_STUDENTS",
+    "VIEW_BY_GROUP",
+    "VIEW_FILTER",
+    "FILTER",
+))
+
+# Массовое изменение статуса
+(
+    BULK_SELECT,
+    BULK_STATUS,
+    BULK_VALUE,
+    BULK_IDS,
+) = state_names(30, (
+    "BULK_SELECT",
+    "BULK_STATUS",
+    "BULK_VALUE",
+    "BULK_IDS",
+))
 
 # Завершение обработчика
 END = ConversationHandler.END
+STATE_NAMES[END] = "END"
+
+# Метрики обработчиков и хранилища (при отключении обертки не устанавливаются)
+METRICS.enabled = METRICS_ENABLED
+if METRICS.enabled:
+    METRICS.instrument_class(TeacherDataHandler, exclude=("dummy",))
+
+
+def roles_file(name: str) -> Path:
+    """Файл ролей набора данных: ROLES_FILE у набора по умолчанию, roles_<имя>.json у остальных."""
+    return ROLES_FILE if name == next(iter(DATASETS)) else Path.joinpath(DATA_DIR, f"roles_{name}.json")
+
+
+def create_tenant(name: str, teachers_file) -> Tenant:
+    """Загрузка набора данных подразделения. У каждого набора свои снимок и файл ролей (кроме первого)."""
+    teachers_file = Path(teachers_file)
+    default = name == next(iter(DATASETS))
+    snapshot_file = None
+    if SNAPSHOT_FILE:
+        snapshot_file = SNAPSHOT_FILE if default else str(teachers_file.with_suffix(".snapshot"))
+    handler = TeacherDataHandler(teachers_file, snapshot_file=snapshot_file)
+    if SHARED_STORE:
+        handler.store = SharedStore(handler)
+    return Tenant(
+        name,
+        handler,
+        access=AccessControl(roles_file(name), handler, ADMIN_IDS),
+        search=StudentSearch(handler, ttl=SEARCH_CACHE_TTL),
+        watcher=DataWatcher(handler, interval=DATA_RELOAD_INTERVAL) if DATA_RELOAD_INTERVAL > 0 else None,
+        store=handler.store,
+        consistency=ConsistencyScanner(handler, interval=CONSISTENCY_INTERVAL, repair=CONSISTENCY_REPAIR)
+        if CONSISTENCY_INTERVAL > 0 else None,
+        compactor=StatusCompactor(handler, interval=STATUS_COMPACT_INTERVAL, batch=STATUS_COMPACT_BATCH)
+        if STATUS_COMPACT_INTERVAL > 0 else None,
+    )
+
+
+# Наборы данных подразделений, набор по умолчанию загружается при запуске
+registry = DatasetRegistry(DATASETS, create_tenant, SELECTIONS_FILE, idle_timeout=DATASET_IDLE_TIMEOUT,
+                           max_loaded=DATASET_MAX_LOADED)
+registry.get()
 
-# Класс-обработчик данных преподавателей
-tcr_handler = TeacherDataHandler(Path.joinpath(BASE_DIR, "data/students/teachers.json"))
+# Обработчик данных преподавателей, роли пользователей и поиск студентов набора данных текущего
+# пользователя (вне обработчиков - набора по умолчанию)
+tcr_handler = registry.proxy("handler")
+access = registry.proxy("access")
+student_search = registry.proxy("search")
+
+# Блокировка общих для наборов данных файлов (объявления, запросы на регистрацию), если каталог
+# данных используют несколько процессов бота
+shared_files_lock = FileLock(Path.joinpath(DATA_DIR, ".shared.lock")) if SHARED_STORE else None
+
+# Важная информация, хранится в памяти
+board = AnnouncementBoard(INFO_FILE, ANNOUNCEMENTS_FILE, lock=shared_files_lock)
+
+# Запросы на регистрацию
+registrations = RegistrationQueue(REG_FILE, legacy_file=REG_FILE_LEGACY, lock=shared_files_lock)
+
+# Напоминания о просроченных статусах (отправка ограничена общим лимитом сообщений). История
+# отправки хранится отдельно от наборов данных, чтобы выгрузка набора не приводила к повторам
+send_bucket = TokenBucket(rate=SEND_RATE)
+reminder_history = defaultdict(dict)  # {набор данных: {chat_id: время}}
+
+# Очередь рассылок (общий лимит отправки с напоминаниями)
+dispatcher = OutboundDispatcher(send_bucket)
+
+# Отрисовка меню без повторной отправки неизмененного содержимого
+menu = MenuRenderer()
+
+# Inline-поиск студентов (результатов на страницу, не более 50 по ограничению Telegram)
+INLINE_PAGE_SIZE = 20
+
+# Фильтр студентов: студентов на странице результатов, вариантов (преподавателей, групп, статусов) на странице выбора
+FILTER_PAGE_SIZE = 15
+FILTER_OPTIONS_PAGE_SIZE = 20
+
+# Пул процессов для отчетов и импорта; фоновые задания пользователей {user_id: asyncio.Task}
+# (одно на пользователя, отменяются кнопкой "Назад"), интервал обновления сообщения о ходе (сек.)
+job_pool = JobPool(POOL_WORKERS)
+background_jobs = {}
+JOB_CANCEL = "job_cancel"
+JOB_PROGRESS_INTERVAL = 1.0
 
 # endregion
 
@@ -129,6 +282,9 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def imp_msg_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Ввод важного сообщения"""
+    if not access.is_admin(update.effective_user.id):
+        await update.message.reply_text("Недостаточно прав.")
+        return None
     await update.message.reply_text("Введите общую важную ❗ информацию для всех:")
     # Меняем состояние
     return AWAIT_IMP_MSG
@@ -137,7 +293,7 @@ async def imp_msg_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 async def imp_msg_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Получение и обработка важного сообщения"""
     user_input = update.message.text.strip()  # Получаем текст от пользователя
-    success = write_info(INFO_FILE, user_input)  # Пробуем записать сообщение
+    success = board.set_main(user_input)  # Пробуем записать сообщение
     text = f"✅ Сообщение обновлено на:\n{user_input}" if success else "❌ Ошибка записи."
 
     # Отправляем результат
@@ -145,18 +301,36 @@ async def imp_msg_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     return SELECTING_ACTION
 
 
+async def announce(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Добавление временного объявления: /announce <часы> <текст>, /announce clear - удалить все."""
+    if not access.is_admin(update.effective_user.id):
+        await update.message.reply_text("Недостаточно прав.")
+        return
+    args = context.args or []
+    if args == ["clear"]:
+        success = board.clear()
+        text = "✅ Объявления удалены." if success else "❌ Ошибка записи."
+    elif len(args) >= 2 and args[0].replace(".", "", 1).isdigit() and float(args[0]) > 0:
+        success = board.add(" ".join(args[1:]), hours=float(args[0]))
+        text = f"✅ Объявление добавлено на {args[0]} ч." if success else "❌ Ошибка записи."
+    else:
+        text = "Формат: /announce <часы> <текст> (часы больше 0), либо /announce clear"
+    await update.message.reply_text(text)
+
+
 async def reg_in(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
-    """Запись в файл регистрационных данных."""
+    """Постановка запроса на регистрацию в очередь (запись в файл - периодически)."""
     query = update.callback_query
     user = query.from_user
 
     if user:
-        current_time = datetime.now().strftime("%Y.%m.%d, %H:%M")
-        user_data = (f"{current_time}, {user.id}, {user.first_name or ''}, {user.last_name or ''}\n")
-
-        # Добавляем строку в файл
-        write_info(REG_FILE, user_data, mode='a')
-        text = "Запрос на регистрацию принят."
+        item = registrations.get(user.id)
+        if item and item["status"] == APPROVED:
+            text = "Вы уже зарегистрированы."
+        elif registrations.submit(user.id, user.first_name, user.last_name, user.username):
+            text = "Запрос на регистрацию принят."
+        else:
+            text = "Запрос на регистрацию уже был принят ранее, ожидайте подтверждения."
     else:
         text = "Во время вашей регистрации возникла ошибка. Свяжитесь с Саидовой А.В."
 
@@ -164,11 +338,185 @@ async def reg_in(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     keyboard = InlineKeyboardMarkup(buttons)
 
     await update.callback_query.answer()
-    await update.callback_query.edit_message_text(text=text, reply_markup=keyboard)
+    await menu.edit_query(update.callback_query, text=text, reply_markup=keyboard)
 
     return REGISTRATION
 
 
+async def list_requests(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Перечень ожидающих подтверждения запросов на регистрацию (только для администраторов)."""
+    if not access.is_admin(update.effective_user.id):
+        return
+    pending = registrations.pending()
+    if pending:
+        lines = [f"• {item['user_id']}: {item['first_name']} {item['last_name']} "
+                 f"{'@' + item['username'] if item['username'] else ''} ({item['created']})" for item in pending]
+        text = "Запросы на регистрацию:\n" + "\n".join(lines) + "\nПодтверждение: /approve <id>"
+    else:
+        text = "Нет запросов на регистрацию."
+    await update.message.reply_text(text)
+
+
+async def approve_request(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Подтверждение запроса на регистрацию с выдачей роли 'только просмотр': /approve <id>
+    (только для администраторов)."""
+    if not access.is_admin(update.effective_user.id):
+        return
+    args = context.args or []
+    if len(args) != 1 or not args[0].isdigit():
+        await update.message.reply_text("Формат: /approve <id>")
+        return
+    user_id = int(args[0])
+    if registrations.approve(user_id):
+        if access.get(user_id)[0] is None:
+            access.grant(user_id, READER)
+        text = f"✅ Запрос {args[0]} подтвержден."
+    else:
+        text = f"❌ Запрос {args[0]} не найден, либо уже подтвержден."
+    await update.message.reply_text(text)
+
+
+async def grant_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Назначение роли: /grant <id> <admin|teacher|reader> [имя преподавателя] (только для администраторов)."""
+    if not access.is_admin(update.effective_user.id):
+        return
+    args = context.args or []
+    if len(args) < 2 or not args[0].isdigit() or args[1] not in ROLES:
+        await update.message.reply_text(f"Формат: /grant <id> <{'|'.join(ROLES)}> [имя преподавателя]")
+        return
+    teacher_name = " ".join(args[2:]) if args[1] == ROLE_TEACHER else None
+    if access.grant(int(args[0]), args[1], teacher_name):
+        text = f"✅ Пользователю {args[0]} назначена роль '{args[1]}'."
+    else:
+        text = "❌ Ошибка назначения роли (проверьте имя преподавателя)."
+    await update.message.reply_text(text)
+
+
+async def revoke_role(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отзыв роли: /revoke <id> (только для администраторов)."""
+    if not access.is_admin(update.effective_user.id):
+        return
+    args = context.args or []
+    if len(args) != 1 or not args[0].isdigit():
+        await update.message.reply_text("Формат: /revoke <id>")
+        return
+    text = f"✅ Роль пользователя {args[0]} отозвана." if access.revoke(int(args[0])) else "❌ Роль не найдена."
+    await update.message.reply_text(text)
+
+
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Рассылка сообщения всем зарегистрированным пользователям и пользователям с ролями во всех
+    наборах данных: /broadcast [текст] (только для администраторов). Без текста рассылается
+    текущая важная информация."""
+    if not access.is_admin(update.effective_user.id):
+        return
+    text = " ".join(context.args or []) or board.get_text()
+    if not text:
+        await update.message.reply_text("Формат: /broadcast <текст>, либо задайте важную информацию через /message")
+        return
+    # Роли всех наборов данных читаются из файлов, без загрузки наборов
+    role_users = await asyncio.to_thread(lambda: {user_id for name in registry.names()
+                                                  for user_id in read_roles(roles_file(name))})
+    recipients = {*registrations.approved(), *role_users, *ADMIN_IDS}
+    status_message = await update.message.reply_text(f"Рассылка: 0/{len(recipients)}")
+
+    async def on_progress(item):
+        await status_message.edit_text(f"Рассылка: {item.processed}/{item.total}, ошибок: {item.failed}"
+                                       + (" ✅" if item.processed >= item.total else ""))
+
+    dispatcher.submit(recipients, text, on_progress=on_progress)
+
+
+async def select_dataset(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Выбор набора данных (подразделения): /dataset [имя]. Без имени - перечень наборов.
+    В группе выбор действует для всего чата и доступен только администраторам."""
+    key = registry.key_for(update)
+    name = " ".join(context.args or [])
+    if not name:
+        current = registry.selected(key)
+        lines = [f"{'▶' if item == current else '•'} {item}" for item in registry.names()]
+        await update.message.reply_text("Наборы данных:\n" + "\n".join(lines) + "\nВыбор: /dataset <имя>")
+        return
+    if update.effective_chat.type != "private" and not access.is_admin(update.effective_user.id):
+        return
+    if not registry.select(key, name):
+        await update.message.reply_text("❌ Набор данных не найден.")
+        return
+    # Идентификаторы преподавателей и студентов в диалоге относятся к прежнему набору
+    context.user_data.clear()
+    await update.message.reply_text(f"✅ Выбран набор данных '{name}'. Начните заново: /start")
+
+
+def start_job(update: Update, context: ContextTypes.DEFAULT_TYPE, coroutine) -> asyncio.Task:
+    """Запуск фонового задания пользователя (предыдущее задание пользователя отменяется)."""
+    user_id = update.effective_user.id
+    cancel_job(user_id)
+    task = background_jobs[user_id] = context.application.create_task(coroutine, update=update)
+    task.add_done_callback(lambda item: background_jobs.pop(user_id) if background_jobs.get(user_id) is item else None)
+    return task
+
+
+def cancel_job(user_id: int) -> bool:
+    task = background_jobs.pop(user_id, None)
+    if task is None or task.done():
+        return False
+    task.cancel()
+    return True
+
+
+def progress_reporter(edit, text: str):
+    """async функция (готово, всего), обновляющая сообщение о ходе задания не чаще JOB_PROGRESS_INTERVAL."""
+    last = [0.0]
+
+    async def on_progress(done, total):
+        now = time.monotonic()
+        if done < total and now - last[0] < JOB_PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        await edit(f"{text}: {done}/{total}")
+
+    return on_progress
+
+
+async def cancel_background_job(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Кнопка "Назад" в сообщении о ходе задания вне диалога (импорт)."""
+    cancelled = cancel_job(update.effective_user.id)
+    await update.callback_query.answer("Отменено." if cancelled else "Задание уже завершено.")
+
+
+async def import_statuses(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Импорт значений статусов из присланного CSV-файла (только для администраторов). Нечеткое
+    сопоставление имен выполняется в пуле процессов, до начала записи импорт отменяется кнопкой "Назад".
+    """
+    if not access.is_admin(update.effective_user.id):
+        return
+    file = await update.message.document.get_file()
+    raw = bytes(await file.download_as_bytearray())
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(text="Назад", callback_data=JOB_CANCEL)]])
+    status_message = await update.message.reply_text("Импорт: сопоставление имен...", reply_markup=keyboard)
+    start_job(update, context, run_import(status_message, raw, keyboard))
+
+
+async def run_import(status_message, raw: bytes, keyboard) -> None:
+    async def edit(text, reply_markup=keyboard):
+        await menu.edit(status_message.get_bot(), status_message.chat_id, status_message.message_id, text,
+                        reply_markup=reply_markup)
+
+    try:
+        report = await import_csv_stream(tcr_handler, raw, job_pool,
+                                         on_progress=progress_reporter(edit, "Импорт: сопоставлено имен"))
+    except asyncio.CancelledError:
+        await edit("Импорт отменен, изменения не внесены.", None)
+        raise
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error(f"Ошибка импорта CSV: {e}")
+        text = f"❌ Ошибка импорта: {e}"
+    else:
+        text = "✅ Импорт выполнен.\n" + format_report(report)
+    await edit(text, None)
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Выбрать действие начального уровня ."""
     text = (UI_TEXT["start"])
@@ -177,6 +525,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
         [InlineKeyboardButton(text="Регистрация", callback_data=str(REGISTRATION))],
         [InlineKeyboardButton(text="Выбор преподавателя", callback_data=str(SELECT_TEACHER))],
         [InlineKeyboardButton(text="Просмотр всех студентов", callback_data=str(VIEW_ALL))],
+        [InlineKeyboardButton(text="Поиск студента", switch_inline_query_current_chat="")],
         [InlineKeyboardButton(text="Завершить", callback_data=str(END))],
     ]
     keyboard = InlineKeyboardMarkup(buttons)
@@ -184,12 +533,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     # Если начинаем заново, то нет необходимости отправлять первое сообщение
     if context.user_data.get(START_OVER):
         await update.callback_query.answer()
-        await update.callback_query.edit_message_text(text=text, reply_markup=keyboard)
+        await menu.edit_query(update.callback_query, text=text, reply_markup=keyboard)
     else:
-        await update.message.reply_text(
-            f"{get_important_info(INFO_FILE)}"
-        )
-        await update.message.reply_text(text=text, reply_markup=keyboard)
+        info = board.get_text()
+        if info:
+            await update.message.reply_text(info)
+        message = await update.message.reply_text(text=text, reply_markup=keyboard)
+        menu.remember(message, text, keyboard)
     context.user_data[START_OVER] = False
     return SELECTING_ACTION
 
@@ -204,12 +554,13 @@ async def end(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Завершение чата через GUI InlineKeyboardButton."""
     await update.callback_query.answer()
     text = "Вы завершили работу."
-    await update.callback_query.edit_message_text(text=text)
+    await menu.edit_query(update.callback_query, text=text)
     return END
 
 
 async def back_to_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Возврат к начальному уровню."""
+    """Возврат к начальному уровню (фоновое задание пользователя отменяется)."""
+    cancel_job(update.effective_user.id)
     if context.user_data:
         context.user_data.clear()
     context.user_data[START_OVER] = True
@@ -220,6 +571,7 @@ async def back_to_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 async def stop_nested(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Завершение чата из любого статуса."""
     await update.message.reply_text("Работа остановлена.")
+    cancel_job(update.effective_user.id)
     if context.user_data:
         context.user_data.clear()
 
@@ -232,9 +584,13 @@ async def stop_nested(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str
 
 async def select_teacher(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Выбор конкретного преподавателя."""
+    teachers_id = access.visible_teachers(update.effective_user.id)  # доступные идентификаторы учителей
+    if not teachers_id:
+        await update.callback_query.answer("Нет доступа. Пройдите регистрацию.", show_alert=True)
+        return None
+
     # Создаем кнопки с именами преподавателей в две колонки
     teacher_buttons = []
-    teachers_id = tcr_handler.get_teachers_id()  # идентификаторы учителей
     teachers_pb = [InlineKeyboardButton(tcr_handler.get_teacher_by_id(
         item), callback_data=f"teacher_{item}") for item in teachers_id]
     # Перегруппируем кнопки попарно
@@ -249,12 +605,12 @@ async def select_teacher(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     teacher_buttons.append([InlineKeyboardButton(text="Назад", callback_data=str(END))])
     keyboard = InlineKeyboardMarkup(teacher_buttons)
     await update.callback_query.answer()
-    await update.callback_query.edit_message_text(text="Выберите преподавателя:", reply_markup=keyboard)
+    await menu.edit_query(update.callback_query, text="Выберите преподавателя:", reply_markup=keyboard)
 
     return SELECT_TEACHER
 
 
-def create_teacher_menu(context, add_text=None, with_view_student=False) -> tuple[str, InlineKeyboardMarkup]:
+def create_teacher_menu(context, add_text=None, with_view_student=False, editable=False) -> tuple[str, InlineKeyboardMarkup]:
     # Получаем обязательные данные из контекста
     id_t = context.user_data[TEACHER]
     if id_t is None:
@@ -266,6 +622,8 @@ def create_teacher_menu(context, add_text=None, with_view_student=False) -> tupl
     buttons.append([InlineKeyboardButton("Выбор и редактирование студента", callback_data=str(TEACHERS_STUDENT_SELECT))])
     if with_view_student:
         buttons.append([InlineKeyboardButton("Просмотр моих студентов", callback_data=str(TEACHERS_STUDENTS))])
+    if editable:
+        buttons.append([InlineKeyboardButton("Массовое изменение статуса", callback_data=str(BULK_SELECT))])
     buttons.append([InlineKeyboardButton("Назад", callback_data=str(END))])
 
     # Формируем текст
@@ -284,17 +642,22 @@ async def teacher_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     if query.data.startswith("teacher_"):
         # Определяем кнопку, на которую нажали
         id_t = int(query.data.replace("teacher_", ""))  # конвертируем в int
+        if not access.can_view_teacher(update.effective_user.id, id_t):
+            await query.answer("Нет доступа.", show_alert=True)
+            return SELECT_TEACHER
         context.user_data[TEACHER] = id_t  # Сохраняем id преподавателя в user_data
 
     else:  # Нажали на кнопку назад из следующего меню
         id_t = context.user_data[TEACHER]
         if id_t is None:
-            await query.edit_message_text("Ошибка: преподаватель не выбран.")
+            await menu.edit_query(query, "Ошибка: преподаватель не выбран.")
             return STOPPING
 
-    text, keyboard = create_teacher_menu(context, add_text="Выберите действие:", with_view_student=True)
+    editable = access.can_edit_teacher(update.effective_user.id, id_t)
+    text, keyboard = create_teacher_menu(context, add_text="Выберите действие:", with_view_student=True,
+                                         editable=editable)
     await query.answer()
-    await query.edit_message_text(text=text, reply_markup=keyboard)
+    await menu.edit_query(query, text=text, reply_markup=keyboard)
 
     return TEACHER_IS_SET
 
@@ -314,7 +677,7 @@ async def select_teach_std(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     keyboard = InlineKeyboardMarkup(buttons)
 
     await update.callback_query.answer()
-    await update.callback_query.edit_message_text(
+    await menu.edit_query(update.callback_query,
         text=f"Преподаватель: {teacher_name}\nВыберите студента:",
         reply_markup=keyboard
     )
@@ -330,7 +693,7 @@ async def view_teach_std(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     id_t = context.user_data[TEACHER]
     # Проверка
     if id_t is None:
-        await query.edit_message_text("Ошибка: преподаватель не выбран.")
+        await menu.edit_query(query, "Ошибка: преподаватель не выбран.")
         return STOPPING
     ids_s = tcr_handler.get_teacher_students_by_id(id_t)
 
@@ -338,8 +701,9 @@ async def view_teach_std(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         f"• {tcr_handler.get_student_name_by_id(id_s)}" for id_s in ids_s) if ids_s else "У вас нет студентов😎"
     add_info = f"Мои студенты:\n{students_list}\nВыберите действие:"
 
-    text, keyboard = create_teacher_menu(context, add_text=add_info)
-    await query.edit_message_text(text=text, reply_markup=keyboard)
+    editable = access.can_edit_teacher(update.effective_user.id, id_t)
+    text, keyboard = create_teacher_menu(context, add_text=add_info, editable=editable)
+    await menu.edit_query(query, text=text, reply_markup=keyboard)
     return TEACHER_IS_SET
 
 
@@ -354,19 +718,20 @@ async def student_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     else:
         # Нажата "назад" либо после редактирования
         if context.user_data[STUDENT] is None:
-            await query.edit_message_text("Ошибка: студент не найден")
+            await menu.edit_query(query, "Ошибка: студент не найден")
             return STOPPING
 
     # Генерируем меню используя context
-    text, keyboard = create_student_menu(context)
+    editable = access.can_edit_teacher(update.effective_user.id, context.user_data[TEACHER])
+    text, keyboard = create_student_menu(context, editable)
 
     try:
-        await query.edit_message_text(
+        await menu.edit_query(query,
             text=text,
             reply_markup=keyboard
         )
     except Exception as e:
-        logging.error(f"Ошибка обновления сообщения: {e}")
+        logger.error("Ошибка обновления сообщения: %s", e)
         await query.message.reply_text("Ошибка: обновления интерфейса")
         return STOPPING
 
@@ -381,29 +746,52 @@ async def student_status_change(update: Update, context: ContextTypes.DEFAULT_TY
 
     # Проверяем наличие базовых данных
     if context.user_data[STUDENT] is None:
-        await query.edit_message_text("Ошибка: студент не найден")
+        await menu.edit_query(query, "Ошибка: студент не найден")
+        return STOPPING
+
+    if not access.can_edit_teacher(update.effective_user.id, context.user_data[TEACHER]):
+        await menu.edit_query(query, "Ошибка: недостаточно прав для изменения статуса.")
         return STOPPING
 
     # Сохраняем message_id перед любыми действиями
     context.user_data['last_message_id'] = query.message.message_id
 
     # Извлекаем выбранный статус
-    status_key = query.data.replace("status_", "")
+    status_key = query.data.removeprefix("status_")
     context.user_data[STATUS] = status_key
 
     # Смотрим какое у него название
     headers = tcr_handler.get_statuses()
     status_name = headers.get(status_key, None)
     if status_name is None:
-        await query.edit_message_text("Ошибка: статус не найден.")
+        await menu.edit_query(query, "Ошибка: статус не найден.")
         return STOPPING
 
-    await query.edit_message_text(
-        text=f"Введите новое значение для параметра '{status_name[0].lower() + status_name[1:]}':\nИли отправьте '/no' для отмены."
-    )
+    await menu.edit_query(query, text=status_value_prompt(status_key))
     return TEACHERS_STUDENT_CHANGE_STATUS
 
 
+def status_value_prompt(status_key, students=None) -> str:
+    """Запрос значения статуса с подсказкой формата по типу статуса."""
+    status_name = tcr_handler.get_statuses().get(status_key, status_key)
+    status_name = status_name[0].lower() + status_name[1:]
+    hint = tcr_handler.get_status_type(status_key).hint()
+    hint = f" ({hint})" if hint else ""
+    if students is None:
+        return f"Введите новое значение для параметра '{status_name}'{hint}:\nИли отправьте '/no' для отмены."
+    return f"Введите значение параметра '{status_name}'{hint} для {students} студентов:\nИли отправьте '/no' для отмены."
+
+
+async def reject_status_value(update: Update, context: ContextTypes.DEFAULT_TYPE, error, students=None) -> None:
+    """Некорректное значение: сообщение пользователя удаляется, запрос повторяется с описанием ошибки."""
+    try:
+        await context.bot.delete_message(update.effective_chat.id, update.message.message_id)
+    except Exception as e:
+        logger.error("Ошибка удаления сообщения: %s", e)
+    await menu.edit(context.bot, chat_id=update.effective_chat.id, message_id=context.user_data.get('last_message_id'),
+                    text=f"❌ Некорректное значение: {error}.\n{status_value_prompt(context.user_data[STATUS], students)}")
+
+
 async def input_status_value(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     # Ввод пользователя
     user_input = update.message.text.strip()
@@ -425,9 +813,20 @@ async def input_status_value(update: Update, context: ContextTypes.DEFAULT_TYPE)
     teacher_name = tcr_handler.get_teacher_by_id(teacher_id)
     student_name = tcr_handler.get_student_name_by_id(student_id)
 
+    # Проверка значения по типу статуса, при ошибке - повторный ввод
+    editable = access.can_edit_teacher(update.effective_user.id, teacher_id)
+    if user_input.lower() != '/no' and editable:
+        try:
+            tcr_handler.parse_status_value(status_key, user_input)
+        except ValueError as e:
+            await reject_status_value(update, context, e)
+            return TEACHERS_STUDENT_CHANGE_STATUS
+
     # Отмена
     if user_input.lower() == '/no':
         status_message = "❌ Изменение отменено"
+    elif not editable:
+        status_message = "❌ Недостаточно прав"
     else:
         # Изменение данных
         success = tcr_handler.change_student_status(teacher_name, student_name, status_key, user_input)
@@ -437,14 +836,14 @@ async def input_status_value(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         await context.bot.delete_message(chat_id, update.message.message_id)
     except Exception as e:
-        logging.error(f"Ошибка удаления сообщения: {e}")
+        logger.error("Ошибка удаления сообщения: %s", e)
 
     # Заново создаем меню "Выбора студента"
-    text, keyboard = create_student_menu(context)
+    text, keyboard = create_student_menu(context, editable)
     full_text = f"{status_message}\n{text}"
 
     # Редактируем исходное сообщение с новым меню
-    await context.bot.edit_message_text(
+    await menu.edit(context.bot,
         chat_id=chat_id,
         message_id=message_id,
         text=full_text,
@@ -458,7 +857,7 @@ async def input_status_value(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return TEACHERS_STUDENT_IS_SET
 
 
-def create_student_menu(context) -> tuple[str, InlineKeyboardMarkup]:
+def create_student_menu(context, editable=True) -> tuple[str, InlineKeyboardMarkup]:
     # Получаем обязательные данные из контекста
     teacher_id = context.user_data[TEACHER]
     student_id = context.user_data[STUDENT]
@@ -490,7 +889,9 @@ def create_student_menu(context) -> tuple[str, InlineKeyboardMarkup]:
     for key, value in data_s.items():
         if key in headers:
             h_key = headers[key]
-            text += f"{h_key}: {value}\n"
+            text += f"{h_key}: {tcr_handler.format_status_value(key, value)}\n"
+            if not editable:
+                continue
             buttons.append([
                 InlineKeyboardButton(
                     f"✍ {h_key[0].lower() + h_key[1:]}",
@@ -499,12 +900,216 @@ def create_student_menu(context) -> tuple[str, InlineKeyboardMarkup]:
             ])
 
     # Добавляем кнопку "Назад"
-    text += "---\nВыберите параметр для изменения:"
+    text += "---\nВыберите параметр для изменения:" if editable else "---\nТолько просмотр."
     buttons.append([InlineKeyboardButton("Назад", callback_data=str(TEACHERS_STUDENT_SELECT))])
 
     return text, InlineKeyboardMarkup(buttons)
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# region Массовое изменение
+def teacher_groups(id_t) -> dict[str, list[int]]:
+    """Студенты преподавателя, сгруппированные по группам {группа: [id_s, ...]}."""
+    teacher_name = tcr_handler.get_teacher_by_id(id_t)
+    groups = {}
+    for id_s in tcr_handler.get_teacher_students_by_id(id_t):
+        data_s = tcr_handler.get_student_data_by_name(teacher_name, tcr_handler.get_student_name_by_id(id_s))
+        groups.setdefault(data_s.get("group", "") or "-", []).append(id_s)
+    return dict(sorted(groups.items()))
+
+
+def create_bulk_menu(context) -> tuple[str, InlineKeyboardMarkup]:
+    """Меню множественного выбора студентов (флажки) с выбором группы целиком."""
+    id_t = context.user_data[TEACHER]
+    selected = context.user_data[BULK_IDS]
+    groups = teacher_groups(id_t)
+
+    buttons = [[InlineKeyboardButton("Выбрать всех", callback_data="bulk_all"),
+                InlineKeyboardButton("Снять все", callback_data="bulk_none")]]
+    group_buttons = [InlineKeyboardButton(f"Группа {group}", callback_data=f"bulk_g{i}")
+                     for i, group in enumerate(groups)]
+    buttons.extend(group_buttons[i:i + 2] for i in range(0, len(group_buttons), 2))
+    for ids_s in groups.values():
+        for id_s in ids_s:
+            mark = "☑" if id_s in selected else "☐"
+            buttons.append([InlineKeyboardButton(f"{mark} {tcr_handler.get_student_name_by_id(id_s)}",
+                                                 callback_data=f"bulk_s{id_s}")])
+    buttons.append([InlineKeyboardButton(f"Далее (выбрано: {len(selected)})", callback_data=str(BULK_STATUS))])
+    buttons.append([InlineKeyboardButton("Назад", callback_data=str(TEACHER_IS_SET))])
+
+    text = f"Преподаватель: {tcr_handler.get_teacher_by_id(id_t)}\nОтметьте студентов для изменения статуса:"
+    return text, InlineKeyboardMarkup(buttons)
+
+
+async def bulk_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Начало массового изменения статуса."""
+    query = update.callback_query
+    if not access.can_edit_teacher(update.effective_user.id, context.user_data.get(TEACHER)):
+        await query.answer("Недостаточно прав.", show_alert=True)
+        return TEACHER_IS_SET
+    id_t = context.user_data.get(TEACHER)
+    if context.user_data.get('bulk_teacher') != id_t:
+        # Отметки сохраняются только при возврате к выбору студентов того же преподавателя
+        context.user_data['bulk_teacher'] = id_t
+        context.user_data[BULK_IDS] = set()
+    else:
+        context.user_data[BULK_IDS] &= set(tcr_handler.get_teacher_students_by_id(id_t))
+    text, keyboard = create_bulk_menu(context)
+    await query.answer()
+    await menu.edit_query(query, text=text, reply_markup=keyboard)
+    return BULK_SELECT
+
+
+async def bulk_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Отметка студента, группы, всех или снятие всех отметок."""
+    query = update.callback_query
+    id_t = context.user_data[TEACHER]
+    selected = context.user_data[BULK_IDS]
+    action = query.data.removeprefix("bulk_")
+
+    if action == "all":
+        selected.update(tcr_handler.get_teacher_students_by_id(id_t))
+    elif action == "none":
+        selected.clear()
+    elif action.startswith("g"):
+        groups = list(teacher_groups(id_t).values())
+        index = int(action[1:])
+        if index < len(groups):
+            group = set(groups[index])
+            # Повторное нажатие снимает отметку с группы
+            if group <= selected:
+                selected.difference_update(group)
+            else:
+                selected.update(group)
+    elif action.startswith("s"):
+        selected.symmetric_difference_update({int(action[1:])})
+
+    text, keyboard = create_bulk_menu(context)
+    await query.answer()
+    await menu.edit_query(query, text=text, reply_markup=keyboard)
+    return BULK_SELECT
+
+
+async def bulk_choose_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Выбор статуса для отмеченных студентов."""
+    query = update.callback_query
+    if not context.user_data[BULK_IDS]:
+        await query.answer("Не выбрано ни одного студента.", show_alert=True)
+        return BULK_SELECT
+
+    buttons = [[InlineKeyboardButton(f"✍ {name[0].lower() + name[1:]}", callback_data=f"bulkstatus_{key}")]
+               for key, name in tcr_handler.get_statuses().items()]
+    buttons.append([InlineKeyboardButton("Назад", callback_data=str(BULK_SELECT))])
+    await query.answer()
+    await menu.edit_query(query, text=f"Выбрано студентов: {len(context.user_data[BULK_IDS])}\n"
+                                      "Выберите параметр для изменения:", reply_markup=InlineKeyboardMarkup(buttons))
+    return BULK_STATUS
+
+
+async def bulk_status_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Запрос значения для выбранного статуса."""
+    query = update.callback_query
+    status_key = query.data.removeprefix("bulkstatus_")
+    status_name = tcr_handler.get_statuses().get(status_key, None)
+    if status_name is None:
+        await query.answer("Ошибка: статус не найден.", show_alert=True)
+        return BULK_STATUS
+
+    context.user_data[STATUS] = status_key
+    context.user_data['last_message_id'] = query.message.message_id
+    await query.answer()
+    await menu.edit_query(query, text=status_value_prompt(status_key, len(context.user_data[BULK_IDS])))
+    return BULK_VALUE
+
+
+async def bulk_input_value(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Применение значения ко всем отмеченным студентам одной пакетной записью."""
+    user_input = update.message.text.strip()
+    chat_id = update.effective_chat.id
+    id_t = context.user_data[TEACHER]
+    selected = context.user_data.get(BULK_IDS) or set()
+
+    if user_input.lower() != '/no' and access.can_edit_teacher(update.effective_user.id, id_t):
+        try:
+            tcr_handler.parse_status_value(context.user_data[STATUS], user_input)
+        except ValueError as e:
+            await reject_status_value(update, context, e, len(selected))
+            return BULK_VALUE
+
+    if user_input.lower() == '/no':
+        status_message = "❌ Изменение отменено"
+    elif not access.can_edit_teacher(update.effective_user.id, id_t):
+        status_message = "❌ Недостаточно прав"
+    else:
+        # Изменять можно только студентов выбранного преподавателя
+        allowed = selected & set(tcr_handler.get_teacher_students_by_id(id_t))
+        updated = tcr_handler.set_status_bulk(allowed, context.user_data[STATUS], user_input)
+        status_message = f"✅ Статус обновлен у {updated} студентов" if updated is not None else "❌ Ошибка обновления"
+        selected.clear()
+
+    try:
+        await context.bot.delete_message(chat_id, update.message.message_id)
+    except Exception as e:
+        logger.error("Ошибка удаления сообщения: %s", e)
+
+    text, keyboard = create_teacher_menu(context, add_text="Выберите действие:", with_view_student=True, editable=True)
+    await menu.edit(context.bot, chat_id=chat_id, message_id=context.user_data.get('last_message_id'),
+                    text=f"{status_message}\n{text}", reply_markup=keyboard)
+    context.user_data[STATUS] = None
+    return TEACHER_IS_SET
+# endregion
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# region Поиск
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Inline-поиск студентов доступных преподавателей (@бот запрос), постранично."""
+    query = update.inline_query
+    teachers = access.visible_teachers(update.effective_user.id)
+    if not teachers:
+        await query.answer([], is_personal=True, cache_time=0,
+                           button=InlineQueryResultsButton("Нет доступа. Пройдите регистрацию.", start_parameter="search"))
+        return
+
+    ids = student_search.search(query.query, teachers)
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    page, next_offset = student_search.page(ids, offset, INLINE_PAGE_SIZE)
+    results = []
+    for id_s in page:
+        # Преподаватель, через которого студент доступен пользователю (владелец, либо с дублированным доступом)
+        id_t = next((i for i in tcr_handler.get_student_teachers(id_s) if i in teachers), None)
+        data_s = tcr_handler.get_student_data_by_id(id_t, id_s) or {}
+        description = " • ".join(item for item in (data_s.get("group"), tcr_handler.get_teacher_by_id(id_t)) if item)
+        results.append(InlineQueryResultArticle(
+            id=str(id_s),
+            title=tcr_handler.get_student_name_by_id(id_s),
+            description=description,
+            input_message_content=InputTextMessageContent(f"/student {id_s}"),
+        ))
+    await query.answer(results, next_offset=next_offset, is_personal=True, cache_time=int(SEARCH_CACHE_TTL))
+
+
+async def open_student(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Переход к меню статусов студента: /student <id> (отправляется выбором результата inline-поиска)."""
+    args = context.args or []
+    id_s = int(args[0]) if len(args) == 1 and args[0].isdigit() else None
+    id_teachers = tcr_handler.get_student_teachers(id_s) if id_s is not None else []
+    id_t = next((i for i in id_teachers if access.can_view_teacher(update.effective_user.id, i)), None)
+    if id_t is None:
+        await update.message.reply_text("❌ Студент не найден. Формат: /student <id>, либо воспользуйтесь поиском.")
+        return None
+
+    context.user_data[TEACHER] = id_t
+    context.user_data[STUDENT] = id_s
+    context.user_data[STATUS] = None
+    editable = access.can_edit_teacher(update.effective_user.id, id_t)
+    text, keyboard = create_student_menu(context, editable)
+    message = await update.message.reply_text(text=text, reply_markup=keyboard)
+    menu.remember(message, text, keyboard)
+    return TEACHERS_STUDENT_IS_SET
+# endregion
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 # region Просмотр всех
 async def view_students(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
@@ -513,22 +1118,43 @@ async def view_students(update: Update, context: ContextTypes.DEFAULT_TYPE) -> s
     buttons = [
         [InlineKeyboardButton(text="Просмотр всех", callback_data=str(VIEW_LIST_STUDENTS))],
         [InlineKeyboardButton(text="Просмотр по группам", callback_data=str(VIEW_BY_GROUP))],
+        [InlineKeyboardButton(text="Фильтр", callback_data=str(VIEW_FILTER))],
         [InlineKeyboardButton(text="Назад", callback_data=str(END))],
     ]
     keyboard = InlineKeyboardMarkup(buttons)
 
     await update.callback_query.answer()
-    await update.callback_query.edit_message_text(text=text, reply_markup=keyboard)
+    await menu.edit_query(update.callback_query, text=text, reply_markup=keyboard)
 
     return VIEW_ALL
 
 
 async def list_all_students(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
-    """Просмотр всех студентов (диалог 'B')"""
+    """
+    Просмотр всех студентов (диалог 'B'): CSV-файл со статусами студентов доступных преподавателей.
+    Файл формируется в фоне (в пуле процессов), кнопка "Назад" отменяет формирование.
+    """
     query = update.callback_query
-    await query.answer("Заглушка", show_alert=True)
+    teachers = access.visible_teachers(update.effective_user.id)
+    if not teachers:
+        await query.answer("Нет доступа. Пройдите регистрацию.", show_alert=True)
+        return VIEW_ALL
+    await query.answer()
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(text="Назад", callback_data=str(END))]])
+    await menu.edit_query(query, text="Формирование списка студентов...", reply_markup=keyboard)
+    start_job(update, context, send_report(context.bot, query.message.chat_id, query.message.message_id,
+                                           teachers, keyboard))
+    return VIEW_ALL
+
 
-    return VIEW_LIST_STUDENTS
+async def send_report(bot, chat_id: int, message_id: int, teachers, keyboard) -> None:
+    async def edit(text):
+        await menu.edit(bot, chat_id, message_id, text, reply_markup=keyboard)
+
+    data = await build_report(tcr_handler, job_pool, teachers,
+                              on_progress=progress_reporter(edit, "Формирование списка студентов"))
+    await bot.send_document(chat_id, document=data, filename="students.csv")
+    await edit("Список студентов отправлен.")
 
 
 async def list_by_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
@@ -539,35 +1165,341 @@ async def list_by_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> s
     return VIEW_BY_GROUP
 
 
-async def select_teacher(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
-    """Выбор конкретного преподавателя."""
-    # Создаем кнопки с именами преподавателей в две колонки
-    teacher_buttons = []
-    teachers_id = tcr_handler.get_teachers_id()  # идентификаторы учителей
-    teachers_pb = [InlineKeyboardButton(tcr_handler.get_teacher_by_id(
-        item), callback_data=f"teacher_{item}") for item in teachers_id]
-    # Перегруппируем кнопки попарно
-    for i in range(0, len(teachers_pb), 2):
-        if i + 1 < len(teachers_pb):
-            # Если есть пара, добавляем пару кнопок
-            teacher_buttons.append([teachers_pb[i], teachers_pb[i + 1]])
-        else:
-            # Если нет пары, добавляем одну кнопку
-            teacher_buttons.append([teachers_pb[i]])
+# Фильтр студентов: условия хранятся в user_data[FILTER], выборка - TeacherDataHandler.query_students
+FILTER_OPERATIONS = {EMPTY: "не заполнено", FILLED: "заполнено", BEFORE: "раньше сегодняшнего дня",
+                     SINCE: "начиная с сегодняшнего дня"}
+SORT_TITLES = {SORT_NAME: "по имени", SORT_GROUP: "по группе", SORT_TEACHER: "по преподавателю"}
 
-    teacher_buttons.append([InlineKeyboardButton(text="Назад", callback_data=str(END))])
-    keyboard = InlineKeyboardMarkup(teacher_buttons)
-    await update.callback_query.answer()
-    await update.callback_query.edit_message_text(text="Выберите преподавателя:", reply_markup=keyboard)
 
-    return SELECT_TEACHER
+def status_title(status_key) -> str:
+    title = tcr_handler.get_statuses().get(status_key, status_key)
+    return title[0].lower() + title[1:]
+
+
+def status_at(index: str):
+    """Ключ статуса по его номеру из callback_data (ключи и значения не передаются - ограничение 64 байта)."""
+    keys = list(tcr_handler.get_statuses())
+    return keys[int(index)] if index.isdigit() and int(index) < len(keys) else None
+
+
+def filter_values(status_type) -> list[tuple[str, str]]:
+    """Значения bool/enum для условия 'равно' [(код, название), ...], в callback_data - номер значения."""
+    if status_type.kind == "bool":
+        return [("1", "да"), ("0", "нет")]
+    return list(status_type.options.items()) if status_type.kind == "enum" else []
+
+
+def filter_state(context) -> dict:
+    """Текущий фильтр {"teacher": id_t, "group": группа, "status": (ключ, условие, значение), "sort": ...}."""
+    return context.user_data.setdefault(FILTER, {"teacher": None, "group": None, "status": None, "sort": SORT_NAME})
+
+
+def describe_filter(state) -> str:
+    teacher = tcr_handler.get_teacher_by_id(state["teacher"]) if state["teacher"] is not None else "все"
+    status = "любой"
+    if state["status"] is not None:
+        key, op, value = state["status"]
+        condition = FILTER_OPERATIONS.get(op) or tcr_handler.format_status_value(key, value)
+        status = f"{status_title(key)} - {condition}"
+    sort = SORT_TITLES.get(state["sort"]) or f"по статусу '{status_title(state['sort'])}'"
+    return (f"Фильтр студентов\nПреподаватель: {teacher}\nГруппа: {state['group'] or 'все'}\n"
+            f"Статус: {status}\nСортировка: {sort}")
+
+
+def build_filter_query(user_id: int, state, page: int) -> StudentQuery:
+    """Запрос страницы page (на одну запись больше - признак следующей страницы) в пределах доступа."""
+    visible = access.visible_teachers(user_id)
+    if state["teacher"] in visible:
+        teachers = {state["teacher"]}
+    else:
+        teachers = None if len(visible) == len(tcr_handler.get_teachers_id()) else set(visible)
+    conditions = [Condition(*state["status"])] if state["status"] is not None else []
+    return StudentQuery(teachers=teachers, groups={state["group"]} if state["group"] is not None else None,
+                        conditions=conditions, sort=state["sort"], offset=page * FILTER_PAGE_SIZE,
+                        limit=FILTER_PAGE_SIZE + 1)
+
+
+def create_filter_menu(context) -> tuple[str, InlineKeyboardMarkup]:
+    buttons = [
+        [InlineKeyboardButton("Преподаватель", callback_data="filterby_teacher"),
+         InlineKeyboardButton("Группа", callback_data="filterby_group")],
+        [InlineKeyboardButton("Статус", callback_data="filterby_status"),
+         InlineKeyboardButton("Сортировка", callback_data="filterby_sort")],
+        [InlineKeyboardButton("Показать", callback_data="filterpage_0"),
+         InlineKeyboardButton("Сбросить", callback_data="filterset:reset")],
+        [InlineKeyboardButton("Назад", callback_data=str(END))],
+    ]
+    return describe_filter(filter_state(context)), InlineKeyboardMarkup(buttons)
+
+
+async def filter_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Меню фильтра студентов (диалог 'B')."""
+    query = update.callback_query
+    if not access.visible_teachers(update.effective_user.id):
+        await query.answer("Нет доступа. Пройдите регистрацию.", show_alert=True)
+        return VIEW_ALL
+    text, keyboard = create_filter_menu(context)
+    await query.answer()
+    await menu.edit_query(query, text=text, reply_markup=keyboard)
+    return VIEW_FILTER
+
+
+async def filter_choose(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """
+    Варианты выбранного параметра фильтра (filterby_<параметр>[:<страница>]): преподаватель, группа,
+    статус или сортировка. Варианты выводятся страницами по FILTER_OPTIONS_PAGE_SIZE.
+    """
+    query = update.callback_query
+    field_name, _, page = query.data.removeprefix("filterby_").partition(":")
+    page = int(page) if page.isdigit() else 0
+    if field_name == "teacher":
+        options = [(tcr_handler.get_teacher_by_id(id_t), f"filterset:teacher:{id_t}")
+                   for id_t in access.visible_teachers(update.effective_user.id)]
+        text = "Выберите преподавателя:"
+    elif field_name == "group":
+        options = [(group, f"filterset:group:{i}") for i, group in enumerate(tcr_handler.get_groups())]
+        text = "Выберите группу:"
+    elif field_name == "status":
+        options = [(title, f"filterkey_{i}") for i, title in enumerate(tcr_handler.get_statuses().values())]
+        text = "Выберите статус:"
+    else:
+        options = [(title, f"filterset:sort:{sort}") for sort, title in SORT_TITLES.items()]
+        options.extend((f"по статусу '{status_title(key)}'", f"filterset:sort:s{i}")
+                       for i, key in enumerate(tcr_handler.get_statuses()))
+        text = "Выберите сортировку:"
+    pages = max(1, -(-len(options) // FILTER_OPTIONS_PAGE_SIZE))
+    page = min(page, pages - 1)
+    options = options[page * FILTER_OPTIONS_PAGE_SIZE:(page + 1) * FILTER_OPTIONS_PAGE_SIZE]
+    if field_name != "sort" and page == 0:
+        options.insert(0, ("Все" if field_name != "status" else "Любой", f"filterset:{field_name}:"))
+
+    buttons = [InlineKeyboardButton(title, callback_data=data) for title, data in options]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("◀", callback_data=f"filterby_{field_name}:{page - 1}"))
+    if page + 1 < pages:
+        navigation.append(InlineKeyboardButton("▶", callback_data=f"filterby_{field_name}:{page + 1}"))
+    if navigation:
+        rows.append(navigation)
+        text = f"{text} (стр. {page + 1} из {pages})"
+    rows.append([InlineKeyboardButton("Назад", callback_data=str(VIEW_FILTER))])
+    await query.answer()
+    await menu.edit_query(query, text=text, reply_markup=InlineKeyboardMarkup(rows))
+    return VIEW_FILTER
+
+
+async def filter_status_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Условия для выбранного статуса (filterkey_<номер статуса>, по его типу)."""
+    query = update.callback_query
+    index = query.data.removeprefix("filterkey_")
+    status_key = status_at(index)
+    if status_key is None:
+        await query.answer("Ошибка: статус не найден.", show_alert=True)
+        return VIEW_FILTER
+    status_type = tcr_handler.get_status_type(status_key)
+    options = [(FILTER_OPERATIONS[op], f"filterset:status:{index}:{op}") for op in (EMPTY, FILLED)]
+    if status_type.kind == "date":
+        options.extend((FILTER_OPERATIONS[op], f"filterset:status:{index}:{op}") for op in (BEFORE, SINCE))
+    options.extend((title, f"filterset:status:{index}:{EQUALS}:{i}")
+                   for i, (_, title) in enumerate(filter_values(status_type)))
+
+    buttons = [[InlineKeyboardButton(title, callback_data=data)] for title, data in options]
+    buttons.append([InlineKeyboardButton("Назад", callback_data="filterby_status")])
+    await query.answer()
+    await menu.edit_query(query, text=f"Статус '{status_title(status_key)}':", reply_markup=InlineKeyboardMarkup(buttons))
+    return VIEW_FILTER
+
+
+async def filter_set(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """
+    Изменение параметра фильтра (filterset:<параметр>:<значение>) и возврат в меню фильтра. Группа,
+    статус и его значение передаются номерами.
+    """
+    query = update.callback_query
+    state = filter_state(context)
+    field_name, _, value = query.data.removeprefix("filterset:").partition(":")
+    if field_name == "reset":
+        context.user_data.pop(FILTER, None)
+    elif field_name == "teacher":
+        state["teacher"] = int(value) if value else None
+    elif field_name == "group":
+        groups = tcr_handler.get_groups()
+        state["group"] = groups[int(value)] if value and int(value) < len(groups) else None
+    elif field_name == "status":
+        if not value:
+            state["status"] = None
+        else:
+            index, op, *arg = value.split(":", 2)
+            key = status_at(index)
+            if key is None:
+                await query.answer("Ошибка: статус не найден.", show_alert=True)
+                return VIEW_FILTER
+            if op in (BEFORE, SINCE):
+                arg = [date.today().isoformat()]  # сравнение с датой выбора условия
+            elif arg:
+                values = filter_values(tcr_handler.get_status_type(key))
+                arg = [values[int(arg[0])][0]] if arg[0].isdigit() and int(arg[0]) < len(values) else []
+                if not arg:
+                    await query.answer("Ошибка: значение не найдено.", show_alert=True)
+                    return VIEW_FILTER
+            state["status"] = (key, op, arg[0] if arg else None)
+    elif field_name == "sort":
+        key = status_at(value[1:]) if value.startswith("s") else value
+        if key is None or (key not in SORT_TITLES and key not in tcr_handler.get_statuses()):
+            await query.answer("Ошибка: статус не найден.", show_alert=True)
+            return VIEW_FILTER
+        state["sort"] = key
+    return await filter_menu(update, context)
+
+
+async def filter_results(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Страница результатов фильтра (filterpage_<номер>)."""
+    query = update.callback_query
+    state = filter_state(context)
+    page = int(query.data.removeprefix("filterpage_"))
+    try:
+        ids = list(tcr_handler.query_students(build_filter_query(update.effective_user.id, state, page)))
+    except ValueError as e:
+        await query.answer(f"Ошибка фильтра: {e}.", show_alert=True)
+        return VIEW_FILTER
+    has_next = len(ids) > FILTER_PAGE_SIZE
+    ids = ids[:FILTER_PAGE_SIZE]
+
+    sort_key = state["sort"] if state["sort"] in tcr_handler.get_statuses() else None
+    lines = []
+    for id_s in ids:
+        id_t = tcr_handler.get_teacher_of_student(id_s)
+        data_s = tcr_handler.get_student_data_by_id(id_t, id_s) or {}
+        details = [data_s.get("group") or "-", tcr_handler.get_teacher_by_id(id_t)]
+        if sort_key is not None:
+            _, data_f = tcr_handler.get_student_file_data(tcr_handler.get_teacher_by_id(id_t),
+                                                          tcr_handler.get_student_name_by_id(id_s))
+            details.append(tcr_handler.format_status_value(sort_key, (data_f or {}).get(sort_key, "")) or "-")
+        lines.append(f"• {tcr_handler.get_student_name_by_id(id_s)} ({', '.join(details)})")
+    if not lines:
+        lines.append("Студенты не найдены." if page == 0 else "Больше студентов нет.")
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("◀", callback_data=f"filterpage_{page - 1}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton("▶", callback_data=f"filterpage_{page + 1}"))
+    buttons = [navigation] if navigation else []
+    buttons.append([InlineKeyboardButton("К фильтру", callback_data=str(VIEW_FILTER))])
+    text = f"{describe_filter(state)}\n---\nСтраница {page + 1}:\n" + "\n".join(lines)
+    await query.answer()
+    await menu.edit_query(query, text=text, reply_markup=InlineKeyboardMarkup(buttons))
+    return VIEW_FILTER
 
 
 # ----------------------------------------------------------------------------------------------------------------------
 # region Main()
-def create_bot_app() -> Application:
-    """Создание приложения бота"""
-    app = Application.builder().token(API_BOT_TOKEN).build()
+async def check_reminders(bot) -> int:
+    """
+    Проверка сроков во всех наборах данных. Незагруженные наборы загружаются временно и не вытесняют
+    наборы пользователей, история отправки хранится вне набора (reminder_history).
+    """
+
+    async def tick(tenant) -> int:
+        if tenant.reminders is None:
+            tenant.reminders = ReminderScheduler(tenant.handler, tenant.access.teacher_users, bot.send_message,
+                                                 send_bucket, repeat=REMINDER_REPEAT,
+                                                 last_sent=reminder_history[tenant.name])
+        return await tenant.reminders.tick()
+
+    sent = 0
+    for name in registry.names():
+        try:
+            sent += await registry.visit(name, tick)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при проверке сроков статусов набора данных '{name}': {e}")
+    return sent
+
+
+async def reminders_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Callback для JobQueue.run_repeating."""
+    await check_reminders(context.bot)
+
+
+async def run_reminders(bot, interval: float) -> None:
+    """Цикл проверки сроков, если JobQueue недоступна (не установлен APScheduler)."""
+    while True:
+        await asyncio.sleep(interval)
+        await check_reminders(bot)
+
+
+async def post_init(app: Application) -> None:
+    """Запуск фоновых задач после инициализации приложения."""
+    # Запуск без снимка (первый, либо данные изменены) - сохраняем снимок для следующего запуска
+    for tenant in registry.loaded():
+        if tenant.handler.snapshot_file and not tenant.handler.snapshot_loaded:
+            tenant.handler.save_binary_snapshot()
+    tasks = [asyncio.create_task(registrations.run())]
+    # Отслеживание внешних изменений загруженных наборов данных и выгрузка простаивающих
+    # (без отслеживания изменений - только выгрузка, раз в минуту)
+    tasks.append(asyncio.create_task(registry.run(DATA_RELOAD_INTERVAL if DATA_RELOAD_INTERVAL > 0 else 60)))
+    if METRICS.enabled and METRICS_PORT:
+        tasks.append(asyncio.create_task(METRICS.serve("127.0.0.1", METRICS_PORT)))
+    if METRICS.enabled and METRICS_DUMP_FILE:
+        tasks.append(asyncio.create_task(METRICS.run_dump(METRICS_DUMP_FILE, METRICS_DUMP_INTERVAL)))
+    tasks.append(asyncio.create_task(dispatcher.run(app.bot.send_message)))
+    if REMINDER_INTERVAL > 0:
+        if app.job_queue is not None:
+            app.job_queue.run_repeating(reminders_job, interval=REMINDER_INTERVAL, first=REMINDER_INTERVAL,
+                                        name="reminders")
+        else:
+            tasks.append(asyncio.create_task(run_reminders(app.bot, REMINDER_INTERVAL)))
+    app.bot_data["background_tasks"] = tasks
+
+
+async def post_shutdown(app: Application) -> None:
+    """Остановка фоновых задач и сброс буферов на диск."""
+    for task in app.bot_data.pop("background_tasks", []):
+        task.cancel()
+    for user_id in list(background_jobs):
+        cancel_job(user_id)
+    job_pool.close()
+    await registrations.flush()
+    registry.close()
+    if METRICS.enabled and METRICS_DUMP_FILE:
+        METRICS.dump(METRICS_DUMP_FILE)
+
+
+def wrap_callbacks(handler, wrapper, state=None, seen=None):
+    """
+    Рекурсивная обертка callback-функций обработчиков (включая вложенные ConversationHandler).
+    wrapper(callback, state) получает имя состояния, в котором зарегистрирован обработчик.
+    Обработчик, зарегистрированный в нескольких местах, оборачивается один раз.
+    """
+    seen = set() if seen is None else seen
+    if id(handler) in seen:
+        return
+    seen.add(id(handler))
+    if isinstance(handler, ConversationHandler):
+        for item in handler.entry_points:
+            wrap_callbacks(item, wrapper, "entry", seen)
+        for key, items in handler.states.items():
+            for item in items:
+                wrap_callbacks(item, wrapper, STATE_NAMES.get(key, str(key)), seen)
+        for item in handler.fallbacks:
+            wrap_callbacks(item, wrapper, "fallback", seen)
+    else:
+        handler.callback = wrapper(handler.callback, state)
+
+
+def create_bot_app(bot=None, polling: bool = True) -> Application:
+    """
+    Создание приложения бота. Можно передать готовый экземпляр bot (например, заглушку для нагрузочных тестов).
+    polling=False - без получения обновлений (их передает процесс-распределитель, см. workers.py).
+    """
+    builder = Application.builder().bot(bot).updater(None) if bot is not None else \
+        Application.builder().token(API_BOT_TOKEN)
+    if bot is None and not polling:
+        builder = builder.updater(None)
+    app = builder.post_init(post_init).post_shutdown(post_shutdown).build()
     
     # Регистрация обработчиков
     # Регистрация
@@ -597,6 +1529,15 @@ def create_bot_app() -> Application:
             VIEW_ALL: [
                 CallbackQueryHandler(list_all_students, pattern=f"^{str(VIEW_LIST_STUDENTS)}$"),
                 CallbackQueryHandler(list_by_group, pattern=f"^{str(VIEW_BY_GROUP)}$"),
+                CallbackQueryHandler(filter_menu, pattern=f"^{str(VIEW_FILTER)}$"),
+                CallbackQueryHandler(back_to_start, pattern=f"^{str(END)}$"),
+            ],
+            VIEW_FILTER: [
+                CallbackQueryHandler(filter_menu, pattern=f"^{str(VIEW_FILTER)}$"),
+                CallbackQueryHandler(filter_choose, pattern="^filterby_.+$"),
+                CallbackQueryHandler(filter_status_selected, pattern="^filterkey_.+$"),
+                CallbackQueryHandler(filter_set, pattern="^filterset:.+$"),
+                CallbackQueryHandler(filter_results, pattern="^filterpage_.+$"),
                 CallbackQueryHandler(back_to_start, pattern=f"^{str(END)}$"),
             ]
         },
@@ -614,7 +1555,10 @@ def create_bot_app() -> Application:
 
     # Выбор учителя и последующие действия
     select_teacher_conv = ConversationHandler(
-        entry_points=[CallbackQueryHandler(select_teacher, pattern=f"^{str(SELECT_TEACHER)}$")],
+        entry_points=[
+            CallbackQueryHandler(select_teacher, pattern=f"^{str(SELECT_TEACHER)}$"),
+            CommandHandler("student", open_student),
+        ],
         states={
             SELECT_TEACHER: [
                 CallbackQueryHandler(teacher_selected, pattern="^teacher_.+$"),
@@ -623,8 +1567,22 @@ def create_bot_app() -> Application:
             TEACHER_IS_SET: [
                 CallbackQueryHandler(view_teach_std, pattern=f"^{str(TEACHERS_STUDENTS)}$"),
                 CallbackQueryHandler(select_teach_std, pattern=f"^{str(TEACHERS_STUDENT_SELECT)}$"),
+                CallbackQueryHandler(bulk_start, pattern=f"^{str(BULK_SELECT)}$"),
                 CallbackQueryHandler(back_to_start,  pattern=f"^{str(END)}$"),
             ],
+            BULK_SELECT: [
+                CallbackQueryHandler(bulk_toggle, pattern="^bulk_.+$"),
+                CallbackQueryHandler(bulk_choose_status, pattern=f"^{str(BULK_STATUS)}$"),
+                CallbackQueryHandler(teacher_selected, pattern=f"^{str(TEACHER_IS_SET)}$"),
+            ],
+            BULK_STATUS: [
+                CallbackQueryHandler(bulk_status_selected, pattern="^bulkstatus_.+$"),
+                CallbackQueryHandler(bulk_start, pattern=f"^{str(BULK_SELECT)}$"),
+            ],
+            BULK_VALUE: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, bulk_input_value),
+                CommandHandler("no", bulk_input_value),
+            ],
             TEACHERS_STUDENT_SELECT: [
                 CallbackQueryHandler(student_selected, pattern="^student_.+$"),
                 CallbackQueryHandler(teacher_selected, pattern=f"^{str(TEACHER_IS_SET)}$")
@@ -641,6 +1599,7 @@ def create_bot_app() -> Application:
         fallbacks=[
             CallbackQueryHandler(back_to_start, pattern=f"^{str(END)}$"),
             CommandHandler("stop", stop_nested),
+            CommandHandler("student", open_student),
         ],
         map_to_parent={
             # Вернуться в начальное меню
@@ -658,10 +1617,11 @@ def create_bot_app() -> Application:
         CallbackQueryHandler(end, pattern=f"^{str(END)}$"),
     ]
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        # /student без /start: вложенный диалог выбора преподавателя начинается сразу с меню студента
+        entry_points=[CommandHandler("start", start), select_teacher_conv],
         states={
             SELECTING_ACTION: selection_handlers,  # type: ignore[dict-item]
-            STOPPING: [CommandHandler("start", start)],
+            STOPPING: [CommandHandler("start", start), select_teacher_conv],
             AWAIT_IMP_MSG: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, imp_msg_input),
             ]
@@ -670,11 +1630,34 @@ def create_bot_app() -> Application:
         fallbacks=[
             CommandHandler("stop", stop),
             CommandHandler("message", imp_msg_start),
+            CommandHandler("announce", announce),
         ],
     )
     
     app.add_handler(conv_handler)
 
+    # Команды администратора
+    app.add_handler(CommandHandler("requests", list_requests))
+    app.add_handler(CommandHandler("approve", approve_request))
+    app.add_handler(CommandHandler("grant", grant_role))
+    app.add_handler(CommandHandler("revoke", revoke_role))
+    app.add_handler(CommandHandler("broadcast", broadcast))
+    app.add_handler(CommandHandler("dataset", select_dataset))
+    app.add_handler(MessageHandler(filters.Document.FileExtension("csv"), import_statuses))
+    app.add_handler(CallbackQueryHandler(cancel_background_job, pattern=f"^{JOB_CANCEL}$"))
+
+    # Inline-поиск студентов
+    app.add_handler(InlineQueryHandler(inline_search))
+
+    # Набор данных пользователя, контекст лога (пользователь, состояние, обработчик) и метрики
+    # для всех обработчиков
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            wrap_callbacks(handler, registry.with_tenant)
+            wrap_callbacks(handler, with_log_context)
+            if METRICS.enabled:
+                wrap_callbacks(handler, METRICS.instrument_handler)
+
     # Добавляем глобальный обработчик ошибок для контроля всех необработанных исключений
     app.add_error_handler(error_handler)
     
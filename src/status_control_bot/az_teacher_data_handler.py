@@ -3,8 +3,17 @@ import json
 import logging
 import transliterate
 from pathlib import Path
+from functools import wraps
+from contextlib import contextmanager, nullcontext
 from src.status_control_bot.config import BASE_DIR, DIFF_SYMBOLS
-from src.status_control_bot.utils import convert_to_latin, load_json, save_json
+from src.status_control_bot.utils import convert_to_latin, file_signature, scan_signatures, load_json
+from src.status_control_bot.metrics import METRICS
+from src.status_control_bot.snapshot import read_snapshot, write_snapshot
+from src.status_control_bot.models import Dataset
+from src.status_control_bot.transaction import Transaction
+from src.status_control_bot.schema_evolution import schema_state, pending_drops, record_change, conform, compact
+from src.status_control_bot.status_types import StatusType, DateIndex, build_types, validate_types
+from src.status_control_bot.student_query import StudentQuery, StudentQueryEngine
 
 
 """
@@ -21,6 +30,11 @@ from src.status_control_bot.utils import convert_to_latin, load_json, save_json
             "Чаплин Чарльз Спенсер": {...},
         }
     },
+    "shared":{
+        "Гаусс К.": {
+            "Кромин Денис Артёмьевич": "Эйлер Л."
+        }
+    },
     "statuses":{
         "ready_0105": "Готовность ВКР на 01.05.2025",
         "ready_1505": "Готовность ВКР на 15.05.2025",
@@ -30,6 +44,15 @@ from src.status_control_bot.utils import convert_to_latin, load_json, save_json
         "norma_date": "Дата прохождения нормоконтроля",
         "final_date": "Дата сдачи ВКР в ЭБС",
     }
+    "status_types":{
+        "plag_date": {"type": "date"},
+        "check_plag": {"type": "bool"}
+    },
+    "schema":{
+        "version": 2,
+        "compacted": 1,
+        "log": [[2, "add", "final_date"]]
+    },
     "groups":[
         "ВГ-814-З", 
         "ПС-007", 
@@ -40,8 +63,16 @@ from src.status_control_bot.utils import convert_to_latin, load_json, save_json
         "ВП-916-З"
     ]
 }
+Каждый студент хранится одной записью у преподавателя-владельца ("teachers"). Дублированный доступ -
+таблица связей "shared" {преподаватель: {студент: владелец}}: запись и файл статусов общие, доступ
+других преподавателей не копирует запись. Раздел необязателен; записи прежнего формата с ключом
+"duplicate" преобразуются в связи при загрузке (migrate_shared).
+Раздел "schema" (необязателен) - версия перечня статусов, см. schema_evolution: файлы статусов
+приводятся к текущему перечню при чтении, а не при его изменении.
+Раздел "status_types" (необязателен) - типы статусов и формат хранения значений, см. status_types.
 """
-# TODO: удаление студента, на которого есть дублированный доступ у другого преподавателя
+
+OWNER, SHARED = "owner", "shared"  # вид доступа преподавателя к студенту
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -108,6 +139,40 @@ def match_two_strings(input_str: str, clean_str: str, max_diffs=1):
 
 # endregion
 
+def coordinated(method):
+    """
+    Выполнение метода в транзакции общего хранилища (если оно подключено): перед вызовом применяются
+    изменения других процессов, после - измененные методом файлы вносятся в журнал изменений.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.store is None:
+            return method(self, *args, **kwargs)
+        with self.store.transaction():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def transactional(method):
+    """
+    Выполнение метода в транзакции обработчика (TeacherDataHandler.transaction): изменения метода
+    применяются одним пакетом после его завершения. Если изменения не удалось записать, они
+    откатываются, а метод возвращает None. Внутри внешней транзакции изменения только накапливаются.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            with self.transaction():
+                return method(self, *args, **kwargs)
+        except OSError as e:
+            logger.error(f"Изменения '{method.__name__}' не записаны и отменены: {e}")
+            return None
+
+    return wrapper
+
 # ----------------------------------------------------------------------------------------------------------------------
 # region Инициализация
 class TeacherDataHandler:
@@ -116,51 +181,227 @@ class TeacherDataHandler:
     файловой структурой. Весь функционал на базе json.
     """
 
-    def __init__(self, file_path=None):
+    def __init__(self, file_path=None, snapshot_file=None):
         # инициализация
         self.data = dict()
         self.data_links = dict()
         self.current_file = None
+        self.current_signature = None  # (mtime_ns, size) загруженного файла
+        self.student_files = dict()  # кэш файлов статусов {имя файла: данные}
+        self.snapshot_file = snapshot_file  # бинарный снимок всех данных (None - не используется)
+        self.snapshot_loaded = False
+        self.store = None  # coordination.SharedStore при работе нескольких процессов с одним каталогом
+        self.tx = None  # transaction.Transaction текущей транзакции
+        self.change_seq = 0  # номер последнего изменения файлов статусов
+        self.changed_files = {}  # {имя файла: номер изменения} в порядке изменения (журнал для индексов)
+        self.files_epoch = 0  # увеличивается, если измененные файлы неизвестны (журнал сброшен)
+        self.status_types = (None, {})  # (data, {ключ: StatusType}) для текущих данных
+        self.date_index = DateIndex(self)
+        self.student_query = StudentQueryEngine(self)
 
         if file_path is None:
             return
         self.load_data(file_path)
 
     def load_data(self, file_path):
-        self.data = self.load(file_path)
-        if self.data is None:
+        # При первой загрузке пробуем бинарный снимок, json - запасной вариант
+        if self.current_file is None and self.snapshot_file and self.load_binary_snapshot(file_path):
+            self.current_file = file_path
+            return
+        snapshot = self.build_snapshot(file_path)
+        if snapshot is None:
             logging.info(f"Файл '{file_path}' не был загружен.")
             raise ValueError
+        self.swap_snapshot(snapshot)
         self.current_file = file_path
 
-        # Формируем уникальные связи через int, поскольку telegram-bot не поддерживают слишком
-        # длинные имена и не получится сделать их с помощью ключей-имён
-        teachers = self.get_teachers()
-        students_count = 0
-        if len(teachers) > 0:
-            self.data_links["students"] = {}
-            self.data_links["links"] = {}  # id_s: [id_t, ... ]
-            self.data_links["teachers"] = {}
-            # self.data_links["teachers"] = {i: item for i, item in enumerate(teachers)}
-            for i, item in enumerate(teachers):
-                self.data_links["teachers"][i] = item  # преподаватели
-                students = self.get_teacher_students(item)
-                links = []
-                for stud in students:
-                    self.data_links["students"][students_count] = stud
-                    links.append(students_count)
-                    # print(stud)
-                    students_count += 1
-                self.data_links["links"][i] = links
-        else:
+    @classmethod
+    def build_snapshot(cls, file_path):
+        """
+        Загрузка, проверка и построение индексов для файла структуры. Не изменяет состояние
+        экземпляра, поэтому может выполняться вне цикла событий (в отдельном потоке).
+
+        Returns:
+            tuple: (data, data_links, signature), либо None если файл не прошел проверку.
+        """
+        signature = file_signature(file_path)
+        data = cls.load(file_path)
+        if data is None:
+            return None
+        try:
+            cls.validate_data(data)
+        except ValueError as e:
+            logger.error(f"Файл {file_path} не прошел проверку: {e}")
+            return None
+        migrated = cls.migrate_shared(data)
+        if migrated:
+            logger.info(f"Дублированный доступ в {file_path} преобразован в связи: {migrated} (будет сохранено "
+                        f"при следующей записи структуры).")
+        return data, cls.build_links(data), signature
+
+    def swap_snapshot(self, snapshot):
+        """Атомарная подмена данных и индексов на заранее подготовленные."""
+        self.data, self.data_links, self.current_signature = snapshot
+
+    def load_binary_snapshot(self, file_path):
+        """
+        Загрузка данных, индексов и значений статусов из бинарного снимка. Снимок принимается,
+        только если он построен по текущей версии file_path. Файлы статусов, изменившиеся
+        после записи снимка, в кэш не попадают и будут прочитаны из json при обращении.
+
+        Returns:
+            bool: True, если снимок загружен.
+        """
+        payload = read_snapshot(self.snapshot_file)
+        if payload is None:
+            return False
+        signature = file_signature(file_path)
+        if payload["file"] != str(Path(file_path).resolve()) or payload["signature"] != signature:
+            logger.info(f"Снимок {self.snapshot_file} устарел, данные загружаются из {file_path}.")
+            return False
+        data_dir = Path(BASE_DIR / payload["data"]["data_dir"])
+        try:
+            current = scan_signatures(data_dir)
+        except FileNotFoundError:
+            logger.error(f"Каталог '{data_dir}' не найден.")
+            return False
+
+        self.swap_snapshot((payload["data"], payload["links"], signature))
+        self.student_files = {name: data_f for name, (file_sig, data_f) in payload["files"].items()
+                              if current.get(name) == file_sig}
+        self.snapshot_loaded = True
+        return True
+
+    @coordinated
+    def save_binary_snapshot(self):
+        """
+        Запись бинарного снимка текущего состояния. Недостающие в кэше файлы статусов
+        предварительно загружаются, поэтому снимок содержит значения всех студентов.
+        """
+        if not self.snapshot_file or self.current_file is None:
+            return False
+        self.preload_student_files()
+        current = scan_signatures(self.get_data_dir())
+        payload = {
+            "file": str(Path(self.current_file).resolve()),
+            "signature": self.current_signature,
+            "data": self.data,
+            "links": self.data_links,
+            "files": {name: (current[name], data_f) for name, data_f in self.student_files.items() if name in current},
+        }
+        return write_snapshot(self.snapshot_file, payload)
+
+    @staticmethod
+    def validate_data(data):
+        """Проверка структуры данных преподавателей, при ошибке вызывает ValueError."""
+        if not isinstance(data, dict):
+            raise ValueError("корневой элемент должен быть словарем")
+        for key, expected in (("data_dir", str), ("teachers", dict), ("statuses", dict), ("groups", list)):
+            if not isinstance(data.get(key), expected):
+                raise ValueError(f"отсутствует или некорректен ключ '{key}'")
+        for teacher_name, students in data["teachers"].items():
+            if not isinstance(students, dict):
+                raise ValueError(f"некорректный перечень студентов у '{teacher_name}'")
+            for student_name, record in students.items():
+                if not isinstance(record, dict) or not record.get("file"):
+                    raise ValueError(f"у студента '{student_name}' отсутствует файл статусов")
+        shared = data.get("shared", {})
+        if not isinstance(shared, dict) or not all(isinstance(links, dict) for links in shared.values()):
+            raise ValueError("некорректен ключ 'shared'")
+        validate_types(data.get("status_types", {}))
+        state = schema_state(data)
+        if not isinstance(state.get("version"), int) or not isinstance(state.get("compacted"), int) or \
+                not isinstance(state.get("log"), list):
+            raise ValueError("некорректен ключ 'schema'")
+
+    @staticmethod
+    def migrate_shared(data) -> int:
+        """
+        Преобразование записей прежнего формата {"duplicate": {владелец: студент}} в связи "shared".
+        Метка, указывающая на саму запись (прежний duplicate_access изменял исходную запись), удаляется;
+        запись, владелец которой удален, становится записью владельца.
+
+        Returns:
+            int: количество преобразованных записей.
+        """
+        shared = data.setdefault("shared", {})
+        migrated = 0
+        for teacher_name, students in data["teachers"].items():
+            for student_name in [name for name, record in students.items() if "duplicate" in record]:
+                record = students[student_name]
+                owner, source_name = next(iter(record["duplicate"].items()), (None, None))
+                source = data["teachers"].get(owner, {}).get(source_name)
+                if owner != teacher_name and source_name == student_name and source is not None:
+                    del students[student_name]
+                    shared.setdefault(teacher_name, {})[student_name] = owner
+                else:
+                    students[student_name] = {key: value for key, value in record.items() if key != "duplicate"}
+                migrated += 1
+        return migrated
+
+    @staticmethod
+    def build_links(data):
+        """
+        Формирование связей через int, поскольку telegram-bot не поддерживают слишком
+        длинные имена и не получится сделать их с помощью ключей-имён. Дополнительно
+        строятся обратные индексы для поиска за O(1). id получают только записи владельцев,
+        связи дублированного доступа индексируются в обе стороны (shared_students / shared_teachers).
+        """
+        data_links = {
+            "students": {},  # id_s: name
+            "links": {},  # id_t: [id_s, ... ] (свои, затем с дублированным доступом)
+            "teachers": {},  # id_t: name
+            "teacher_ids": {},  # name: id_t
+            "student_ids": {},  # name: id_s (первое вхождение)
+            "student_teacher": {},  # id_s: id_t владельца
+            "shared_students": {},  # id_t: {id_s, ...} с дублированным доступом
+            "shared_teachers": {},  # id_s: [id_t, ...] с дублированным доступом
+        }
+        teachers = list(data["teachers"].keys())
+        if len(teachers) == 0:
             print("Input data is empty.")
+            return data_links
+
+        students_count = 0
+        for i, item in enumerate(teachers):
+            data_links["teachers"][i] = item  # преподаватели
+            data_links["teacher_ids"][item] = i
+            links = []
+            for stud in data["teachers"][item]:
+                data_links["students"][students_count] = stud
+                data_links["student_ids"].setdefault(stud, students_count)
+                data_links["student_teacher"][students_count] = i
+                links.append(students_count)
+                students_count += 1
+            data_links["links"][i] = links
+
+        for teacher_name, students in data.get("shared", {}).items():
+            id_t = data_links["teacher_ids"].get(teacher_name)
+            if id_t is None:
+                continue
+            for student_name, owner in students.items():
+                id_owner = data_links["teacher_ids"].get(owner)
+                id_s = data_links["student_ids"].get(student_name)
+                if id_s is not None and data_links["student_teacher"][id_s] != id_owner:
+                    # Однофамилец у другого преподавателя - ищем среди студентов владельца
+                    id_s = next((i for i in data_links["links"].get(id_owner, ()) if data_links["students"][i] ==
+                                 student_name and data_links["student_teacher"][i] == id_owner), None)
+                # Связь с удаленной записью, либо с собственным студентом не индексируется (см. consistency)
+                if id_s is None or id_owner == id_t:
+                    continue
+                data_links["links"][id_t].append(id_s)
+                data_links["shared_students"].setdefault(id_t, set()).add(id_s)
+                data_links["shared_teachers"].setdefault(id_s, []).append(id_t)
+        return data_links
 
     @staticmethod
     def load(file_path):
         """Загружает json с логированием ошибок."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            METRICS.add_io("read", len(raw))
+            data = json.loads(raw)
 
             # logger.info(f"Файл {file_path} успешно загружен.")
             return data
@@ -174,60 +415,54 @@ class TeacherDataHandler:
     
     # region Добавление
 
+    @transactional
     def add_teacher(self, name_teacher):
         """Добавление преподавателя."""
-        if name_teacher not in self.get_teachers():
-            self.data["teachers"][name_teacher] = {}  # пустой, студентов еще нет
-            self.write_and_update()
+        if name_teacher not in self.tx.teachers:
+            self.tx.add_teacher(name_teacher)  # пустой, студентов еще нет
             return True
         else:
             return False
 
-    def add_student(self, teacher_name: str, student_dict: str, save_and_reload:bool=True):
+    @transactional
+    def add_student(self, teacher_name: str, student_dict: str):
         """
-        Добавление студента выбранному преподавателю. 
-        Флаг save_and_reload для сохранения и перезагрузки класса.
+        Добавление студента выбранному преподавателю. Файл статусов и запись в структуре
+        создаются одной транзакцией (для добавления нескольких студентов одним пакетом
+        вызовы объединяются в transaction()).
         Ключи student_dict:
          ["name"] - имя студента
          ["group"] - группа студента
          ["work"] - работа студента
         """
         # Выполняем проверки
-        if teacher_name not in self.get_teachers():
+        if teacher_name not in self.tx.teachers:
             print("Teacher is not registered. Cannot add student.")
             return False
-        if student_dict["name"] in self.get_students_list():
+        if self.tx.has_student(student_dict["name"]):
             print("Student is already exist. Cannot add student.")
             return False
 
         # Cоздаем файл статусов
         file_name = self.create_file_for_student(student_dict["name"], teacher_name)
-        if file_name is None:
-            print("Can't create file for student. Cannot transfer.")
-            return False
 
         # Заполняем структуру...
-        self.data["teachers"][teacher_name] = {student_dict["name"]: {
+        self.tx.edit_teacher(teacher_name)[student_dict["name"]] = {
             "file": file_name,
             "group": student_dict.get("group", ""),
-            "work": student_dict.get("work", "")}}
-        
-        if save_and_reload:
-            self.write_and_update()
+            "work": student_dict.get("work", "")}
+        return True
 
+    @transactional
     def create_file_for_student(self, student_name:str, teacher_name:str, data=None):
         """Создание файла для хранения статусов (свойств/параметров) студента."""
         filename = convert_to_latin(teacher_name) + "__" + convert_to_latin(student_name, use_initials=True) + ".json"
         if data is None:
-            student_status = {key: "" for key in self.get_statuses().keys()}
-        else:
-            student_status = data
-        file_path = f"{self.data['data_dir']}/{filename}"
-        save_json(file_path, student_status)
-        if Path(file_path).exists():
-            return filename
+            student_status = {key: "" for key in self.tx.data["statuses"].keys()}
         else:
-            return None
+            student_status = dict(data)
+        self.tx.write_file(filename, student_status)
+        return filename
 
     # region Извлечение
     def get_groups(self):
@@ -240,25 +475,22 @@ class TeacherDataHandler:
         return self.data_links["students"]
 
     def get_student_for_group(self, group_name, return_id=True):
-        """Перечень id или имен студентов, которые принадлежат группе"""
-        result = {}  # { id_s: name}
-        for id_s, student_name in self.get_data_link_students().items():
-            id_t = self.get_teacher_of_student(id_s)
-            if id_t is None:
-                continue
-
-            teacher_name = self.get_teacher_by_id(id_t)
-            if teacher_name is None:
-                continue
-
-            s_data = self.get_student_data_by_name(teacher_name, student_name)
-            if s_data["group"] == group_name:
-                result[id_s] = student_name
-
+        """Перечень id или имен студентов, которые принадлежат группе (по индексу групп)"""
+        ids = sorted(self.student_query.group_members(group_name))
         if return_id:
-            return list(result.keys())  # Возвращаем id
+            return ids  # Возвращаем id
         else:
-            return list(result.values())  # Возвращаем имена
+            return [self.get_student_name_by_id(id_s) for id_s in ids]  # Возвращаем имена
+
+    def query_students(self, query: StudentQuery):
+        """
+        Выборка студентов с фильтрами, сортировкой и страницей (см. student_query). При некорректном
+        условии вызывает ValueError.
+
+        Returns:
+            Iterator[int]: id студентов (вычисляются по мере чтения).
+        """
+        return self.student_query.run(query)
 
     def get_teachers(self):
         """Перечень имен преподавателей"""
@@ -270,87 +502,334 @@ class TeacherDataHandler:
 
     def get_teacher_by_name(self, teacher_name):
         """id преподавателя через его имя"""
-        for key, value in self.data_links["teachers"].items():
-            if teacher_name == value:
-                return key
-        return None
+        return self.data_links["teacher_ids"].get(teacher_name, None)
 
     def get_teacher_by_id(self, id_t):
         """Имя преподавателя через id"""
         return self.data_links["teachers"].get(id_t, None)
 
     def get_teacher_students(self, teacher_name: str):
-        """Перечень студентов преподавателя по имени"""
-        return list(self.data["teachers"][teacher_name].keys())
+        """Перечень студентов преподавателя по имени (свои, затем с дублированным доступом)"""
+        return [*self.data["teachers"][teacher_name], *self.data.get("shared", {}).get(teacher_name, {})]
 
     def get_teacher_students_by_id(self, id_t: int):
         """Перечень студентов преподавателя по id"""
         return list(self.data_links["links"].get(id_t, None))
 
     def get_teacher_of_student(self, id_s: int):
-        """id учителя для выбранного id студента"""
-        for id_t, ids_s in self.get_data_links_relations().items():
-            if id_s in ids_s:
-                return id_t
+        """id учителя (владельца) для выбранного id студента"""
+        return self.data_links["student_teacher"].get(id_s, None)
+
+    def get_student_teachers(self, id_s: int) -> list[int]:
+        """id всех преподавателей, которым доступен студент: владелец, затем с дублированным доступом"""
+        id_t = self.data_links["student_teacher"].get(id_s, None)
+        if id_t is None:
+            return []
+        return [id_t, *self.data_links["shared_teachers"].get(id_s, ())]
+
+    def get_access(self, id_t: int, id_s: int):
+        """Вид доступа преподавателя к студенту: OWNER, SHARED, либо None"""
+        if self.data_links["student_teacher"].get(id_s, None) == id_t:
+            return OWNER
+        if id_s in self.data_links["shared_students"].get(id_t, ()):
+            return SHARED
         return None
 
     def get_student_id_by_name(self, student_name: str):
         """id студента по его имени"""
-        for key, value in self.data_links["students"].items():
-            if student_name == value:
-                return key
-        return None
+        return self.data_links["student_ids"].get(student_name, None)
 
     def get_student_name_by_id(self, id_s: int):
         """Имя студента через id"""
         return self.data_links["students"].get(id_s, None)
 
     def get_student_data_by_id(self, id_t: int, id_s: int):
-        """Данные по конкретному студенту преподавателя через id"""
-        teacher_name = self.get_teacher_by_id(id_t)
-        student_name = self.get_student_name_by_id(id_s)
-        return self.get_student_data_by_name(teacher_name, student_name)
+        """Данные по конкретному студенту преподавателя через id (запись владельца)"""
+        if self.get_access(id_t, id_s) is None:
+            return None
+        owner = self.get_teacher_by_id(self.get_teacher_of_student(id_s))
+        return self.data["teachers"][owner].get(self.get_student_name_by_id(id_s), None)
 
     def get_student_data_by_name(self, teacher_name, student_name):
-        """Данные по конкретному студенту преподавателя """
-        return self.data["teachers"][teacher_name].get(student_name, None)
+        """Данные по конкретному студенту преподавателя (при дублированном доступе - запись владельца)"""
+        record = self.data["teachers"][teacher_name].get(student_name, None)
+        if record is None:
+            owner = self.data.get("shared", {}).get(teacher_name, {}).get(student_name, None)
+            if owner is not None:
+                record = self.data["teachers"].get(owner, {}).get(student_name, None)
+        return record
 
     def get_student_file_data(self, teacher_name, student_name):
         # Данные по студенту
         data_s = self.get_student_data_by_name(teacher_name, student_name)
         # Путь к файлу студента
         file_path = Path(BASE_DIR / self.data["data_dir"]) / data_s["file"]
-        data_f = self.load(file_path)
+        data_f = self.load_student_file(file_path)
         return file_path, data_f
 
+    def load_student_file(self, file_path):
+        """
+        Данные файла статусов студента, с кэшированием в памяти. Данные приводятся к текущему
+        перечню статусов (недостающие - пустые значения, удаленные не возвращаются).
+        """
+        data_f = self.student_files.get(file_path.name, None)
+        statuses = self.data["statuses"]
+        if data_f is None:
+            data_f = self.load(file_path)
+            if not isinstance(data_f, dict):
+                return None
+        elif data_f.keys() == statuses.keys():
+            return data_f
+        data_f = conform(data_f, statuses)
+        self.student_files[file_path.name] = data_f
+        return data_f
+
+    @classmethod
+    def read_student_files(cls, data_dir, file_names):
+        """
+        Чтение набора файлов статусов (без изменения состояния экземпляра). 
+        Возвращает {имя файла: (signature, data)}, некорректные файлы пропускаются.
+        """
+        result = {}
+        for name in file_names:
+            file_path = Path(data_dir) / name
+            signature = file_signature(file_path)
+            if signature is None:
+                result[name] = (None, None)  # файл удален
+                continue
+            data_f = cls.load(file_path)
+            if isinstance(data_f, dict):
+                result[name] = (signature, data_f)
+        return result
+
+    def update_student_files(self, fresh_files):
+        """
+        Подмена закэшированных данных студентов результатом read_student_files. 
+        Данные, которые успели измениться после чтения, не применяются.
+        """
+        data_dir = self.get_data_dir()
+        applied = []
+        for name, (signature, data_f) in fresh_files.items():
+            if file_signature(data_dir / name) != signature:
+                continue
+            if data_f is None:
+                self.student_files.pop(name, None)
+            else:
+                self.student_files[name] = data_f
+            applied.append(name)
+        self.mark_files_changed(applied)
+        return applied
+
+    def get_status_files(self) -> set[str]:
+        """Имена файлов статусов всех студентов."""
+        return {data_s["file"] for students in self.data["teachers"].values() for data_s in students.values()}
+
+    def missing_student_files(self) -> list[str]:
+        """Файлы статусов, которых еще нет в кэше."""
+        return [name for name in self.get_status_files() if name not in self.student_files]
+
+    def preload_student_files(self):
+        """Загрузка в кэш всех файлов статусов, которых в нем еще нет. Возвращает их количество."""
+        missing = self.missing_student_files()
+        for name, (_, data_f) in self.read_student_files(self.get_data_dir(), missing).items():
+            if data_f is not None:
+                self.student_files[name] = data_f
+        return len(missing)
+
+    def to_model(self):
+        """Компактная модель (models.Dataset) текущих данных, включая значения статусов всех студентов."""
+        self.preload_student_files()
+        return Dataset.from_json(self.data, self.student_files)
+
+    def invalidate_student_files(self, file_names):
+        """Сброс кэша для выбранных файлов статусов."""
+        for name in file_names:
+            self.student_files.pop(name, None)
+        self.mark_files_changed(file_names)
+
+    def mark_files_changed(self, file_names=None):
+        """
+        Запись в журнал изменений файлов статусов (по нему обновляются индексы, например DateIndex).
+        file_names=None - изменения неизвестны, индексы перестраиваются полностью.
+        """
+        if file_names is None:
+            self.changed_files.clear()
+            self.files_epoch += 1
+            return
+        for name in file_names:
+            self.change_seq += 1
+            self.changed_files.pop(name, None)
+            self.changed_files[name] = self.change_seq
+
+    def changes_since(self, seq: int) -> list[str]:
+        """Файлы статусов, измененные после изменения с номером seq."""
+        names = []
+        for name in reversed(self.changed_files):
+            if self.changed_files[name] <= seq:
+                break
+            names.append(name)
+        return names
+
+    def get_data_dir(self) -> Path:
+        """Абсолютный путь к каталогу с файлами статусов"""
+        return Path(BASE_DIR / self.data["data_dir"])
+
     def get_students_list(self) -> list[str]:
         return list(self.data_links["students"].values())
 
     def get_statuses(self):
         return self.data["statuses"]
+
+    def get_schema_version(self) -> int:
+        return schema_state(self.data)["version"]
+
+    def get_status_types(self) -> dict:
+        """{ключ статуса: StatusType} (строится один раз для текущих данных)."""
+        data, types = self.status_types
+        if data is not self.data:
+            types = build_types(self.data)
+            self.status_types = (self.data, types)
+        return types
+
+    def get_status_type(self, status_key) -> StatusType:
+        return self.get_status_types().get(status_key, None) or StatusType()
+
+    def parse_status_value(self, status_key, user_input) -> str:
+        """Нормализованное значение статуса из ввода пользователя. При некорректном вводе - ValueError."""
+        return self.get_status_type(status_key).parse(user_input)
+
+    def format_status_value(self, status_key, value) -> str:
+        """Значение статуса для отображения (даты - ДД.ММ.ГГГГ, да/нет, названия вариантов)."""
+        return self.get_status_type(status_key).format(value)
+
+    def find_by_date(self, status_key, start=None, end=None) -> list:
+        """
+        Студенты с датой статуса status_key в диапазоне [start, end) (datetime.date, None - без границы),
+        по возрастанию даты, через отсортированный индекс.
+
+        Returns:
+            list: [(дата, id_s), ...], либо None, если статус не типа date.
+        """
+        return self.date_index.range(status_key, start, end)
+
+    def export_rows(self):
+        """
+        Полная таблица (генератор строк): преподаватель, студент, группа и значения всех статусов
+        в порядке get_statuses(). Первая строка - заголовок.
+        """
+        statuses = self.get_statuses()
+        types = self.get_status_types()
+        yield ["Преподаватель", "Студент", "Группа", *statuses.values()]
+        for teacher_name in self.data["teachers"]:
+            for student_name in self.get_teacher_students(teacher_name):
+                data_s = self.get_student_data_by_name(teacher_name, student_name)
+                if data_s is None:
+                    continue
+                _, data_f = self.get_student_file_data(teacher_name, student_name)
+                data_f = data_f or {}
+                yield [teacher_name, student_name, data_s.get("group", ""),
+                       *(types[key].format(data_f.get(key, "")) for key in statuses)]
     
     # region Изменение
     def change_student_status(self, teacher_name, student_name, status_key, user_input):
-        """Установка нового значения для статуса студента"""
+        """
+        Установка нового значения для статуса студента. Значение приводится к типу статуса
+        (parse_status_value), некорректное значение не записывается.
+        """
         data_s = self.get_student_data_by_name(teacher_name, student_name)
         if data_s is None:
             return False
 
         # Извлекаем путь к файлу
         file_path = Path(BASE_DIR / self.data["data_dir"]) / data_s["file"]
-        data_f = self.load(file_path)
-        if status_key not in self.get_statuses().keys():
+        data_f = self.load_student_file(file_path)
+        if data_f is None or status_key not in self.get_statuses().keys():
+            return False
+        try:
+            value = self.parse_status_value(status_key, user_input)
+        except ValueError as e:
+            print(f"Некорректное значение статуса '{status_key}': {e}.")
             return False
 
-        data_f[status_key] = user_input
-        self.save_json(file_path, data_f)
-        return True
+        return self.write_status_values({file_path.name: {status_key: value}})
+
+    def set_status_bulk(self, student_ids, status_key, value):
+        """
+        Установка одного значения статуса для набора студентов одним пакетом.
+
+        Args:
+            student_ids: id студентов.
+            status_key: ключ статуса.
+            value: новое значение.
 
+        Returns:
+            int: количество измененных студентов, либо None при ошибке.
+        """
+        if status_key not in self.get_statuses().keys():
+            return None
+        return self.set_statuses({id_s: {status_key: value} for id_s in student_ids})
+
+    @transactional
+    def set_statuses(self, updates):
+        """
+        Пакетное изменение статусов {id_s: {ключ статуса: значение}}: изменения группируются
+        по файлам, после чего все файлы записываются одной транзакцией (без перезагрузки структуры):
+        при ошибке записи ни один файл не изменяется. Значения приводятся к типам статусов;
+        неизвестные ключи и некорректные значения пропускаются.
+
+        Returns:
+            int: количество измененных студентов, либо None при ошибке записи.
+        """
+        types = self.get_status_types()
+        data_dir = self.get_data_dir()
+        changes = {}  # {имя файла: значения}, дублированный доступ ссылается на тот же файл
+        updated = 0
+        for id_s, values in updates.items():
+            id_t = self.get_teacher_of_student(id_s)
+            if id_t is None:
+                continue
+            data_s = self.get_student_data_by_id(id_t, id_s)
+            if data_s is None:
+                continue
+            if data_s["file"] not in changes and self.load_student_file(data_dir / data_s["file"]) is None:
+                continue
+            parsed = {}
+            for key, value in values.items():
+                if key not in types:
+                    continue
+                try:
+                    parsed[key] = types[key].parse(value) if isinstance(value, str) else value
+                except ValueError:
+                    continue
+            changes.setdefault(data_s["file"], {}).update(parsed)
+            updated += 1
+
+        if not self.write_status_values(changes):
+            return None
+        return updated
+
+    @transactional
+    def write_status_values(self, changes):
+        """
+        Запись значений статусов {имя файла: {ключ статуса: значение}} одной транзакцией: если
+        какой-либо файл не найден или не записан, ни один файл не изменяется. При подключенном
+        общем хранилище перед записью применяются изменения других процессов (значения
+        записываются поверх актуального содержимого файлов). Внутри транзакции запись
+        откладывается до ее фиксации.
+
+        Returns:
+            bool: True, если все файлы записаны.
+        """
+        return self.tx.update_values(changes)
+
+    @transactional
     def transfer_student(self, student_name, to_teacher, from_teacher=None):
         """
         Перемещение студента выбранному преподавателю. При указанном значении 'from_teacher' 
-        перемещение производится от выбранного учителя. Если это 'дублированный' студент, то 
-        перемещение будет отменено.
+        перемещение производится от выбранного учителя. Если у 'from_teacher' дублированный доступ
+        к студенту, то перемещение будет отменено. Связи дублированного доступа переходят к новому
+        владельцу. Новый файл статусов, удаление прежнего и изменение структуры выполняются одной
+        транзакцией.
         
         Args:
             student_name: имя студента, который будет перемещен.
@@ -360,109 +839,116 @@ class TeacherDataHandler:
         Returns:
             bool: флаг успеха перемещения студента
         """
-        if to_teacher not in self.get_teachers():
+        tx = self.tx
+        if to_teacher not in tx.teachers:
             print("Teacher is not registered. Cannot transfer.")
             return False
-        if student_name not in self.get_students_list():
+        if not tx.has_student(student_name):
             print("Student is not registered. Cannot transfer.")
+            return False
 
         # Проверяем аргумент "от учителя"
         if from_teacher is not None:
-            if from_teacher not in self.get_teachers():
+            if from_teacher not in tx.teachers:
                 print("Teacher is not registered. Cannot transfer.")
                 return False
+            if tx.owner_of(from_teacher, student_name) not in (None, from_teacher):
+                print(f"Student is 'duplicated'. Transfer canceled.")
+                return False
             # Проверяем, что студент в перечне учителя from_teacher
-            teacher_of_stud_id = self.get_teacher_of_student(self.get_student_id_by_name(student_name))
-            if teacher_of_stud_id != self.get_teacher_by_name(from_teacher):
+            if student_name not in tx.teachers[from_teacher]:
                 print(f"'{student_name}' is not a student of '{from_teacher}', check your query. Cannot transfer.")
                 return False
 
-        # Сперва создаем студента, а после его удаляем у преподавателя 'from_teacher'
         # Извлекаем данные 
-        teacher_for_fix = None
-        if from_teacher:
-            for_teacher = self.get_student_data_by_name(from_teacher, student_name)
-            teacher_for_fix = from_teacher
-        else:
-            the_teacher_id = self.get_teacher_of_student(self.get_student_id_by_name(student_name))
-            teacher_for_fix = self.get_teacher_by_id(the_teacher_id)
-            for_teacher = self.get_student_data_by_name(teacher_for_fix, student_name)
-        
-        if "duplicate" in for_teacher.keys():
-            print(f"Student is 'duplicated'. Transfer canceled.")
+        teacher_for_fix = from_teacher or tx.teacher_of(student_name)
+        if teacher_for_fix == to_teacher:
+            print(f"'{student_name}' is already a student of '{to_teacher}'. Transfer canceled.")
+            return False
+        for_teacher = tx.teachers[teacher_for_fix][student_name]
+        if student_name in tx.teachers[to_teacher]:
+            print(f"'{to_teacher}' already has a student named '{student_name}'. Transfer canceled.")
             return False
 
-        file_path, data = self.get_student_file_data(from_teacher, student_name)
-        # Записываем новый файл с данными
-        filename = self.create_file_for_student(student_name, to_teacher, data) 
-        if filename is None:
-            print(f"Error during write data. Transfer canceled.")
+        data = tx.read_file(for_teacher["file"])
+        if data is None:
+            print(f"Error during read data. Transfer canceled.")
             return False
-        
-        # Формируем новую запись
+        # Новый файл с данными, новая запись, удаление старых файла и записи
+        filename = self.create_file_for_student(student_name, to_teacher, data)
         new_data = {key: value for key, value in for_teacher.items() if key != "file"}
         new_data["file"] = filename
-        self.data["teachers"][to_teacher][student_name] = new_data
-        
-        # Теперь удаляем старые файлы и записи
-        self.delete_file(file_path)
-        self.data["teachers"][teacher_for_fix].pop(student_name)
-        self.write_and_update()
+        tx.edit_teacher(to_teacher)[student_name] = new_data
+        if filename != for_teacher["file"]:
+            tx.delete_file(for_teacher["file"])
+        tx.edit_teacher(teacher_for_fix).pop(student_name)
+        # Связи дублированного доступа указывают на нового владельца, у него самого связь не нужна
+        for teacher_name, links in list(tx.shared.items()):
+            if links.get(student_name) == teacher_for_fix:
+                if teacher_name == to_teacher:
+                    tx.unshare(teacher_name, student_name)
+                else:
+                    tx.share(teacher_name, student_name, to_teacher)
         return True
 
 
+    @transactional
     def duplicate_access(self, to_teacher: str, from_teacher: str, student: str):
         """
-        Дублирование доступа к студенту другого уже существующего преподавателя. 
+        Дублирование доступа к студенту другого уже существующего преподавателя. Запись
+        не копируется: в "shared" добавляется связь с записью владельца.
 
         Args:
             to_teacher: имя учителя для которого дублируется.
-            from_teacher: имя учителя который "делится" студентом.
+            from_teacher: имя учителя который "делится" студентом (владелец или с дублированным доступом).
             student: имя студента доступ к которому дублируется.
 
         Returns:
             bool: флаг успеха дублирования доступа
         """
-        teachers = self.get_teachers()
-        if any(t not in teachers for t in [to_teacher, from_teacher]):
+        tx = self.tx
+        if any(t not in tx.teachers for t in [to_teacher, from_teacher]):
             print("Teacher(s) is not registered. Cannot duplicate access.")
             return False
-        if student not in self.get_students_list():
+        if not tx.has_student(student):
             print("Student is not registered. Cannot duplicate access.")
             return False
-        if student in self.get_teacher_students(to_teacher):
+        if tx.owner_of(to_teacher, student) is not None:
             print(f"Student is already linked to '{to_teacher}'. Duplicate access cancelled.")
             return False
-        
-        # Извлекаем существущие данные...
-        data = {student: self.get_student_data_by_name(from_teacher, student)}
-        # Добавляем метку, что это дубликат
-        data[student]["duplicate"] = {from_teacher:student}
-        self.data["teachers"][to_teacher].update(data)
-        if self.get_student_data_by_name(to_teacher, student):
-            self.write_and_update()
-            return True
-        else:
+        owner = tx.owner_of(from_teacher, student)
+        if owner is None:
+            print(f"'{student}' is not a student of '{from_teacher}'. Duplicate access cancelled.")
+            return False
+
+        tx.share(to_teacher, student, owner)
+        return True
+
+    @transactional
+    def unshare_access(self, teacher_name: str, student: str):
+        """Отмена дублированного доступа преподавателя к студенту (запись владельца не изменяется)."""
+        if student not in self.tx.shared.get(teacher_name, {}):
             return False
+        self.tx.unshare(teacher_name, student)
+        return True
 
     
     # region Удаление
     
+    @transactional
     def remove_teacher(self, name_teacher):
-        if name_teacher in self.get_teachers():
-            result = self.data["teachers"].pop(name_teacher)
-            self.write_and_update()
-            return result
+        if name_teacher in self.tx.teachers:
+            return self.tx.remove_teacher(name_teacher)
 
+    @transactional
     def remove_student_by_name(self, student_name: str, full_match:bool=False, teacher_name:str=None):
         """
         Удаление студента по заданному имени или части имени. 
         Ищет первые совпадение в ФИО, если не указан флаг full_match. 
         Можно указывать только часть ФИО: имя, фамилию, отчество. 
         Количество допустимых ошибок по умолчанию 1. Также удаляет файл *.json, 
-        относящийся к студенту. Если в структуре данных присутствует ключ 
-        "duplicate", то сам файл не удаляет, поскольку это дублированный доступ к 
-        студенту другого преподавателя.
+        относящийся к студенту, и связи дублированного доступа к нему. Если у
+        teacher_name дублированный доступ к студенту, то удаляется только связь.
 
         Args:
             student_name: запрос - имя, либо часть для удаления.
@@ -473,7 +959,8 @@ class TeacherDataHandler:
             dict: словарь удаленных значений по студенту
              {student_name: {teacher's data}, 'file': {file_path: {data}}}
         """
-        db_students = self.get_students_list()
+        tx = self.tx
+        db_students = tx.student_names()
 
         # Поиск студента, без привязки к преподавателю
         if teacher_name is None:
@@ -493,12 +980,7 @@ class TeacherDataHandler:
                 return None
 
             # Формируем набор данных имеющих связь с удаляемым значением
-            id_s = self.get_student_id_by_name(match_student)
-            id_t = self.get_teacher_of_student(id_s)
-            if id_t is None:
-                print("Cannot find teacher for student id. Cannot remove.")
-                return None
-            teacher_name = self.get_teacher_by_id(id_t)
+            teacher_name = tx.teacher_of(match_student)
         
         else:
             # Удаление конкретного студента у конкретного преподавателя
@@ -509,32 +991,32 @@ class TeacherDataHandler:
             else:
                 match_student = student_name
 
-            if teacher_name not in self.get_teachers():
+            if teacher_name not in tx.teachers:
                 print("There is no input teacher. Cannot remove student.")
                 return None
             
-            if student_name not in self.get_teacher_students(teacher_name):
+            owner = tx.owner_of(teacher_name, student_name)
+            if owner is None:
                 print(f"Cannot find '{student_name}' in '{teacher_name}' students. Cannot remove.")
                 return None
 
-        # Особый случай - удаление дублированного доступа.        
-        data = self.get_student_data_by_name(teacher_name, match_student)
-        if "duplicate" in data.keys():
-            print ("SPECIAL CASE!")
-            removed_data = {match_student: self.data["teachers"][teacher_name].pop(match_student)}
-
-        else:
-            # Классический случай
-            file_path, data = self.get_student_file_data(teacher_name, match_student)
-            removed_data = {match_student: self.data["teachers"][teacher_name].pop(match_student)}
-            removed_data["file"] = {file_path: data}
+            # Особый случай - удаление дублированного доступа.
+            if owner != teacher_name:
+                tx.unshare(teacher_name, match_student)
+                return {match_student: dict(tx.teachers[owner][match_student])}
 
-            # Физически удаляем файл студента
-            self.delete_file(file_path)
+        # Классический случай
+        data = tx.teachers[teacher_name][match_student]
+        file_path = self.get_data_dir() / data["file"]
+        removed_data = {match_student: tx.edit_teacher(teacher_name).pop(match_student)}
+        removed_data["file"] = {file_path: tx.read_file(data["file"])}
 
-        self.write_and_update()
+        # Файл студента удаляется при фиксации транзакции, связи других преподавателей - сразу
+        tx.delete_file(data["file"])
+        tx.drop_links(teacher_name, match_student)
         return removed_data
 
+    @transactional
     def remove_student_by_id(self, id_s):
         """Удаление выбранного студента и перезапись данных"""
         student_name = self.get_student_name_by_id(id_s)
@@ -544,36 +1026,141 @@ class TeacherDataHandler:
             print("There is no student with input id. Cannot remove.")
             return
 
+    @transactional
     def delete_statuses(self, status_key):
-        """Удаление выбранного статуса и перезапись данных"""
-        status = self.data["statuses"].get(status_key, None)
+        """
+        Удаление выбранного статуса и перезапись данных. Файлы статусов не перезаписываются:
+        значение скрывается при чтении и удаляется из файла при следующей записи (либо уплотнении).
+        """
+        status = self.tx.data["statuses"].get(status_key, None)
         if status:
-            del self.data["statuses"][status_key]
-            self.write_and_update()
+            del self.tx.edit("statuses")[status_key]
+            record_change(self.tx, "drop", status_key)
+            if status_key in self.tx.data.get("status_types", {}):
+                types = dict(self.tx.data["status_types"])
+                del types[status_key]
+                self.tx.replace("status_types", types)
+
+    @transactional
+    def add_status(self, status_key: str, title: str, status_type: StatusType = None):
+        """
+        Добавление статуса. Файлы статусов не перезаписываются: у всех студентов значение пустое,
+        пока не будет записано. Если статус с тем же ключом был удален, а файлы еще не уплотнены,
+        сначала в той же транзакции выполняется уплотнение (иначе прежние значения вернулись бы из файлов).
+        Без status_type тип определяется по названию (status_types.infer_type).
+
+        Returns:
+            bool: флаг успеха добавления статуса.
+        """
+        if not status_key or status_key in self.tx.data["statuses"]:
+            print(f"Status '{status_key}' already exists. Cannot add status.")
+            return False
+        if status_key in pending_drops(self.tx.data):
+            compact(self.tx)
+        self.tx.edit("statuses")[status_key] = title
+        record_change(self.tx, "add", status_key)
+        if status_type is not None:
+            self.set_status_type(status_key, status_type.kind, status_type.options)
+        return True
+
+    @transactional
+    def set_status_type(self, status_key: str, kind: str, options: dict = None):
+        """
+        Назначение типа статуса. Записанные ранее значения не перезаписываются: они разбираются
+        при чтении и нормализуются при следующей записи.
+
+        Returns:
+            bool: флаг успеха (False - неизвестный статус или некорректный тип).
+        """
+        if status_key not in self.tx.data["statuses"]:
+            print(f"Status '{status_key}' not found. Cannot set type.")
+            return False
+        try:
+            status_type = StatusType(kind, options)
+        except ValueError as e:
+            print(f"Некорректный тип статуса '{status_key}': {e}.")
+            return False
+        types = dict(self.tx.data.get("status_types", {}))
+        types[status_key] = status_type.to_json()
+        self.tx.replace("status_types", types)
+        return True
+
+    @transactional
+    def mark_statuses_compacted(self, version: int):
+        """Отметка, что все файлы статусов соответствуют версии version перечня (журнал изменений очищается)."""
+        state = schema_state(self.tx.data)
+        if state["version"] != version or state["compacted"] >= version:
+            return False
+        self.tx.replace("schema", {"version": version, "compacted": version, "log": []})
+        return True
 
     def delete_file(self, file_path):
+        """Удаление файла статусов. Неудаленные файлы находит consistency.ConsistencyScanner."""
+        self.invalidate_student_files([file_path.name])
         try:
             file_path.unlink()
+            return True
         except FileNotFoundError:
             logging.info(f"Файл '{file_path}' не найден.")
+            return True
         except PermissionError:
             logging.error(f"Недостаточно прав для удаления файла '{file_path}'.")
         except Exception as e:
             logging.error(f"Произошла ошибка: {e} при удалении файла '{file_path}'.")
+        return False
 
     # region Запись
+    @contextmanager
+    def transaction(self):
+        """
+        Транзакция (transaction.Transaction): изменения методов, вызванных внутри нее, применяются
+        одним пакетом при выходе из блока, при исключении - отбрасываются. Вложенные вызовы
+        используют внешнюю транзакцию. При подключенном общем хранилище блок выполняется под
+        его блокировкой.
+
+            with handler.transaction():
+                for student in students:
+                    handler.add_student(teacher_name, student)
+        """
+        if self.tx is not None:
+            yield self.tx
+            return
+        with self.store.transaction() if self.store is not None else nullcontext():
+            self.tx = Transaction(self)
+            try:
+                yield self.tx
+                self.tx.commit()
+                if self.store is not None:
+                    self.store.record([*self.tx.files, *self.tx.deleted])
+            finally:
+                self.tx = None
+
+    @coordinated
     def write_and_update(self):
         self.save_json(self.current_file, self.data)
         self.load_data(self.current_file)
 
     @staticmethod
     def save_json(json_path, data, mode='w'):
-        """Сохранение данных (data) в файл json (json_path)"""
+        """
+        Сохранение данных (data) в файл json (json_path). Файл заменяется целиком через временный,
+        поэтому читатели (в т.ч. другие процессы бота) не видят частично записанных данных.
+        """
         try:
-            with open(json_path, mode) as f:
-                json.dump(data, f)
+            text = json.dumps(data)
+            if mode != 'w':
+                with open(json_path, mode) as f:
+                    f.write(text)
+            else:
+                tmp_path = f"{json_path}.{os.getpid()}.tmp"
+                with open(tmp_path, mode) as f:
+                    f.write(text)
+                os.replace(tmp_path, json_path)
+            METRICS.add_io("write", len(text))
+            return True
         except Exception as e:
             logging.error(f"Ошибка при сохранении данных в файл {json_path}: {e}")
+            return False
 
     def dummy(self, call: str):
         dummy_t = "Заглушка-учитель А.Я."
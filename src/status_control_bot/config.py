@@ -8,11 +8,75 @@ load_dotenv(_env_path)
 
 # Базовые пути
 BASE_DIR = _env_path.parent.resolve()  # resolve() -> абсолютный путь
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data")).resolve()
 PARSING_DIR = DATA_DIR / "parsing"
 
+# Файл структуры преподавателей и студентов
+TEACHERS_FILE = Path(os.getenv("TEACHERS_FILE", DATA_DIR / "students" / "teachers.json"))
+
+# Несколько наборов данных (подразделений) в одном процессе: "имя=путь к teachers.json;имя2=путь2".
+# Пустое значение - единственный набор TEACHERS_FILE. Набор без обращений выгружается через
+# DATASET_IDLE_TIMEOUT сек., одновременно в памяти не более DATASET_MAX_LOADED наборов
+DATASETS = {name.strip(): Path(path.strip()) for name, _, path in
+            (item.partition("=") for item in os.getenv("DATASETS", "").split(";")) if name.strip() and path.strip()} \
+    or {"default": TEACHERS_FILE}
+DATASET_IDLE_TIMEOUT = float(os.getenv("DATASET_IDLE_TIMEOUT", 1800))
+DATASET_MAX_LOADED = int(os.getenv("DATASET_MAX_LOADED", 8))
+
+# Общий каталог данных для нескольких процессов бота (SHARED_STORE=1): запись под блокировкой файла,
+# изменения других процессов применяются по журналу изменений каталога статусов
+SHARED_STORE = os.getenv("SHARED_STORE", "0") == "1"
+# Процессы-обработчики при запуске main.py --workers (обновления распределяются по chat_id)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", 1))
+# Прием обновлений через webhook (порт, 0 - опрос getUpdates), публичный адрес и секретный токен
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 0))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Процессы пула для CPU-емких заданий (отчеты, нечеткое сопоставление при импорте), 0 - потоки процесса бота
+POOL_WORKERS = int(os.getenv("POOL_WORKERS", 1))
+
+# Бинарный снимок всех данных для быстрого запуска (пустая строка - не использовать)
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", str(TEACHERS_FILE.with_suffix(".snapshot")))
+
 # Читаем токен
 API_BOT_TOKEN = os.getenv("API_BOT_TOKEN", None)
 
 # Допустимый максимум в различии имен (строковых выражений)
-DIFF_SYMBOLS = 1
\ No newline at end of file
+DIFF_SYMBOLS = 1
+
+# Интервал (сек.) проверки внешних изменений данных, 0 - отключить
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", 5))
+
+# Telegram id администраторов через запятую
+ADMIN_IDS = {int(item) for item in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if item}
+
+# Напоминания о просроченных статусах: интервал проверки (сек., 0 - отключить), период повтора
+# напоминания одному пользователю (сек.) и ограничение отправки сообщений (в сек.)
+REMINDER_INTERVAL = float(os.getenv("REMINDER_INTERVAL", 3600))
+REMINDER_REPEAT = float(os.getenv("REMINDER_REPEAT", 86400))
+SEND_RATE = float(os.getenv("SEND_RATE", 25))
+
+# Время жизни (сек.) результатов inline-поиска студентов
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 60))
+
+# Фоновая проверка согласованности каталога файлов статусов и teachers.json: интервал (сек., 0 - отключить)
+# и исправление найденного (лишние файлы переносятся в .orphans, отсутствующие создаются пустыми)
+CONSISTENCY_INTERVAL = float(os.getenv("CONSISTENCY_INTERVAL", 600))
+CONSISTENCY_REPAIR = os.getenv("CONSISTENCY_REPAIR", "0") == "1"
+
+# Фоновое уплотнение файлов статусов после изменения перечня статусов: интервал проверки (сек., 0 - отключить)
+# и количество файлов в пакете записи
+STATUS_COMPACT_INTERVAL = float(os.getenv("STATUS_COMPACT_INTERVAL", 300))
+STATUS_COMPACT_BATCH = int(os.getenv("STATUS_COMPACT_BATCH", 500))
+
+# Логирование: уровень и формат json-lines (LOG_JSON=1)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"
+LOG_FILE = os.getenv("LOG_FILE", "teacher_bot.log")  # пустая строка - только консоль
+
+# Метрики: включение, порт локального HTTP-экспортера (0 - отключен) и файл периодической выгрузки
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_DUMP_FILE = os.getenv("METRICS_DUMP_FILE", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", 60))
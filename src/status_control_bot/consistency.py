@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+import logging
+from pathlib import Path
+from contextlib import nullcontext
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Проверка согласованности каталога файлов статусов и структуры teachers.json:
+    - orphans - файлы статусов, на которые не ссылается ни одна запись структуры;
+    - dangling - записи, файл статусов которых отсутствует;
+    - duplicates - связи дублированного доступа ("shared"), преподаватель или запись владельца
+      которых удалены, либо указывающие на самого преподавателя;
+    - temp - временные файлы незавершенной записи (*.tmp).
+Каталог читается одним проходом os.scandir, stat выполняется только для кандидатов в лишние файлы:
+файлы моложе ORPHAN_GRACE сек. пропускаются, т.к. могут принадлежать незафиксированной транзакции
+другого процесса. Исправление: лишние файлы переносятся в QUARANTINE_DIR (ранее перенесенные файлы
+с тем же именем сохраняются), временные удаляются; в транзакции TeacherDataHandler для отсутствующих
+создаются файлы с пустыми значениями, некорректные связи дублированного доступа удаляются.
+"""
+
+ORPHAN_GRACE = 60.0
+QUARANTINE_DIR = ".orphans"
+
+logger = logging.getLogger(__name__)
+
+
+def scan_consistency(teachers: dict, data_dir, main_name: str, now: float = None,
+                     grace: float = ORPHAN_GRACE, shared: dict = None) -> dict:
+    """
+    Проверка каталога data_dir по структуре {преподаватель: {студент: запись}} и связям
+    shared {преподаватель: {студент: владелец}}.
+
+    Returns:
+        dict: {"files", "entries", "recent": количество, "orphans", "temp": [имя файла, ...],
+               "dangling": [(преподаватель, студент, файл), ...],
+               "duplicates": [(преподаватель, студент, владелец), ...]}.
+    """
+    now = time.time() if now is None else now
+    referenced = set()
+    entries = 0
+    for students in teachers.values():
+        entries += len(students)
+        referenced.update(record["file"] for record in students.values())
+
+    names = set()
+    orphans, temp, recent = [], [], 0
+    with os.scandir(data_dir) as items:
+        for item in items:
+            name = item.name
+            if name.endswith(".json"):
+                if name == main_name:
+                    continue
+                names.add(name)
+                if name in referenced:
+                    continue
+                target = orphans
+            elif name.endswith(".tmp"):
+                target = temp
+            else:
+                continue
+            try:
+                if now - item.stat().st_mtime < grace:
+                    recent += 1
+                    continue
+            except FileNotFoundError:
+                continue
+            target.append(name)
+
+    dangling, duplicates = [], []
+    for teacher_name, students in teachers.items():
+        for student_name, record in students.items():
+            if record["file"] not in names:
+                dangling.append((teacher_name, student_name, record["file"]))
+    for teacher_name, links in (shared or {}).items():
+        for student_name, owner in links.items():
+            if teacher_name not in teachers or owner == teacher_name or \
+                    student_name not in teachers.get(owner, {}):
+                duplicates.append((teacher_name, student_name, owner))
+    return {"files": len(names), "entries": entries, "recent": recent, "orphans": sorted(orphans),
+            "temp": sorted(temp), "dangling": dangling, "duplicates": duplicates}
+
+
+def has_problems(report: dict) -> bool:
+    return any(report[key] for key in ("orphans", "temp", "dangling", "duplicates"))
+
+
+def scan_handler(handler, grace: float = ORPHAN_GRACE) -> dict:
+    """Проверка данных обработчика (не изменяет его состояние, может выполняться в отдельном потоке)."""
+    return scan_consistency(handler.data["teachers"], handler.get_data_dir(), Path(handler.current_file).name,
+                            grace=grace, shared=handler.data.get("shared", {}))
+
+
+def quarantine_path(quarantine: Path, name: str) -> Path:
+    """Путь в QUARANTINE_DIR, не занятый ранее перенесенным файлом (имя.N.json)."""
+    path = quarantine / name
+    n = 0
+    while path.exists():
+        n += 1
+        path = quarantine / f"{Path(name).stem}.{n}{Path(name).suffix}"
+    return path
+
+
+def remove_files(handler, report: dict, grace: float = ORPHAN_GRACE) -> tuple[dict, list]:
+    """
+    Перенос лишних файлов из отчета в QUARANTINE_DIR и удаление временных. Состояние обработчика
+    только читается, поэтому перенос может выполняться в отдельном потоке; файлы, на которые
+    структура сослалась во время переноса, возвращает restore_files. При общем хранилище
+    выполняется под его блокировкой.
+
+    Returns:
+        tuple: ({"orphans", "temp": количество}, [(имя файла, путь в QUARANTINE_DIR), ...]).
+    """
+    data_dir = handler.get_data_dir()
+    fixed = {"orphans": 0, "temp": 0}
+    moved = []
+    quarantine = data_dir / QUARANTINE_DIR
+    with handler.store.lock if handler.store is not None else nullcontext():
+        tx = handler.tx
+        referenced = {record["file"] for students in handler.data["teachers"].values() for record in students.values()}
+        now = time.time()
+        for key, names in (("orphans", report["orphans"]), ("temp", report["temp"])):
+            for name in names:
+                path = data_dir / name
+                if name in referenced or (tx is not None and name in tx.files):
+                    continue
+                try:
+                    if now - path.stat().st_mtime < grace:
+                        continue  # файл записан после проверки
+                    if key == "orphans":
+                        quarantine.mkdir(exist_ok=True)
+                        target = quarantine_path(quarantine, name)
+                        os.replace(path, target)
+                        moved.append((name, target))
+                    else:
+                        path.unlink()
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.error(f"Не удалось убрать файл '{path}': {e}")
+                    continue
+                fixed[key] += 1
+    return fixed, moved
+
+
+def restore_files(handler, moved: list) -> int:
+    """Возврат перенесенных файлов, на которые уже ссылается структура и которые не созданы заново."""
+    data_dir = handler.get_data_dir()
+    referenced = {record["file"] for students in handler.data["teachers"].values() for record in students.values()}
+    restored = 0
+    for name, target in moved:
+        path = data_dir / name
+        if name not in referenced or path.exists():
+            continue
+        try:
+            os.replace(target, path)
+        except OSError as e:
+            logger.error(f"Не удалось вернуть файл '{target}': {e}")
+            continue
+        handler.invalidate_student_files([name])
+        restored += 1
+    return restored
+
+
+def repair_records(handler, report: dict) -> dict:
+    """
+    Исправление записей структуры: пустые файлы для отсутствующих, удаление некорректных связей
+    дублированного доступа. Каждая проблема перепроверяется по актуальным данным в транзакции.
+
+    Returns:
+        dict: {"dangling", "duplicates": количество}.
+    """
+    data_dir = handler.get_data_dir()
+    fixed = {"dangling": 0, "duplicates": 0}
+    with handler.transaction() as tx:
+        empty = {key: "" for key in tx.data["statuses"]}
+        for teacher_name, student_name, name in report["dangling"]:
+            record = tx.teachers.get(teacher_name, {}).get(student_name)
+            if record is None or record["file"] != name or name in tx.files or (data_dir / name).exists():
+                continue
+            tx.write_file(name, dict(empty))
+            fixed["dangling"] += 1
+
+        for teacher_name, student_name, owner in report["duplicates"]:
+            if tx.shared.get(teacher_name, {}).get(student_name) != owner:
+                continue
+            if teacher_name in tx.teachers and owner != teacher_name and student_name in tx.teachers.get(owner, {}):
+                continue  # связь восстановлена после проверки
+            tx.unshare(teacher_name, student_name)
+            fixed["duplicates"] += 1
+    return fixed
+
+
+def repair(handler, report: dict, grace: float = ORPHAN_GRACE) -> dict:
+    """
+    Исправление найденного scan_consistency. Каждая проблема перепроверяется по актуальным данным,
+    поэтому отчет может быть получен заранее (в т.ч. в другом потоке).
+
+    Returns:
+        dict: количество исправленных проблем по видам.
+    """
+    fixed, moved = remove_files(handler, report, grace)
+    fixed["orphans"] -= restore_files(handler, moved)
+    fixed.update(repair_records(handler, report))
+    METRICS.add_count("consistency_repairs", sum(fixed.values()))
+    return fixed
+
+
+def format_report(report: dict, limit: int = 15) -> str:
+    """Текстовый отчет о проверке."""
+    lines = [f"Файлов статусов: {report['files']}, записей: {report['entries']}."]
+    if report["orphans"]:
+        lines.append(f"Лишние файлы ({len(report['orphans'])}):")
+        lines.extend(f"  {name}" for name in report["orphans"][:limit])
+    if report["dangling"]:
+        lines.append(f"Отсутствуют файлы ({len(report['dangling'])}):")
+        lines.extend(f"  {teacher}: {student} -> {name}" for teacher, student, name in report["dangling"][:limit])
+    if report["duplicates"]:
+        lines.append(f"Некорректный дублированный доступ ({len(report['duplicates'])}):")
+        lines.extend(f"  {teacher}: {student} (владелец {owner})"
+                     for teacher, student, owner in report["duplicates"][:limit])
+    if report["temp"]:
+        lines.append(f"Временные файлы: {len(report['temp'])}")
+    if not has_problems(report):
+        lines.append("Проблем не найдено.")
+    return "\n".join(lines)
+
+
+class ConsistencyScanner:
+    """
+    Периодическая проверка согласованности в фоне. Проверка выполняется в отдельном потоке и
+    пропускается, если с прошлой проверки не изменились ни каталог (mtime каталога меняется при
+    создании, удалении и замене файлов), ни структура обработчика, а срок отложенной проверки
+    недавних файлов еще не наступил.
+
+    Args:
+        interval: минимальный интервал между проверками, сек.
+        repair: исправлять найденные проблемы (иначе - только журнал).
+    """
+
+    def __init__(self, handler, interval: float = 600.0, repair: bool = False, grace: float = ORPHAN_GRACE,
+                 clock=time.monotonic):
+        self.handler = handler
+        self.interval = interval
+        self.repair = repair
+        self.grace = grace
+        self.clock = clock
+        self.last_run = None
+        self.last_key = None  # (data, mtime каталога) последней проверки
+        self.recheck_at = None  # срок проверки недавних файлов, пропущенных последней проверкой
+        self.report = None
+
+    def state_key(self):
+        try:
+            mtime = os.stat(self.handler.get_data_dir()).st_mtime_ns
+        except OSError:
+            return None
+        return self.handler.data, mtime
+
+    async def check(self, force: bool = False):
+        """Проверка, если наступил ее срок. Возвращает отчет (при пропуске - прежний)."""
+        now = self.clock()
+        if not force and self.last_run is not None and now - self.last_run < self.interval:
+            return self.report
+        self.last_run = now
+        key = self.state_key()
+        if not force and key is not None and self.last_key is not None and \
+                key[0] is self.last_key[0] and key[1] == self.last_key[1] and \
+                (self.recheck_at is None or now < self.recheck_at):
+            return self.report
+        data = self.handler.data
+
+        start = time.perf_counter()
+        report = await asyncio.to_thread(scan_handler, self.handler, self.grace)
+        if METRICS.enabled:
+            METRICS.observe("storage", "consistency_scan", time.perf_counter() - start)
+        # Структура могла измениться во время проверки в потоке - проблемы подтверждаются повторно
+        if has_problems(report) and self.handler.data is not data:
+            report = await asyncio.to_thread(scan_handler, self.handler, self.grace)
+        self.report = report
+        self.last_key = key
+        self.recheck_at = now + self.grace if report["recent"] else None
+        if has_problems(report):
+            logger.warning(f"Проверка согласованности данных:\n{format_report(report)}")
+            if self.repair:
+                # Перенос файлов - в отдельном потоке, изменения структуры - в цикле событий
+                fixed, moved = await asyncio.to_thread(remove_files, self.handler, report, self.grace)
+                fixed["orphans"] -= restore_files(self.handler, moved)
+                fixed.update(repair_records(self.handler, report))
+                METRICS.add_count("consistency_repairs", sum(fixed.values()))
+                logger.info(f"Исправлено: {fixed}.")
+                self.last_key = None
+        return report
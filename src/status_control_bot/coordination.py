@@ -0,0 +1,264 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from src.status_control_bot.utils import file_signature
+from src.status_control_bot.metrics import METRICS
+
+try:
+    import fcntl
+
+    def lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def lock_file(f):
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK ожидает около 10 сек., затем ошибка - ждем дальше
+
+    def unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+"""
+Общее хранилище для нескольких процессов бота, работающих с одним каталогом данных.
+Запись выполняется под межпроцессной блокировкой файла, а каждый процесс узнает об изменениях
+других процессов из журнала изменений: строка журнала - версия данных и имя измененного файла.
+Процесс читает только новые строки журнала и сбрасывает кэш перечисленных файлов, не сканируя
+каталог.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Межпроцессная блокировка (блокировка файла ОС). Повторный захват тем же потоком допускается."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.local = threading.RLock()  # потоки одного процесса
+        self.depth = 0
+        self.file = None
+
+    def acquire(self):
+        self.local.acquire()
+        if self.depth == 0:
+            try:
+                self.file = open(self.path, "a+b")
+                lock_file(self.file)
+            except BaseException:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                self.local.release()
+                raise
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            unlock_file(self.file)
+            self.file.close()
+            self.file = None
+        self.local.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ChangeLog:
+    """
+    Журнал изменений: строки 'версия<TAB>pid<TAB>имя файла'. Номер последней строки - версия данных.
+    Читатель помнит позицию в журнале и читает только дописанные строки. При превышении max_bytes
+    журнал заменяется новым файлом (запись под блокировкой), читатели обнаруживают замену по смене
+    inode и выполняют полную перезагрузку.
+    """
+
+    def __init__(self, path, max_bytes: int = 1 << 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.inode = None
+        self.offset = 0
+        self.version = 0
+
+    def stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def seek_end(self):
+        """Пропуск существующих записей (данные только что загружены с диска)."""
+        stat = self.stat()
+        self.inode, self.offset = (stat.st_ino, stat.st_size) if stat else (None, 0)
+        self.version = 0
+        if stat and stat.st_size:
+            with open(self.path, "rb") as f:
+                lines = f.read().splitlines()
+            self.version = int(lines[-1].split(b"\t", 1)[0]) if lines else 0
+
+    def changed(self) -> bool:
+        """Быстрая проверка (без чтения журнала): появились ли новые записи."""
+        stat = self.stat()
+        return stat is not None and (stat.st_ino != self.inode or stat.st_size != self.offset)
+
+    def poll(self) -> tuple[set, bool]:
+        """
+        Изменения других процессов после прошлого вызова.
+
+        Returns:
+            tuple: ({имя файла, ...}, True - журнал заменен и требуется полная перезагрузка).
+        """
+        stat = self.stat()
+        if stat is None:
+            return set(), False
+        if stat.st_ino != self.inode:
+            self.inode, self.offset, self.version = stat.st_ino, 0, 0
+            self.read()
+            return set(), True
+        if stat.st_size == self.offset:
+            return set(), False
+        return self.read(), False
+
+    def read(self) -> set:
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # неполная строка дочитывается в следующий раз
+        names = set()
+        pid = str(os.getpid())
+        for line in chunk[:end].decode("utf-8").splitlines():
+            version, writer, name = line.split("\t", 2)
+            self.version = int(version)
+            if writer != pid:
+                names.add(name)
+        self.offset += end
+        return names
+
+    def append(self, names) -> int:
+        """Запись изменений (только под блокировкой, после poll). Возвращает новую версию."""
+        if not names:
+            return self.version
+        stat = self.stat()
+        if stat is not None and stat.st_size > self.max_bytes:
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            open(tmp_path, "wb").close()
+            os.replace(tmp_path, self.path)
+            stat = self.stat()
+            self.inode, self.offset = stat.st_ino, 0
+        lines = []
+        for name in sorted(names):
+            self.version += 1
+            lines.append(f"{self.version}\t{os.getpid()}\t{name}\n")
+        data = "".join(lines).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.inode = self.inode if self.inode is not None else self.stat().st_ino
+        self.offset += len(data)
+        return self.version
+
+
+class SharedStore:
+    """
+    Согласование TeacherDataHandler с другими процессами, использующими тот же каталог данных.
+        - изменения (значения статусов, преподаватели, студенты) выполняются в транзакции: перед
+          ними данные синхронизируются (изменения других процессов в тех же файлах не теряются),
+          после них измененные файлы вносятся в журнал (файлы статусов - по зафиксированной
+          Transaction, файл структуры - по смене его сигнатуры);
+        - sync() применяет изменения других процессов: сбрасывает кэш файлов статусов,
+          при изменении структуры перезагружает ее (индексы перестраиваются по смене data_links).
+
+    Args:
+        store_dir: каталог файлов блокировки и журнала (по умолчанию - каталог файлов статусов).
+    """
+
+    def __init__(self, handler, store_dir=None):
+        self.handler = handler
+        store_dir = Path(store_dir) if store_dir else handler.get_data_dir()
+        self.lock = FileLock(store_dir / ".store.lock")
+        self.log = ChangeLog(store_dir / ".changes.log")
+        self.main_name = Path(handler.current_file).name
+        self.depth = 0
+        self.pending = set()  # файлы, измененные в текущей транзакции
+        with self.lock:
+            self.log.seek_end()
+            # Структура могла измениться между загрузкой (в т.ч. из снимка) и подключением к журналу
+            if file_signature(handler.current_file) != handler.current_signature:
+                handler.load_data(handler.current_file)
+
+    @property
+    def version(self) -> int:
+        return self.log.version
+
+    def sync(self) -> bool:
+        """
+        Применение изменений других процессов. Без новых записей в журнале - одна проверка stat,
+        иначе журнал читается под блокировкой (другие процессы не находятся в середине записи).
+
+        Returns:
+            bool: True, если данные изменились.
+        """
+        if not self.log.changed():
+            return False
+        with self.lock:
+            names, reset = self.log.poll()
+            if not names and not reset:
+                return False
+            handler = self.handler
+            if reset or self.main_name in names:
+                try:
+                    handler.load_data(handler.current_file)
+                except ValueError:
+                    logger.error(f"Не удалось перезагрузить '{handler.current_file}', используются прежние данные.")
+                if reset:
+                    handler.student_files = {}
+                    handler.mark_files_changed(None)
+            handler.invalidate_student_files(names - {self.main_name})
+        METRICS.add_count("store_syncs")
+        return True
+
+    def record(self, names):
+        """Файлы статусов, измененные в текущей транзакции (вносятся в журнал при ее завершении)."""
+        self.pending.update(names)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Структурное изменение: синхронизация перед ним и запись в журнал файлов, переданных record()
+        (TeacherDataHandler.transaction передает файлы зафиксированной Transaction), и файла
+        структуры, если изменилась его сигнатура.
+        """
+        with self.lock:
+            self.depth += 1
+            try:
+                if self.depth > 1:
+                    yield self
+                    return
+                self.sync()
+                self.pending = set()
+                before = file_signature(self.handler.current_file)
+                try:
+                    yield self
+                finally:
+                    if file_signature(self.handler.current_file) != before:
+                        self.pending.add(self.main_name)
+                    self.log.append(self.pending)
+                    self.pending = set()
+            finally:
+                self.depth -= 1
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from pathlib import Path
+from src.status_control_bot.utils import file_signature, scan_signatures
+
+
+logger = logging.getLogger(__name__)
+
+
+class DataWatcher:
+    """
+    Отслеживание внешних изменений teachers.json и файлов статусов студентов без перезапуска бота.
+    Работает через опрос (mtime, размер), поэтому не зависит от механизмов конкретной ОС.
+    Чтение, проверка и построение индексов выполняются в отдельном потоке, а подмена данных
+    в TeacherDataHandler - одним присваиванием в цикле событий.
+    """
+
+    def __init__(self, handler, interval: float = 5.0):
+        self.handler = handler
+        self.interval = interval
+        self.known_files = None  # {имя файла: (mtime_ns, size)} файлов статусов
+
+    async def run(self):
+        """Бесконечный цикл опроса, завершается отменой задачи."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при проверке изменений данных: {e}")
+
+    async def check(self):
+        """Одна итерация проверки. Возвращает True, если данные были обновлены."""
+        if self.handler.current_file is None:
+            return False
+        data_dir = self.handler.get_data_dir()
+        main_signature, files = await asyncio.to_thread(self.scan, self.handler.current_file, data_dir)
+
+        updated = False
+        # Структура преподавателей изменена - полная пересборка индексов
+        if main_signature is not None and main_signature != self.handler.current_signature:
+            snapshot = await asyncio.to_thread(self.handler.build_snapshot, self.handler.current_file)
+            if snapshot is None:
+                logger.error(f"Новая версия '{self.handler.current_file}' отклонена, используются прежние данные.")
+            else:
+                self.handler.swap_snapshot(snapshot)
+                logger.info(f"Файл '{self.handler.current_file}' перезагружен.")
+                updated = True
+
+        # Первый проход только запоминает состояние каталога
+        if self.known_files is None:
+            self.known_files = files
+            return updated
+
+        # Инкрементально обновляем лишь изменившиеся файлы, которые уже находятся в кэше
+        changed = {name for name in files.keys() | self.known_files.keys()
+                   if files.get(name) != self.known_files.get(name)}
+        self.known_files = files
+        cached = [name for name in changed if name in self.handler.student_files]
+        if cached:
+            fresh = await asyncio.to_thread(self.handler.read_student_files, data_dir, cached)
+            applied = self.handler.update_student_files(fresh)
+            # Файлы, которые не удалось прочитать, проверим на следующей итерации
+            for name in set(cached) - set(applied):
+                self.known_files.pop(name, None)
+            if applied:
+                logger.info(f"Обновлены файлы статусов: {len(applied)}.")
+                updated = True
+        return updated
+
+    @staticmethod
+    def scan(main_file, data_dir):
+        """Сигнатура основного файла и сигнатуры всех *.json файлов каталога статусов."""
+        files = {}
+        try:
+            files = scan_signatures(data_dir, exclude=(Path(main_file).name,))
+        except FileNotFoundError:
+            logger.error(f"Каталог '{data_dir}' не найден.")
+        return file_signature(main_file), files
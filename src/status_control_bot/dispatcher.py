@@ -0,0 +1,151 @@
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from telegram.error import RetryAfter, BadRequest, NetworkError, TelegramError
+from src.status_control_bot.rate_limiter import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcast:
+    """Состояние одной рассылки."""
+    __slots__ = ("total", "sent", "failed", "done", "on_progress", "reported")
+
+    def __init__(self, total: int, on_progress=None):
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.done = asyncio.Event()
+        self.on_progress = on_progress  # async (broadcast) - отчет о ходе рассылки
+        self.reported = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+
+class OutboundDispatcher:
+    """
+    Очередь исходящих сообщений с общим ограничением частоты (bucket) и ограничением
+    для каждого чата. При RetryAfter (flood control) отправка приостанавливается для всех
+    сообщений на указанное время, при сетевых ошибках и таймаутах - повтор с экспоненциальной
+    задержкой. Остальные ошибки Bot API (в т.ч. BadRequest) - сообщение не доставлено, без повтора.
+
+    Args:
+        bucket: общий TokenBucket (может использоваться и другими отправителями).
+        chat_rate: сообщений в секунду в один чат.
+        concurrency: одновременных запросов к Bot API.
+        progress_interval: минимальный интервал (сек.) между отчетами о ходе рассылки.
+    """
+
+    def __init__(self, bucket: TokenBucket, chat_rate: float = 1.0, concurrency: int = 8, max_retries: int = 3,
+                 backoff: float = 1.0, progress_interval: float = 2.0, clock=time.monotonic, sleep=asyncio.sleep):
+        self.bucket = bucket
+        self.chat_rate = chat_rate
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress_interval = progress_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.send = None  # async (chat_id, text, **kwargs), задается в run()
+        self.queue = asyncio.Queue()
+        self.chat_buckets = {}  # {chat_id: TokenBucket}
+        self.paused_until = 0.0
+
+    def submit(self, chat_ids, text: str, on_progress=None, **kwargs) -> Broadcast:
+        """Постановка рассылки в очередь. Повторяющиеся chat_id отправляются один раз."""
+        chat_ids = list(dict.fromkeys(chat_ids))
+        broadcast = Broadcast(len(chat_ids), on_progress)
+        for chat_id in chat_ids:
+            self.queue.put_nowait((chat_id, text, kwargs, broadcast))
+        if not chat_ids:
+            broadcast.done.set()
+        self.prune()
+        return broadcast
+
+    def prune(self, limit: int = 10_000):
+        """Удаление ограничителей чатов, которые полностью восстановились."""
+        if len(self.chat_buckets) <= limit:
+            return
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if bucket.delay(bucket.capacity) == 0:
+                del self.chat_buckets[chat_id]
+
+    def chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1, clock=self.clock,
+                                                              sleep=self.sleep)
+        return bucket
+
+    async def run(self, send):
+        """Обработка очереди, завершается отменой задачи."""
+        self.send = send
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def worker(self):
+        while True:
+            chat_id, text, kwargs, broadcast = await self.queue.get()
+            try:
+                delivered = await self.deliver(chat_id, text, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка рассылки {chat_id}: {e}")
+                delivered = False
+            try:
+                if delivered:
+                    broadcast.sent += 1
+                else:
+                    broadcast.failed += 1
+                await self.report(broadcast)
+            finally:
+                self.queue.task_done()
+
+    async def deliver(self, chat_id, text: str, **kwargs) -> bool:
+        """Отправка одного сообщения с соблюдением ограничений. Возвращает True при успехе."""
+        for attempt in range(self.max_retries + 1):
+            await self.chat_bucket(chat_id).acquire()
+            while self.clock() < self.paused_until:
+                await self.sleep(self.paused_until - self.clock())
+            await self.bucket.acquire()
+            try:
+                await self.send(chat_id, text, **kwargs)
+                return True
+            except RetryAfter as e:
+                delay = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+                self.paused_until = max(self.paused_until, self.clock() + delay)
+                logger.warning(f"Flood control: рассылка приостановлена на {delay} с.")
+            except BadRequest as e:
+                # Подкласс NetworkError, но повтор того же запроса не поможет
+                logger.info(f"Сообщение {chat_id} отклонено: {e}")
+                return False
+            except NetworkError as e:
+                await self.sleep(self.backoff * 2 ** attempt)
+                logger.warning(f"Сетевая ошибка при отправке {chat_id} (попытка {attempt + 1}): {e}")
+            except TelegramError as e:
+                logger.info(f"Сообщение {chat_id} не доставлено: {e}")
+                return False
+        return False
+
+    async def report(self, broadcast: Broadcast):
+        finished = broadcast.processed >= broadcast.total
+        if finished:
+            broadcast.done.set()
+        if broadcast.on_progress is None:
+            return
+        now = self.clock()
+        if finished or now - broadcast.reported >= self.progress_interval:
+            broadcast.reported = now
+            try:
+                await broadcast.on_progress(broadcast)
+            except TelegramError as e:
+                logger.warning(f"Ошибка отчета о рассылке: {e}")
@@ -0,0 +1,317 @@
+import io
+import csv
+import asyncio
+import logging
+from contextlib import aclosing
+from collections import Counter, defaultdict
+from src.status_control_bot.az_teacher_data_handler import clean_text, match_two_strings
+from src.status_control_bot.config import DIFF_SYMBOLS
+from src.status_control_bot.offload import chunked
+
+
+"""
+Импорт значений статусов из CSV: 'ФИО студента;ключ или название статуса;значение'.
+Разделитель (',', ';', табуляция) определяется автоматически, строка заголовка пропускается.
+"""
+
+logger = logging.getLogger(__name__)
+
+RESOLVED = "resolved"
+AMBIGUOUS = "ambiguous"
+MISSING = "missing"
+
+RESOLVE_CHUNK = 100  # имен в одной части нечеткого сопоставления
+GRAM_SIZE = 2  # длина n-грамм (биграммы) индекса нечеткого сопоставления
+
+
+class StudentResolver:
+    """
+    Сопоставление имен из внешних файлов со студентами TeacherDataHandler. Сначала точное
+    совпадение (по нормализованному имени, O(1)), затем нечеткое через match_two_strings только
+    среди кандидатов из индекса n-грамм. match_two_strings сравнивает запрос с полным именем и с
+    каждым его словом (только фамилия, имя), поэтому индексируются и полное имя, и слова. Каждая
+    правка затрагивает не более GRAM_SIZE триграмм, поэтому строка на расстоянии max_diffs содержит
+    не меньше (n-грамм запроса - GRAM_SIZE * max_diffs) из них. Для коротких запросов, где оценка
+    не работает, кандидаты - короткие слова с общим вариантом после удаления не более max_diffs
+    символов. Результаты запоминаются для повторяющихся имен.
+
+    Args:
+        students: {id_s: ФИО} (TeacherDataHandler.get_data_link_students()).
+    """
+
+    def __init__(self, students: dict, max_diffs: int = DIFF_SYMBOLS):
+        self.max_diffs = max_diffs
+        self.exact = defaultdict(list)  # {имя в нижнем регистре: [id_s, ...]}
+        self.units = defaultdict(set)  # {полное имя или слово имени: {имя, ...}}
+        self.grams = defaultdict(list)  # {n-грамма: [имя или слово, ...]}
+        self.short = GRAM_SIZE * (max_diffs + 1) - 1  # длина запроса, для которого оценка по n-граммам не работает
+        self.variants = defaultdict(set)  # {короткое слово без не более max_diffs символов: {слово, ...}}
+        self.names = {}  # {имя в нижнем регистре: исходное имя}
+        self.cache = {}
+        for id_s, name in students.items():
+            key = clean_text(name).lower()
+            self.exact[key].append(id_s)
+            if key in self.names:
+                continue
+            self.names[key] = name
+            for unit in {key, *key.split()}:
+                if unit not in self.units:
+                    for gram in self.ngrams(unit):
+                        self.grams[gram].append(unit)
+                    if len(unit) <= self.short + max_diffs:
+                        for variant in self.deletions(unit, max_diffs):
+                            self.variants[variant].add(unit)
+                self.units[unit].add(key)
+
+    @staticmethod
+    def ngrams(key: str) -> set:
+        return {key[i:i + GRAM_SIZE] for i in range(len(key) - GRAM_SIZE + 1)}
+
+    @staticmethod
+    def deletions(word: str, depth: int) -> set:
+        """word и все его варианты с удаленными не более depth символами."""
+        result = level = {word}
+        for _ in range(depth):
+            level = {item[:i] + item[i + 1:] for item in level for i in range(len(item))}
+            result = result | level
+        return result
+
+    def resolve(self, name: str) -> tuple[str, list]:
+        """
+        Returns:
+            tuple: (RESOLVED, [id_s, ...]) | (AMBIGUOUS, [имена кандидатов]) | (MISSING, []).
+        """
+        key = clean_text(name).lower()
+        result = self.cache.get(key)
+        if result is None:
+            result = self.cache[key] = self._resolve(key)
+        return result
+
+    def resolve_exact(self, name: str):
+        """Только точное совпадение: (RESOLVED, [id_s, ...]), либо None."""
+        found = self.exact.get(clean_text(name).lower())
+        return (RESOLVED, found) if found else None
+
+    def _resolve(self, key: str) -> tuple[str, list]:
+        if key in self.exact:
+            return RESOLVED, self.exact[key]
+
+        # Имя совпадает, если совпадает его полное имя или слово: проверяются строки индекса, а не имена
+        units = [unit for unit in self.candidates(key) if match_two_strings(key, unit, self.max_diffs)]
+        matches = sorted(set().union(*(self.units[unit] for unit in units)))
+        if len(matches) == 1:
+            return RESOLVED, self.exact[matches[0]]
+        if matches:
+            return AMBIGUOUS, [self.names[name] for name in matches]
+        return MISSING, []
+
+    def candidates(self, key: str):
+        """Полные имена и слова имен, которые могут отличаться от key не более чем на max_diffs правок."""
+        if len(key) <= self.short:
+            # Слова на расстоянии max_diffs имеют общий вариант после удаления символов из обоих
+            return set().union(*(self.variants.get(variant, ()) for variant in self.deletions(key, self.max_diffs)))
+        lengths = range(len(key) - self.max_diffs, len(key) + self.max_diffs + 1)
+        grams = self.ngrams(key)
+        need = len(grams) - GRAM_SIZE * self.max_diffs
+        counts = Counter()
+        for gram in grams:
+            counts.update(self.grams.get(gram, ()))
+        return [unit for unit, count in counts.items() if count >= need and len(unit) in lengths]
+
+
+# Индекс процесса пула: (метка данных, StudentResolver), строится один раз для всех частей задания
+_resolver = (None, None)
+
+
+def data_token(handler) -> tuple:
+    """Метка версии данных для кэша индекса в процессах пула (меняется при каждой записи структуры)."""
+    return str(handler.current_file), handler.current_signature
+
+
+def resolve_names(token, students: dict, max_diffs: int, names: list) -> dict:
+    """Задание пула процессов: нечеткое сопоставление части имен. Возвращает {имя: результат resolve}."""
+    global _resolver
+    if _resolver[0] != token:
+        _resolver = (token, StudentResolver(students, max_diffs))
+    return {name: _resolver[1].resolve(name) for name in names}
+
+
+def decode_csv(raw: bytes) -> str:
+    """Декодирование файла: UTF-8 (в т.ч. с BOM), иначе cp1251 (выгрузка Excel)."""
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("cp1251")
+
+
+def iter_csv_rows(stream):
+    """Потоковое чтение строк CSV с автоопределением разделителя."""
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    for line_number, row in enumerate(csv.reader(stream, dialect), start=1):
+        if row and any(cell.strip() for cell in row):
+            yield line_number, [cell.strip() for cell in row]
+
+
+def parse_csv(handler, stream) -> tuple[list, dict]:
+    """
+    Разбор строк CSV и проверка статусов.
+
+    Returns:
+        tuple: ([(номер строки, ФИО, ключ статуса, значение), ...], отчет без результатов сопоставления).
+        Значения приводятся к типам статусов, некорректные попадают в отчет ("bad_values").
+    """
+    statuses = handler.get_statuses()
+    types = handler.get_status_types()
+    status_keys = {key.lower(): key for key in statuses}
+    status_keys.update({title.lower(): key for key, title in statuses.items()})
+
+    report = {"rows": 0, "applied": 0, "students": 0, "missing": [], "ambiguous": [], "bad_status": [], "bad_rows": [],
+              "bad_values": []}
+    rows = []
+    for line_number, row in iter_csv_rows(stream):
+        if len(row) < 3:
+            report["bad_rows"].append(line_number)
+            continue
+        name, status, value = row[0], row[1], ",".join(row[2:]) if len(row) > 3 else row[2]
+        status_key = status_keys.get(status.lower())
+        if status_key is None:
+            if line_number == 1:
+                continue  # заголовок
+            report["bad_status"].append((line_number, status))
+            continue
+        try:
+            value = types[status_key].parse(value)
+        except ValueError as e:
+            report["bad_values"].append((line_number, value, str(e)))
+            continue
+        report["rows"] += 1
+        rows.append((line_number, name, status_key, value))
+    return rows, report
+
+
+def split_names(resolver: StudentResolver, rows) -> tuple[dict, list]:
+    """Точные совпадения (сразу) и имена, требующие нечеткого сопоставления."""
+    resolved, fuzzy = {}, []
+    for _, name, _, _ in rows:
+        if name in resolved:
+            continue
+        result = resolved[name] = resolver.resolve_exact(name)
+        if result is None:
+            fuzzy.append(name)
+    return resolved, fuzzy
+
+
+def apply_import(handler, rows, resolved: dict, report: dict, dry_run: bool = False) -> dict:
+    """Применение строк с сопоставленными именами одним пакетом (set_statuses), заполнение отчета."""
+    updates = defaultdict(dict)  # {id_s: {ключ: значение}}
+    for line_number, name, status_key, value in rows:
+        state, found = resolved[name]
+        if state == MISSING:
+            report["missing"].append((line_number, name))
+        elif state == AMBIGUOUS:
+            report["ambiguous"].append((line_number, name, found))
+        else:
+            for id_s in found:
+                updates[id_s][status_key] = value
+            report["applied"] += 1
+
+    report["students"] = len(updates)
+    if not dry_run and updates:
+        if handler.set_statuses(updates) is None:
+            raise OSError("Ошибка записи файлов статусов, импорт не выполнен (изменения не внесены).")
+    logger.info("Импорт CSV: строк %s, применено %s, не найдено %s, неоднозначно %s.",
+                report["rows"], report["applied"], len(report["missing"]), len(report["ambiguous"]))
+    return report
+
+
+def import_csv(handler, stream, dry_run: bool = False, pool=None) -> dict:
+    """
+    Импорт значений статусов. Все изменения применяются одним пакетом (set_statuses).
+
+    Args:
+        handler: TeacherDataHandler.
+        stream: текстовый поток CSV.
+        dry_run: True - только проверка, без записи.
+        pool: offload.JobPool для нечеткого сопоставления (None - в текущем процессе).
+
+    Returns:
+        dict: отчет {"rows", "applied", "students", "missing", "ambiguous", "bad_status", "bad_rows", "bad_values"}.
+    """
+    rows, report = parse_csv(handler, stream)
+    students = handler.get_data_link_students()
+    resolver = StudentResolver(students)
+    resolved, fuzzy = split_names(resolver, rows)
+    if pool is None:
+        resolved.update({name: resolver.resolve(name) for name in fuzzy})
+    else:
+        for part in pool.run(resolve_names, chunked(fuzzy, RESOLVE_CHUNK), data_token(handler), students, DIFF_SYMBOLS):
+            resolved.update(part)
+    return apply_import(handler, rows, resolved, report, dry_run)
+
+
+async def import_csv_stream(handler, raw: bytes, pool, dry_run: bool = False, on_progress=None) -> dict:
+    """
+    Импорт из содержимого файла (например, документа Telegram) без блокировки цикла событий: разбор
+    - в потоке, нечеткое сопоставление - частями в пуле процессов. Запись (set_statuses) выполняется
+    в цикле событий, как и остальные изменения данных обработчиками бота, и не содержит точек
+    переключения задач: отмена задачи до начала записи прекращает импорт без изменений, после
+    ее начала - не действует. Если во время сопоставления изменилась структура (запись структуры,
+    перечитывание файла) и id_s могли перенумероваться, имена перед записью сопоставляются заново
+    по текущим данным в цикле событий.
+
+    Args:
+        pool: offload.JobPool.
+        on_progress: async функция (сопоставлено имен, всего имен для нечеткого сопоставления).
+    """
+    data_links = handler.data_links
+    students = handler.get_data_link_students()
+
+    def prepare():
+        rows, report = parse_csv(handler, io.StringIO(decode_csv(raw), newline=""))
+        return rows, report, *split_names(StudentResolver(students), rows)
+
+    rows, report, resolved, fuzzy = await asyncio.to_thread(prepare)
+    done = 0
+    chunks = chunked(fuzzy, RESOLVE_CHUNK)
+    async with aclosing(pool.stream(resolve_names, chunks, data_token(handler), students, DIFF_SYMBOLS)) as results:
+        async for part in results:
+            resolved.update(part)
+            done += len(part)
+            if on_progress is not None:
+                await on_progress(done, len(fuzzy))
+    if handler.data_links is not data_links:
+        logger.info("Импорт CSV: структура изменилась во время сопоставления, имена сопоставляются заново.")
+        resolver = StudentResolver(handler.get_data_link_students())
+        resolved, fuzzy = split_names(resolver, rows)
+        resolved.update({name: resolver.resolve(name) for name in fuzzy})
+    return apply_import(handler, rows, resolved, report, dry_run)
+
+
+def import_csv_bytes(handler, raw: bytes, dry_run: bool = False) -> dict:
+    """Импорт из содержимого файла (например, документа Telegram)."""
+    return import_csv(handler, io.StringIO(decode_csv(raw), newline=""), dry_run)
+
+
+def format_report(report: dict, limit: int = 15) -> str:
+    """Текстовый отчет об импорте."""
+    lines = [f"Строк: {report['rows']}, применено: {report['applied']} (студентов: {report['students']})."]
+    if report["missing"]:
+        lines.append(f"Не найдены ({len(report['missing'])}):")
+        lines.extend(f"  стр. {line}: {name}" for line, name in report["missing"][:limit])
+    if report["ambiguous"]:
+        lines.append(f"Неоднозначные ({len(report['ambiguous'])}):")
+        lines.extend(f"  стр. {line}: {name} -> {', '.join(found)}" for line, name, found in report["ambiguous"][:limit])
+    if report["bad_status"]:
+        lines.append(f"Неизвестные статусы ({len(report['bad_status'])}):")
+        lines.extend(f"  стр. {line}: {status}" for line, status in report["bad_status"][:limit])
+    if report["bad_values"]:
+        lines.append(f"Некорректные значения ({len(report['bad_values'])}):")
+        lines.extend(f"  стр. {line}: '{value}' - {error}" for line, value, error in report["bad_values"][:limit])
+    if report["bad_rows"]:
+        lines.append(f"Некорректные строки: {', '.join(map(str, report['bad_rows'][:limit]))}")
+    return "\n".join(lines)
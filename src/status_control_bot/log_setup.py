@@ -0,0 +1,107 @@
+import json
+import queue
+import atexit
+import logging
+from functools import wraps
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+# Контекст текущего обновления: {"user_id": int, "state": str, "handler": str}
+log_context: ContextVar = ContextVar("log_context", default=None)
+
+CONTEXT_FIELDS = ("user_id", "state", "handler")
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - [%(user_id)s|%(state)s|%(handler)s] %(message)s"
+
+
+class ContextFilter(logging.Filter):
+    """
+    Добавление контекста обновления в запись лога. Фильтр вызывается только для записей,
+    прошедших проверку уровня, поэтому при отключенном уровне контекст не обрабатывается.
+    """
+
+    def filter(self, record):
+        ctx = log_context.get() or {}
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, ctx.get(field, "-"))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Структурированный формат: одна json-строка на запись."""
+
+    def format(self, record):
+        item = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, "-")
+            if value != "-":
+                item[field] = value
+        if record.exc_info:
+            item["exc"] = self.formatException(record.exc_info)
+        return json.dumps(item, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=logging.INFO, log_file="teacher_bot.log", json_format=False) -> QueueListener:
+    """
+    Неблокирующее логирование: обработчики приложения только кладут записи в очередь,
+    а вывод в консоль и запись (с ротацией) файла выполняет фоновый поток QueueListener.
+
+    Args:
+        level: уровень логирования.
+        log_file: файл лога, None - только консоль.
+        json_format: True, если требуется формат json-lines.
+
+    Returns:
+        QueueListener: запущенный фоновый обработчик (останавливается при выходе).
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(RotatingFileHandler(
+            log_file,
+            maxBytes=5 * 1024 * 1024,  # максимальный размер 5 Мб
+            backupCount=3,  # количество логбэков 3
+            encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # дописываем очередь при завершении
+    return listener
+
+
+def with_log_context(callback, state=None):
+    """Обертка асинхронного обработчика: устанавливает контекст лога на время обработки обновления."""
+
+    @wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        user = getattr(update, "effective_user", None)
+        token = log_context.set({
+            "user_id": user.id if user else "-",
+            "state": state or "-",
+            "handler": callback.__name__,
+        })
+        try:
+            return await callback(update, context, *args, **kwargs)
+        finally:
+            log_context.reset(token)
+
+    return wrapper
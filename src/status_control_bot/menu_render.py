@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from telegram.error import BadRequest
+from src.status_control_bot.metrics import METRICS
+
+
+logger = logging.getLogger(__name__)
+
+
+class MenuRenderer:
+    """
+    Отрисовка меню через edit_message_text с учетом последнего отправленного состояния
+    каждого сообщения {(chat_id, message_id): (текст, клавиатура)}:
+        - повторная отрисовка того же содержимого не отправляется (нет ошибки "message is not modified");
+        - пока изменение сообщения выполняется, новые изменения того же сообщения объединяются,
+          и после завершения отправляется только последнее.
+    Все изменения меню должны проходить через один экземпляр, иначе сохраненное состояние устареет.
+
+    Args:
+        delay: задержка (сек.) перед отправкой для объединения серии изменений (0 - без задержки).
+        max_messages: количество запоминаемых сообщений (вытесняются давно измененные).
+    """
+
+    def __init__(self, delay: float = 0.0, max_messages: int = 10_000):
+        self.delay = delay
+        self.max_messages = max_messages
+        self.last = OrderedDict()  # {(chat_id, message_id): (text, reply_markup)}
+        self.pending = {}  # {(chat_id, message_id): (text, reply_markup)} ожидающие отправки
+        self.stats = {"edits": 0, "skipped": 0, "coalesced": 0}
+
+    def count(self, name: str):
+        self.stats[name] += 1
+        METRICS.add_count(f"menu_{name}")
+
+    @property
+    def saved(self) -> int:
+        """Количество сэкономленных запросов к Bot API."""
+        return self.stats["skipped"] + self.stats["coalesced"]
+
+    def remember(self, message, text: str, reply_markup=None):
+        """Запоминание состояния отправленного (не измененного) сообщения, например reply_text."""
+        if message is not None:
+            self.store((message.chat_id, message.message_id), (text, reply_markup))
+
+    def forget(self, chat_id, message_id):
+        self.last.pop((chat_id, message_id), None)
+
+    def store(self, key, state):
+        self.last[key] = state
+        self.last.move_to_end(key)
+        while len(self.last) > self.max_messages:
+            self.last.popitem(last=False)
+
+    async def edit_query(self, query, text: str, reply_markup=None) -> bool:
+        """Изменение сообщения, к которому относится нажатая кнопка."""
+        message = query.message
+        if message is None:  # сообщение недоступно (inline-режим, слишком старое)
+            await query.edit_message_text(text=text, reply_markup=reply_markup)
+            return True
+        return await self.edit(query.get_bot(), message.chat_id, message.message_id, text, reply_markup)
+
+    async def edit(self, bot, chat_id, message_id, text: str, reply_markup=None) -> bool:
+        """
+        Изменение сообщения. Возвращает True, если запрос к Bot API был отправлен этим вызовом.
+        """
+        key = (chat_id, message_id)
+        state = (text, reply_markup)
+        if key in self.pending:
+            self.pending[key] = state  # будет отправлено после текущего изменения
+            self.count("coalesced")
+            return False
+        if self.last.get(key) == state:
+            self.count("skipped")
+            return False
+
+        self.pending[key] = state
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            while True:
+                state = self.pending[key]
+                if self.last.get(key) == state:
+                    break
+                try:
+                    await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=state[0],
+                                                reply_markup=state[1])
+                except BadRequest as e:
+                    if "not modified" not in str(e).lower():
+                        self.forget(chat_id, message_id)
+                        raise
+                    self.count("skipped")
+                else:
+                    self.count("edits")
+                self.store(key, state)
+                if self.pending[key] is state:
+                    break  # за время отправки новых изменений не было
+        finally:
+            self.pending.pop(key, None)
+        return True
@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from functools import wraps
+
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, сек.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами."""
+    __slots__ = ("counts", "total", "count", "errors")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+
+class MetricsRegistry:
+    """
+    Метрики обработчиков бота и вызовов хранилища: гистограммы задержек, количество вызовов,
+    ошибки и объем дискового ввода-вывода. При enabled=False обертки не устанавливаются,
+    а учет ввода-вывода сводится к проверке флага.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.time()
+        self.latency = {}  # {(вид, имя): Histogram}
+        self.io_bytes = {"read": 0, "write": 0}
+        self.counters = {}  # {имя: значение}, например menu_edits_skipped
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False):
+        histogram = self.latency.get((kind, name))
+        if histogram is None:
+            histogram = self.latency[(kind, name)] = Histogram()
+        histogram.observe(seconds, error)
+
+    def add_io(self, direction: str, nbytes: int):
+        if self.enabled:
+            self.io_bytes[direction] += nbytes
+
+    def add_count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        items = sorted(list(self.latency.items()))  # снимок, запись может идти из другого потока
+        for kind in sorted({kind for (kind, _), _ in items}):
+            metric = f"bot_{kind}_latency_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            errors = []
+            for (item_kind, name), histogram in items:
+                if item_kind != kind:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{kind}="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{kind}="{name}"}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{{kind}="{name}"}} {histogram.count}')
+                errors.append(f'bot_{kind}_errors_total{{{kind}="{name}"}} {histogram.errors}')
+            lines.append(f"# TYPE bot_{kind}_errors_total counter")
+            lines.extend(errors)
+        lines.append("# TYPE bot_disk_io_bytes_total counter")
+        for direction, nbytes in self.io_bytes.items():
+            lines.append(f'bot_disk_io_bytes_total{{direction="{direction}"}} {nbytes}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE bot_{name}_total counter")
+            lines.append(f"bot_{name}_total {value}")
+        lines.append("# TYPE bot_uptime_seconds gauge")
+        lines.append(f"bot_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_path):
+        """Атомарная запись метрик в файл (формат textfile collector)."""
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, file_path)
+
+    # region Инструментирование
+    def instrument_handler(self, callback, state=None):
+        """Обертка асинхронного обработчика бота (совместима с wrap_callbacks)."""
+        name = callback.__name__
+
+        @wraps(callback)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                return await callback(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                self.observe("handler", name, time.perf_counter() - start, error)
+
+        return wrapper
+
+    def instrument_function(self, func, name):
+        """Обертка синхронной функции хранилища."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                self.observe("storage", name, time.perf_counter() - start, error)
+
+        return wrapper
+
+    def instrument_class(self, cls, exclude=()):
+        """Обертка всех публичных методов класса (включая static- и classmethod)."""
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or attr in exclude:
+                continue
+            name = f"{cls.__name__}.{attr}"
+            if isinstance(value, staticmethod):
+                setattr(cls, attr, staticmethod(self.instrument_function(value.__func__, name)))
+            elif isinstance(value, classmethod):
+                setattr(cls, attr, classmethod(self.instrument_function(value.__func__, name)))
+            elif callable(value):
+                setattr(cls, attr, self.instrument_function(value, name))
+    # endregion
+
+    # region Экспорт
+    async def serve(self, host: str, port: int):
+        """Локальный HTTP-сервер с метриками (GET /metrics)."""
+
+        async def handle(reader, writer):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # заголовки не нужны
+                if request.split(b" ")[1:2] == [b"/metrics"]:
+                    body, status = self.render_prometheus().encode(), "200 OK"
+                else:
+                    body, status = b"Not found\n", "404 Not Found"
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info("Метрики доступны по адресу http://%s:%s/metrics", host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def run_dump(self, file_path, interval: float):
+        """Периодическая запись метрик в файл, завершается отменой задачи."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.dump, file_path)
+            except Exception as e:
+                logger.error("Ошибка записи метрик в файл %s: %s", file_path, e)
+    # endregion
+
+
+# Общий реестр метрик процесса
+METRICS = MetricsRegistry()
@@ -0,0 +1,149 @@
+import sys
+from typing import Optional
+from dataclasses import dataclass, field
+
+
+"""
+Компактная модель данных в памяти для больших наборов. Вместо вложенных словарей:
+    - записи студентов - dataclass со __slots__;
+    - группы, ключи статусов и повторяющиеся значения - интернированные строки;
+    - значения статусов - список, индекс в котором - целочисленный код статуса (StatusSchema).
+Модель преобразуется в существующий формат json и обратно (from_json / to_json).
+"""
+
+
+def intern(value):
+    """Интернирование строк, прочие значения возвращаются без изменений."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class StatusSchema:
+    """Перечень статусов и их целочисленные коды (порядок ключей в teachers.json)."""
+    __slots__ = ("keys", "titles", "codes")
+
+    def __init__(self, statuses: dict):
+        self.keys = tuple(sys.intern(key) for key in statuses)
+        self.titles = tuple(intern(title) for title in statuses.values())
+        self.codes = {key: code for code, key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def code(self, key: str) -> Optional[int]:
+        return self.codes.get(key, None)
+
+    def encode(self, data_f: dict) -> list:
+        """{ключ статуса: значение} -> [значение по коду]. Неизвестные ключи отбрасываются."""
+        values = [""] * len(self.keys)
+        for key, value in data_f.items():
+            code = self.codes.get(key, None)
+            if code is not None:
+                values[code] = intern(value)
+        return values
+
+    def decode(self, values: list) -> dict:
+        """[значение по коду] -> {ключ статуса: значение}."""
+        return dict(zip(self.keys, values))
+
+    def to_json(self) -> dict:
+        return dict(zip(self.keys, self.titles))
+
+
+RECORD_KEYS = ("file", "group", "work")
+DATASET_KEYS = ("data_dir", "teachers", "shared", "statuses", "groups", "schema", "status_types")
+
+
+@dataclass(slots=True)
+class StudentRecord:
+    """
+    Запись студента у преподавателя-владельца (аналог {"file", "group", "work"}). Прочие ключи
+    записи хранятся в extra (None, если их нет) и возвращаются to_json без изменений.
+    """
+    file: str
+    group: str = ""
+    work: str = ""
+    extra: Optional[dict] = None
+
+    @classmethod
+    def from_json(cls, item: dict):
+        extra = {key: value for key, value in item.items() if key not in RECORD_KEYS} or None
+        return cls(file=item["file"], group=intern(item.get("group", "")), work=item.get("work", ""), extra=extra)
+
+    def to_json(self) -> dict:
+        item = {"file": self.file, "group": self.group, "work": self.work}
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+
+@dataclass(slots=True)
+class Dataset:
+    """
+    Полный набор данных: структура teachers.json и значения статусов всех студентов.
+    values - {имя файла статусов: [значение по коду статуса]}, extra - прочие разделы teachers.json.
+    """
+    data_dir: str
+    schema: StatusSchema
+    groups: list = field(default_factory=list)
+    teachers: dict = field(default_factory=dict)  # {преподаватель: {студент: StudentRecord}}
+    shared: dict = field(default_factory=dict)  # {преподаватель: {студент: владелец}}
+    versions: Optional[dict] = None  # раздел "schema": версии перечня статусов (schema_evolution)
+    types: Optional[dict] = None  # раздел "status_types": типы статусов (status_types)
+    values: dict = field(default_factory=dict)
+    extra: Optional[dict] = None
+
+    @classmethod
+    def from_json(cls, data: dict, student_files: Optional[dict] = None):
+        """
+        Args:
+            data: содержимое teachers.json.
+            student_files: {имя файла: {ключ статуса: значение}} (например, кэш TeacherDataHandler).
+        """
+        schema = StatusSchema(data["statuses"])
+        teachers = {
+            teacher_name: {student_name: StudentRecord.from_json(item) for student_name, item in students.items()}
+            for teacher_name, students in data["teachers"].items()
+        }
+        shared = {teacher_name: {student_name: sys.intern(owner) for student_name, owner in links.items()}
+                  for teacher_name, links in data.get("shared", {}).items()}
+        values = {name: schema.encode(data_f) for name, data_f in (student_files or {}).items()}
+        extra = {key: value for key, value in data.items() if key not in DATASET_KEYS} or None
+        return cls(data_dir=data["data_dir"], schema=schema, groups=[sys.intern(group) for group in data["groups"]],
+                   teachers=teachers, shared=shared, versions=data.get("schema", None),
+                   types=data.get("status_types", None), values=values, extra=extra)
+
+    def to_json(self) -> tuple[dict, dict]:
+        """
+        Returns:
+            tuple: (содержимое teachers.json, {имя файла: {ключ статуса: значение}}).
+        """
+        data = {
+            "data_dir": self.data_dir,
+            "teachers": {teacher_name: {student_name: record.to_json() for student_name, record in students.items()}
+                         for teacher_name, students in self.teachers.items()},
+            "shared": {teacher_name: dict(links) for teacher_name, links in self.shared.items()},
+            "statuses": self.schema.to_json(),
+            "groups": list(self.groups),
+        }
+        if self.versions is not None:
+            data["schema"] = self.versions
+        if self.types is not None:
+            data["status_types"] = self.types
+        if self.extra:
+            data.update(self.extra)
+        return data, {name: self.schema.decode(values) for name, values in self.values.items()}
+
+    def get_status(self, file_name: str, status_key: str):
+        code = self.schema.code(status_key)
+        values = self.values.get(file_name, None)
+        if code is None or values is None:
+            return None
+        return values[code]
+
+    def set_status(self, file_name: str, status_key: str, value) -> bool:
+        code = self.schema.code(status_key)
+        values = self.values.get(file_name, None)
+        if code is None or values is None:
+            return False
+        values[code] = intern(value)
+        return True
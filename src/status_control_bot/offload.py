@@ -0,0 +1,107 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from functools import partial
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Выполнение CPU-емких пакетных заданий (отчеты, нечеткое сопоставление имен при импорте,
+транслитерация при создании структуры) в пуле процессов, чтобы они не останавливали цикл событий
+бота. Задание делится на части, функция части выполняется в процессе пула, результаты частей
+возвращаются обработчику по мере готовности. Функции заданий должны быть объявлены на уровне модуля
+и не зависеть от состояния бота: процессы пула запускаются через spawn и получают только аргументы.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def chunked(items, size: int):
+    """Деление последовательности на списки по size элементов."""
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def lower_priority(nice: int):
+    """Инициализация процесса пула: пониженный приоритет (на одном ядре бот вытесняет задания)."""
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+class JobPool:
+    """
+    Пул процессов для пакетных заданий. Процессы создаются при первом задании. Одновременно пулу
+    передается не более max_pending частей задания, следующие - по мере получения результатов,
+    поэтому отмена задания не ждет обработки всех частей.
+
+    Args:
+        workers: количество процессов (0 - части выполняются в потоках процесса бота).
+        max_pending: частей одного задания, переданных пулу одновременно.
+        nice: понижение приоритета процессов пула.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = None, nice: int = 10):
+        self.workers = workers
+        self.max_pending = max_pending or max(2, workers * 2)
+        self.nice = nice
+        self.executor = None
+        self.submitted = 0  # частей передано пулу (всего)
+
+    def get_executor(self):
+        if self.executor is None and self.workers > 0:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=lower_priority, initargs=(self.nice,))
+        return self.executor
+
+    async def stream(self, func, chunks, *args):
+        """
+        Асинхронный генератор результатов func(*args, часть) в порядке частей. При отмене задачи,
+        ожидающей результат (или закрытии генератора), не начатые части отменяются, а результаты
+        выполняющихся отбрасываются.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        chunks = iter(chunks)
+        pending = deque()
+
+        def submit():
+            for chunk in chunks:
+                pending.append(loop.run_in_executor(executor, func, *args, chunk))
+                self.submitted += 1
+                if len(pending) >= self.max_pending:
+                    return
+
+        try:
+            submit()
+            while pending:
+                result = await pending.popleft()
+                METRICS.add_count("offload_chunks")
+                submit()
+                yield result
+                # Точка отмены: результат уже готовой части получается без переключения задач
+                await asyncio.sleep(0)
+        finally:
+            if pending:
+                METRICS.add_count("offload_cancelled")
+            for future in pending:
+                future.cancel()
+
+    def run(self, func, chunks, *args):
+        """Синхронный вариант stream для утилит командной строки (генератор результатов)."""
+        executor = self.get_executor()
+        if executor is None:
+            return (func(*args, chunk) for chunk in chunks)
+        return executor.map(partial(func, *args), chunks)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -1,5 +1,6 @@
 from collections import defaultdict, deque
 import time
+import asyncio
 
 class RateLimiter:
     # Лимитирование сообщений в секунду
@@ -19,4 +20,42 @@ class RateLimiter:
         if len(timestamps) >= self.max_calls:
             return False
         timestamps.append(now)
-        return True
\ No newline at end of file
+        return True
+
+
+class TokenBucket:
+    """
+    Ограничение частоты исходящих запросов (например, отправки сообщений в Telegram):
+    rate токенов в секунду, не более capacity подряд (по умолчанию 1 - равномерная отправка).
+    Источник времени и функция ожидания передаются явно, что позволяет проверять расписание
+    с подменой часов.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= tokens - 1e-9:  # погрешность вычислений с плавающей точкой
+            self.tokens = max(0.0, self.tokens - tokens)
+            return True
+        return False
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Время ожидания (сек.) до появления нужного количества токенов."""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        while not self.try_acquire(tokens):
+            await self.sleep(self.delay(tokens))
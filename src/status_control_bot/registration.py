@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime
+from contextlib import nullcontext
+from src.status_control_bot.utils import file_signature, load_json
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+APPROVED = "approved"
+
+
+class RegistrationQueue:
+    """
+    Буферизованная очередь запросов на регистрацию. Запросы хранятся в памяти с индексом
+    по Telegram id (повторные нажатия не создают дубликатов) и периодически сбрасываются
+    в структурированный json-файл вне цикла событий.
+
+    Если файл используют несколько процессов бота (lock - coordination.FileLock), в файл
+    записываются только измененные запросы поверх его актуального содержимого, а изменения
+    других процессов перечитываются при смене сигнатуры файла (не чаще check_interval).
+    """
+
+    def __init__(self, file_path, legacy_file=None, flush_interval: float = 10.0, lock=None,
+                 check_interval: float = 1.0):
+        self.file_path = Path(file_path)
+        self.flush_interval = flush_interval
+        self.lock = lock
+        self.check_interval = check_interval
+        self.requests = {}  # {user_id: {...}}
+        self.changed = set()  # user_id запросов, измененных после последнего сброса
+        self.signature = None  # сигнатура файла при последнем чтении или записи
+        self.last_check = 0.0
+        self.load(legacy_file)
+
+    def load(self, legacy_file=None):
+        if self.file_path.exists():
+            self.requests, self.signature = self.read()
+        elif legacy_file is not None and Path(legacy_file).exists():
+            self.import_legacy(legacy_file)
+
+    def read(self) -> tuple[dict, tuple]:
+        """Содержимое файла {user_id: запрос} и его сигнатура."""
+        signature = file_signature(self.file_path)
+        data = load_json(self.file_path) if signature else None
+        return ({item["user_id"]: item for item in data} if isinstance(data, list) else {}), signature
+
+    def refresh(self):
+        """Перечитывание файла, измененного другим процессом. Несохраненные изменения не теряются."""
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        if file_signature(self.file_path) in (None, self.signature):
+            return
+        requests, self.signature = self.read()
+        requests.update({user_id: self.requests[user_id] for user_id in self.changed})
+        self.requests = requests
+
+    def import_legacy(self, legacy_file):
+        """Перенос записей из старого формата 'дата, id, имя, фамилия' с удалением дублей."""
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = [part.strip() for part in line.split(",")]
+                if len(parts) < 4 or not parts[2].isdigit():
+                    continue
+                created = f"{parts[0]}, {parts[1]}"
+                self.submit(int(parts[2]), parts[3], parts[4] if len(parts) > 4 else "", created=created)
+
+    def submit(self, user_id: int, first_name: str = "", last_name: str = "", username: str = "",
+               created: str = None) -> bool:
+        """Регистрация запроса. Возвращает True, если запрос новый."""
+        now = created or datetime.now().strftime("%Y.%m.%d, %H:%M")
+        self.refresh()
+        item = self.requests.get(user_id)
+        is_new = item is None
+        if is_new:
+            item = {"user_id": user_id, "created": now, "status": PENDING}
+            self.requests[user_id] = item
+        item.update({"first_name": first_name or "", "last_name": last_name or "",
+                     "username": username or "", "updated": now})
+        self.changed.add(user_id)
+        return is_new
+
+    def get(self, user_id: int):
+        self.refresh()
+        return self.requests.get(user_id, None)
+
+    def pending(self) -> list[dict]:
+        """Запросы, ожидающие подтверждения (в порядке поступления)."""
+        self.refresh()
+        return [item for item in self.requests.values() if item["status"] == PENDING]
+
+    def approved(self) -> list[int]:
+        """id подтвержденных пользователей."""
+        self.refresh()
+        return [user_id for user_id, item in self.requests.items() if item["status"] == APPROVED]
+
+    def approve(self, user_id: int) -> bool:
+        self.refresh()
+        item = self.requests.get(user_id)
+        if item is None or item["status"] == APPROVED:
+            return False
+        item["status"] = APPROVED
+        self.changed.add(user_id)
+        return True
+
+    def write(self, items: list[dict]):
+        """Атомарная запись (через временный файл) перечня запросов."""
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.file_path)
+
+    def merge(self, changes: dict) -> tuple[dict, tuple]:
+        """
+        Запись измененных запросов {user_id: запрос} поверх актуального содержимого файла под
+        блокировкой. Подтверждение, записанное другим процессом, сохраняется.
+
+        Returns:
+            tuple: (содержимое файла после записи {user_id: запрос}, сигнатура файла).
+        """
+        with self.lock if self.lock is not None else nullcontext():
+            requests, _ = self.read()
+            for user_id, item in changes.items():
+                current = requests.get(user_id)
+                if current is not None and current["status"] == APPROVED:
+                    item.update(status=APPROVED, created=current["created"])
+                requests[user_id] = item
+            self.write(list(requests.values()))
+            return requests, file_signature(self.file_path)
+
+    async def flush(self) -> bool:
+        """Сброс буфера на диск, если были изменения."""
+        if not self.changed:
+            return False
+        changes = {user_id: dict(self.requests[user_id]) for user_id in self.changed}  # копия для потока записи
+        self.changed = set()
+        try:
+            requests, signature = await asyncio.to_thread(self.merge, changes)
+        except Exception as e:
+            self.changed.update(changes)
+            logger.error(f"Ошибка при сохранении запросов регистрации в файл {self.file_path}: {e}")
+            return False
+        # Запросы, измененные во время записи, остаются в памяти до следующего сброса
+        requests.update({user_id: self.requests[user_id] for user_id in self.changed})
+        self.requests, self.signature = requests, signature
+        return True
+
+    async def run(self):
+        """Периодический сброс буфера, завершается отменой задачи."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
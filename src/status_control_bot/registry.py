@@ -0,0 +1,291 @@
+import time
+import asyncio
+import logging
+from pathlib import Path
+from functools import wraps
+from contextvars import ContextVar
+from collections import OrderedDict
+from src.status_control_bot.utils import load_json, save_json
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Несколько независимых наборов данных (подразделений, у каждого свой teachers.json и набор статусов)
+в одном процессе бота. Набор выбирается для пользователя (в группе - для чата), загружается при
+первом обращении и выгружается после простоя. Код обработчиков работает с текущим набором через
+TenantProxy так же, как с единственным TeacherDataHandler.
+
+Пример файла выбора (ключ - Telegram id пользователя или чата):
+{
+    "123456789": "кафедра_1",
+    "-100200300": "кафедра_2"
+}
+"""
+
+logger = logging.getLogger(__name__)
+
+# Набор данных, в контексте которого обрабатывается текущее обновление
+current_tenant: ContextVar = ContextVar("current_tenant", default=None)
+
+
+class Tenant:
+    """Набор данных и связанные с ним объекты (заполняются фабрикой реестра)."""
+    __slots__ = ("name", "handler", "access", "search", "watcher", "store", "consistency", "compactor", "reminders",
+                 "last_used")
+
+    def __init__(self, name: str, handler, access=None, search=None, watcher=None, store=None, consistency=None,
+                 compactor=None):
+        self.name = name
+        self.handler = handler  # TeacherDataHandler
+        self.access = access  # AccessControl
+        self.search = search  # StudentSearch
+        self.watcher = watcher  # DataWatcher
+        self.store = store  # SharedStore, если каталог данных используют несколько процессов
+        self.consistency = consistency  # ConsistencyScanner
+        self.compactor = compactor  # StatusCompactor
+        self.reminders = None  # ReminderScheduler, создается при первой проверке сроков
+        self.last_used = 0.0
+
+
+class TenantProxy:
+    """Доступ к объекту текущего набора данных (Tenant.<attr>) как к обычному объекту."""
+    __slots__ = ("_registry", "_attr")
+
+    def __init__(self, registry, attr: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_attr", attr)
+
+    def __getattr__(self, name):
+        return getattr(getattr(self._registry.current(), self._attr), name)
+
+    def __setattr__(self, name, value):
+        setattr(getattr(self._registry.current(), self._attr), name, value)
+
+
+class DatasetRegistry:
+    """
+    Реестр наборов данных с ленивой загрузкой. Загрузка выполняется в отдельном потоке (не блокирует
+    цикл событий), одновременные обращения к еще не загруженному набору ждут одну загрузку.
+    Одновременно в памяти не более max_loaded наборов (вытесняются давно использованные),
+    набор без обращений дольше idle_timeout сек. выгружается. Перед выгрузкой сохраняется
+    бинарный снимок, поэтому повторная загрузка быстрая.
+
+    Args:
+        datasets: {имя: путь к teachers.json}, первый набор используется по умолчанию.
+        factory: функция (имя, путь) -> Tenant.
+        selections_file: файл выбора наборов пользователями и чатами.
+    """
+
+    def __init__(self, datasets: dict, factory, selections_file=None, idle_timeout: float = 1800.0,
+                 max_loaded: int = 8, clock=time.monotonic):
+        if not datasets:
+            raise ValueError("не задан ни один набор данных")
+        self.datasets = dict(datasets)
+        self.default = next(iter(self.datasets))
+        self.factory = factory
+        self.selections_file = Path(selections_file) if selections_file else None
+        self.idle_timeout = idle_timeout
+        self.max_loaded = max(1, max_loaded)
+        self.clock = clock
+        self.tenants = OrderedDict()  # {имя: Tenant} загруженные, в порядке использования
+        self.loading = {}  # {имя: asyncio.Task} выполняющиеся загрузки
+        self.selections = {}  # {user_id или chat_id: имя}
+        self.load_selections()
+
+    def load_selections(self):
+        if self.selections_file is None or not self.selections_file.exists():
+            return
+        data = load_json(self.selections_file) or {}
+        self.selections = {int(key): name for key, name in data.items() if name in self.datasets}
+
+    def names(self) -> list[str]:
+        return list(self.datasets)
+
+    def loaded(self) -> list[Tenant]:
+        return list(self.tenants.values())
+
+    # region Выбор набора
+    @staticmethod
+    def key_for(update) -> int:
+        """Ключ выбора: чат для групп, иначе пользователь (в т.ч. для inline-запросов)."""
+        chat = getattr(update, "effective_chat", None)
+        if chat is not None and chat.type != "private":
+            return chat.id
+        user = getattr(update, "effective_user", None)
+        return user.id if user is not None else None
+
+    def selected(self, key) -> str:
+        return self.selections.get(key, self.default)
+
+    def select(self, key: int, name: str) -> bool:
+        """Выбор набора для пользователя или чата с сохранением в файл."""
+        if name not in self.datasets:
+            return False
+        if name == self.default:
+            self.selections.pop(key, None)
+        else:
+            self.selections[key] = name
+        if self.selections_file is not None:
+            try:
+                save_json(self.selections_file, {str(item): value for item, value in self.selections.items()})
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении выбора наборов данных в файл {self.selections_file}: {e}")
+                return False
+        return True
+    # endregion
+
+    # region Загрузка и выгрузка
+    def get(self, name: str = None, touch: bool = True) -> Tenant:
+        """Набор данных с загрузкой в текущем потоке (при запуске, вне обработчиков)."""
+        name = name or self.default
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            tenant, evicted = self.add(self.create(name))
+            for item in evicted:
+                self.release(item)
+        return self.use(tenant, touch)
+
+    async def acquire(self, name: str = None, touch: bool = True) -> Tenant:
+        """Набор данных с загрузкой (и сохранением вытесненных наборов) в отдельном потоке."""
+        name = name or self.default
+        tenant = self.tenants.get(name)
+        if tenant is None:
+            task = self.loading.get(name)
+            if task is None:
+                task = self.loading[name] = asyncio.ensure_future(asyncio.to_thread(self.create, name))
+                task.add_done_callback(lambda _: self.loading.pop(name, None))
+            tenant, evicted = self.add(await asyncio.shield(task))
+            for item in evicted:
+                await asyncio.to_thread(self.release, item)
+        return self.use(tenant, touch)
+
+    async def visit(self, name: str, callback):
+        """
+        Выполнение async callback(tenant) для набора без изменения порядка использования (фоновые
+        задачи, например напоминания). Загруженный набор не отмечается как используемый, незагруженный
+        загружается в отдельном потоке временно: не регистрируется, не вытесняет наборы пользователей
+        и освобождается после выполнения.
+        """
+        tenant = self.tenants.get(name)
+        if tenant is not None:
+            return await callback(tenant)
+        tenant = await asyncio.to_thread(self.create, name)
+        try:
+            return await callback(tenant)
+        finally:
+            handler = tenant.handler
+            # Снимок сохраняется только если набор загружен без него (следующая загрузка - быстрая)
+            if handler.snapshot_file and not handler.snapshot_loaded:
+                await asyncio.to_thread(self.release, tenant)
+
+    def create(self, name: str) -> Tenant:
+        if name not in self.datasets:
+            raise KeyError(f"набор данных '{name}' не найден")
+        start = time.perf_counter()
+        tenant = self.factory(name, self.datasets[name])
+        tenant.last_used = self.clock()
+        METRICS.add_count("dataset_loads")
+        logger.info(f"Набор данных '{name}' загружен за {time.perf_counter() - start:.2f} с.")
+        return tenant
+
+    def add(self, tenant: Tenant) -> tuple[Tenant, list]:
+        """
+        Регистрация загруженного набора.
+
+        Returns:
+            tuple: (набор - уже зарегистрированный, если загружен другим обращением, [вытесненные наборы]).
+        """
+        loaded = self.tenants.get(tenant.name)
+        if loaded is not None:
+            return loaded, []
+        self.tenants[tenant.name] = tenant
+        evicted = []
+        while len(self.tenants) > self.max_loaded:
+            evicted.append(self.tenants.pop(next(iter(self.tenants))))
+        return tenant, evicted
+
+    def use(self, tenant: Tenant, touch: bool) -> Tenant:
+        if touch:
+            tenant.last_used = self.clock()
+            if tenant.name in self.tenants:
+                self.tenants.move_to_end(tenant.name)
+        return tenant
+
+    @staticmethod
+    def release(tenant: Tenant):
+        """Сохранение снимка выгружаемого набора. Обработчики, уже получившие набор, завершаются с ним."""
+        try:
+            tenant.handler.save_binary_snapshot()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения снимка набора данных '{tenant.name}': {e}")
+        METRICS.add_count("dataset_unloads")
+        logger.info(f"Набор данных '{tenant.name}' выгружен.")
+
+    def idle(self) -> list[str]:
+        now = self.clock()
+        return [name for name, tenant in self.tenants.items() if now - tenant.last_used > self.idle_timeout]
+
+    async def unload_idle(self) -> list[str]:
+        names = self.idle()
+        for name in names:
+            await asyncio.to_thread(self.release, self.tenants.pop(name))
+        return names
+
+    async def check(self) -> list[str]:
+        """
+        Проверка внешних изменений загруженных наборов, согласованности их каталогов (не чаще
+        интервала сканера), уплотнение файлов статусов и выгрузка простаивающих.
+        """
+        for tenant in self.loaded():
+            try:
+                if tenant.watcher is not None:
+                    await tenant.watcher.check()
+                if tenant.consistency is not None:
+                    await tenant.consistency.check()
+                if tenant.compactor is not None:
+                    await tenant.compactor.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при проверке изменений набора данных '{tenant.name}': {e}")
+        return await self.unload_idle()
+
+    async def run(self, interval: float):
+        """Периодическая проверка, завершается отменой задачи."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+    def close(self):
+        """Выгрузка всех наборов с сохранением снимков (при остановке бота)."""
+        while self.tenants:
+            self.release(self.tenants.popitem(last=False)[1])
+    # endregion
+
+    # region Контекст обработчиков
+    def current(self) -> Tenant:
+        """Набор текущего обновления, вне обработчиков - набор по умолчанию."""
+        return current_tenant.get() or self.get(self.default, touch=False)
+
+    def proxy(self, attr: str) -> TenantProxy:
+        return TenantProxy(self, attr)
+
+    def with_tenant(self, callback, state=None):
+        """
+        Обертка асинхронного обработчика: устанавливает набор данных пользователя (чата) обновления
+        и применяет изменения этого набора, сделанные другими процессами.
+        """
+
+        @wraps(callback)
+        async def wrapper(update, context, *args, **kwargs):
+            tenant = await self.acquire(self.selected(self.key_for(update)))
+            if tenant.store is not None:
+                tenant.store.sync()  # изменения, сделанные другими процессами бота
+            token = current_tenant.set(tenant)
+            try:
+                return await callback(update, context, *args, **kwargs)
+            finally:
+                current_tenant.reset(token)
+
+        return wrapper
+    # endregion
@@ -0,0 +1,167 @@
+import re
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+from src.status_control_bot.status_types import FileIndex
+
+
+"""
+Напоминания о просроченных статусах. Срок статуса берется из его названия
+("Готовность ВКР на 15.05.25" -> 15.05.2025). Если после срока значение статуса у студента
+пустое, преподаватель получает одно сводное сообщение по всем своим студентам.
+"""
+
+DEADLINE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{2}|\d{4})(?!\d)")
+MESSAGE_LIMIT = 4096  # максимальная длина сообщения Telegram
+
+logger = logging.getLogger(__name__)
+
+
+def parse_deadline(title: str):
+    """Дата из названия статуса (последняя найденная), либо None."""
+    matches = DEADLINE_PATTERN.findall(title or "")
+    if not matches:
+        return None
+    day, month, year = (int(item) for item in matches[-1])
+    try:
+        return date(year + 2000 if year < 100 else year, month, day)
+    except ValueError:
+        return None
+
+
+class DeadlineIndex(FileIndex):
+    """
+    Индекс сроков: статусы со сроком (по возрастанию даты) и студенты, у которых эти статусы
+    не заполнены. Перестраивается при смене данных TeacherDataHandler, а после записи значений
+    обновляется по журналу измененных файлов (студент, очистивший значение, снова попадает
+    в индекс). На каждом шаге проверяются лишь кандидаты из индекса.
+    """
+
+    def __init__(self, handler):
+        super().__init__(handler)
+        self.deadlines = []  # [(срок, ключ статуса)]
+        self.pending = {}  # {ключ статуса: {id_s, ...}} незаполненные значения
+
+    def reset(self, types):
+        self.deadlines = sorted((deadline, key) for key, title in self.handler.get_statuses().items()
+                                if (deadline := parse_deadline(title)) is not None)
+        self.pending = {key: set() for _, key in self.deadlines}
+
+    def add(self, id_s, data_f, types):
+        for key, ids in self.pending.items():
+            if not data_f.get(key):
+                ids.add(id_s)
+
+    def discard(self, id_s):
+        for ids in self.pending.values():
+            ids.discard(id_s)
+
+    def overdue(self, today: date) -> dict:
+        """
+        Просроченные незаполненные статусы на дату today.
+
+        Returns:
+            dict: {id_t: [(id_s, ключ статуса), ...]}.
+        """
+        self.refresh()
+        result = defaultdict(list)
+        for deadline, key in self.deadlines:
+            if deadline >= today:
+                break  # сроки отсортированы
+            for id_s in self.pending[key]:
+                for id_t in self.handler.get_student_teachers(id_s):
+                    result[id_t].append((id_s, key))
+        return result
+
+
+class ReminderScheduler:
+    """
+    Периодическая рассылка напоминаний преподавателям.
+
+    Args:
+        handler: TeacherDataHandler.
+        recipients: функция id_t -> [chat_id, ...] получателей напоминаний преподавателя.
+        send: асинхронная функция (chat_id, text) отправки сообщения.
+        bucket: TokenBucket - ограничение частоты отправки.
+        repeat: период (сек.) повторного напоминания одному получателю.
+        clock: источник текущего времени (datetime), подменяется при проверке.
+        last_sent: история отправки {chat_id: время}, сохраняемая вне планировщика (при выгрузке данных).
+    """
+
+    def __init__(self, handler, recipients, send, bucket, repeat: float = 86400, clock=datetime.now,
+                 last_sent=None):
+        self.handler = handler
+        self.recipients = recipients
+        self.send = send
+        self.bucket = bucket
+        self.repeat = timedelta(seconds=repeat)
+        self.clock = clock
+        self.index = DeadlineIndex(handler)
+        self.last_sent = {} if last_sent is None else last_sent  # {chat_id: время последнего напоминания}
+
+    async def refresh(self):
+        """Загрузка недостающих файлов статусов (в отдельном потоке) и перестроение индекса."""
+        handler = self.handler
+        missing = handler.missing_student_files()
+        if missing:
+            fresh = await asyncio.to_thread(handler.read_student_files, handler.get_data_dir(), missing)
+            handler.update_student_files(fresh)
+        self.index.rebuild()
+
+    def format_reminder(self, items, limit: int = MESSAGE_LIMIT) -> str:
+        """Сводное сообщение; не помещающиеся в limit символов строки заменяются на '… и еще N'."""
+        statuses = self.handler.get_statuses()
+        lines = ["⏰ Не заполнены статусы после срока:"]
+        size = len(lines[0])
+        for n, (id_s, key) in enumerate(items):
+            line = f"• {self.handler.get_student_name_by_id(id_s)}: {statuses[key]}"
+            rest = len(items) - n - 1
+            # Место под строку "… и еще N" остается, пока после line есть еще элементы
+            reserve = len(f"\n… и еще {rest}") if rest else 0
+            if size + 1 + len(line) + reserve > limit:
+                lines.append(f"… и еще {len(items) - n}")
+                break
+            lines.append(line)
+            size += 1 + len(line)
+        return "\n".join(lines)
+
+    async def tick(self) -> int:
+        """Одна проверка. Возвращает количество отправленных сообщений."""
+        if self.index.is_stale():
+            await self.refresh()
+        now = self.clock()
+        sent = 0
+        for id_t, items in self.index.overdue(now.date()).items():
+            text = None
+            for chat_id in self.recipients(id_t):
+                last = self.last_sent.get(chat_id)
+                if last is not None and now - last < self.repeat:
+                    continue
+                text = text or self.format_reminder(items)
+                await self.bucket.acquire()
+                try:
+                    await self.send(chat_id, text)
+                except Exception as e:
+                    logger.error(f"Ошибка отправки напоминания {chat_id}: {e}")
+                    continue
+                self.last_sent[chat_id] = now
+                sent += 1
+        if sent:
+            logger.info(f"Отправлено напоминаний: {sent}.")
+        return sent
+
+    async def job(self, context):
+        """Callback для JobQueue.run_repeating."""
+        await self.tick()
+
+    async def run(self, interval: float):
+        """Цикл проверки, если JobQueue недоступна (не установлен APScheduler)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при проверке сроков статусов: {e}")
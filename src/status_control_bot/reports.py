@@ -0,0 +1,90 @@
+import io
+import csv
+from contextlib import aclosing
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.offload import chunked
+from src.status_control_bot.status_types import StatusType
+
+
+"""
+Список студентов со значениями статусов в CSV (разделитель ';', UTF-8 с BOM для Excel).
+Строки формируются частями в пуле процессов (offload.JobPool): процесс пула сам читает файлы статусов
+части студентов с диска и возвращает готовые байты CSV, процесс бота только склеивает части.
+"""
+
+REPORT_CHUNK = 500  # студентов в одной части
+
+
+def encode_rows(rows) -> bytes:
+    stream = io.StringIO(newline="")
+    csv.writer(stream, delimiter=";").writerows(rows)
+    return stream.getvalue().encode("utf-8")
+
+
+def report_header(statuses: dict) -> bytes:
+    return "\ufeff".encode("utf-8") + encode_rows([["Преподаватель", "Студент", "Группа", *statuses.values()]])
+
+
+def report_items(handler, teachers=None) -> list[tuple]:
+    """
+    Студенты отчета в порядке export_rows.
+
+    Args:
+        teachers: id преподавателей, студенты которых попадают в отчет (None - все).
+
+    Returns:
+        list: [(преподаватель, студент, группа, файл статусов), ...].
+    """
+    names = None if teachers is None else {handler.get_teacher_by_id(id_t) for id_t in teachers}
+    items = []
+    for teacher_name in handler.data["teachers"]:
+        if names is not None and teacher_name not in names:
+            continue
+        for student_name in handler.get_teacher_students(teacher_name):
+            data_s = handler.get_student_data_by_name(teacher_name, student_name)
+            if data_s is not None:
+                items.append((teacher_name, student_name, data_s.get("group", ""), data_s["file"]))
+    return items
+
+
+def render_rows(data_dir, status_types, items) -> bytes:
+    """
+    Задание пула: чтение файлов статусов части студентов и формирование строк CSV.
+
+    Args:
+        status_types: {ключ статуса: описание типа (StatusType.to_json)} в порядке столбцов.
+    """
+    files = TeacherDataHandler.read_student_files(data_dir, {item[3] for item in items})
+    types = [(key, StatusType.from_json(item)) for key, item in status_types.items()]
+    rows = []
+    for teacher_name, student_name, group, name in items:
+        data_f = files.get(name, (None, None))[1] or {}
+        rows.append([teacher_name, student_name, group,
+                     *(status_type.format(data_f.get(key, "")) for key, status_type in types)])
+    return encode_rows(rows)
+
+
+async def build_report(handler, pool, teachers=None, on_progress=None, chunk: int = REPORT_CHUNK) -> bytes:
+    """
+    Отчет по студентам (CSV). Выполнение прекращается отменой задачи.
+
+    Args:
+        pool: offload.JobPool.
+        teachers: id преподавателей (None - все).
+        on_progress: async функция (готово студентов, всего).
+        chunk: студентов в одной части.
+    """
+    statuses = handler.get_statuses()
+    types = handler.get_status_types()
+    items = report_items(handler, teachers)
+    parts = [report_header(statuses)]
+    done = 0
+    chunks = chunked(items, chunk)
+    async with aclosing(pool.stream(render_rows, chunks, handler.get_data_dir(),
+                                       {key: types[key].to_json() for key in statuses})) as results:
+        async for part in results:
+            parts.append(part)
+            done = min(done + chunk, len(items))
+            if on_progress is not None:
+                await on_progress(done, len(items))
+    return b"".join(parts)
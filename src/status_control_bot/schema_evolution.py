@@ -0,0 +1,149 @@
+import time
+import asyncio
+import logging
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Изменение перечня статусов без перезаписи файлов всех студентов. Определения статусов версионируются
+в разделе "schema" файла структуры:
+    {"version": 5, "compacted": 3, "log": [[4, "add", "plag_date"], [5, "drop", "ready_0105"]]}
+    - version - номер текущей версии перечня "statuses" (увеличивается при добавлении и удалении);
+    - compacted - версия, которой соответствуют все файлы статусов на диске;
+    - log - изменения после compacted (более ранние не нужны и удаляются при уплотнении).
+Файл статусов приводится к текущему перечню при чтении (conform: недостающие ключи - пустые значения,
+удаленные - скрываются), удаленные ключи исчезают из файла при следующей записи. Уплотнение
+(compact / StatusCompactor) перезаписывает пакетами только файлы, не соответствующие перечню.
+"""
+
+COMPACT_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+
+def schema_state(data: dict) -> dict:
+    """Раздел "schema" структуры (для файлов без раздела - версия 0)."""
+    return data.get("schema") or {"version": 0, "compacted": 0, "log": []}
+
+
+def pending_drops(data: dict) -> set:
+    """Ключи, удаленные после последнего уплотнения (их значения еще могут оставаться в файлах)."""
+    state = schema_state(data)
+    return {key for version, action, key in state["log"] if action == "drop" and version > state["compacted"]}
+
+
+def record_change(tx, action: str, key: str) -> int:
+    """Новая версия перечня статусов в транзакции tx (action - "add" или "drop"). Возвращает номер версии."""
+    state = schema_state(tx.data)
+    version = state["version"] + 1
+    tx.replace("schema", {**state, "version": version, "log": [*state["log"], [version, action, key]]})
+    return version
+
+
+def conform(data_f: dict, statuses: dict) -> dict:
+    """Данные файла статусов в порядке и составе statuses. Соответствующие перечню возвращаются без копирования."""
+    if data_f.keys() == statuses.keys():
+        return data_f
+    return {key: data_f.get(key, "") for key in statuses}
+
+
+def compact_batch(handler, names) -> int:
+    """
+    Перезапись файлов статусов из names, не соответствующих перечню (через write_status_values:
+    одной транзакцией, либо в текущей). Возвращает количество
+    перезаписанных файлов, при ошибке записи - None.
+    """
+    statuses = handler.get_statuses()
+    data_dir = handler.get_data_dir()
+    stale = []
+    for name in names:
+        data_f = handler.student_files.get(name, None)
+        if data_f is None:
+            data_f = handler.load(data_dir / name)
+        if isinstance(data_f, dict) and data_f.keys() != statuses.keys():
+            stale.append(name)
+    if stale and not handler.write_status_values({name: {} for name in stale}):
+        return None
+    METRICS.add_count("status_files_compacted", len(stale))
+    return len(stale)
+
+
+def compact(tx) -> int:
+    """
+    Синхронное уплотнение всех файлов статусов в транзакции tx (transaction.Transaction): файлы,
+    не соответствующие перечню tx.data, перезаписываются через tx.write_file и фиксируются или
+    откатываются вместе с транзакцией. Файлы читаются с диска (кэш уже приведен к перечню и не
+    показывает удаленных значений), отсутствующие пропускаются. Возвращает количество
+    перезаписанных файлов.
+    """
+    handler = tx.handler
+    statuses = tx.data["statuses"]
+    data_dir = handler.get_data_dir()
+    names = {data_s["file"] for students in tx.teachers.values() for data_s in students.values()}
+    total = 0
+    for name in sorted(names):
+        data_f = tx.files[name] if name in tx.files else handler.load(data_dir / name)
+        if isinstance(data_f, dict) and data_f.keys() != statuses.keys():
+            tx.write_file(name, conform(data_f, statuses))
+            total += 1
+    handler.mark_statuses_compacted(schema_state(tx.data)["version"])
+    METRICS.add_count("status_files_compacted", total)
+    return total
+
+
+class StatusCompactor:
+    """
+    Уплотнение файлов статусов в фоне после изменения перечня статусов. Файлы читаются в отдельном
+    потоке, перезаписываются пакетами по batch файлов с передачей управления циклу событий между
+    пакетами. Если во время уплотнения перечень снова изменился, уплотнение начинается заново.
+
+    Args:
+        interval: минимальный интервал между проверками, сек.
+        batch: файлов в пакете.
+    """
+
+    def __init__(self, handler, interval: float = 60.0, batch: int = COMPACT_BATCH, clock=time.monotonic):
+        self.handler = handler
+        self.interval = interval
+        self.batch = batch
+        self.clock = clock
+        self.last_run = None
+
+    def pending(self) -> bool:
+        state = schema_state(self.handler.data)
+        return state["compacted"] < state["version"]
+
+    async def check(self, force: bool = False):
+        """Уплотнение, если наступил срок проверки и перечень изменен. Возвращает количество перезаписанных файлов."""
+        now = self.clock()
+        if not force and self.last_run is not None and now - self.last_run < self.interval:
+            return 0
+        self.last_run = now
+        if not self.pending():
+            return 0
+
+        handler = self.handler
+        start = time.perf_counter()
+        version = schema_state(handler.data)["version"]
+        names = sorted(handler.get_status_files())
+        total = 0
+        for i in range(0, len(names), self.batch):
+            chunk = names[i:i + self.batch]
+            missing = [name for name in chunk if name not in handler.student_files]
+            if missing:
+                fresh = await asyncio.to_thread(handler.read_student_files, handler.get_data_dir(), missing)
+                handler.update_student_files(fresh)
+            if schema_state(handler.data)["version"] != version:
+                logger.info("Перечень статусов изменен во время уплотнения, уплотнение будет повторено.")
+                return total
+            written = compact_batch(handler, chunk)
+            if written is None:
+                logger.error("Уплотнение файлов статусов прервано: ошибка записи.")
+                return total
+            total += written
+            await asyncio.sleep(0)
+        handler.mark_statuses_compacted(version)
+        if METRICS.enabled:
+            METRICS.observe("storage", "status_compaction", time.perf_counter() - start)
+        logger.info(f"Файлы статусов приведены к версии {version} перечня: перезаписано {total}.")
+        return total
@@ -0,0 +1,145 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from src.status_control_bot.az_teacher_data_handler import clean_text, match_two_strings
+
+
+"""
+Поиск студентов для inline-запросов (@bot запрос) по ФИО, группе и имени преподавателя.
+Каждое слово запроса ищется по префиксу и нечетко (опечатка в одном символе). Студент попадает
+в результат, если найдены все слова запроса.
+"""
+
+
+class StudentSearch:
+    """
+    Индекс слов {слово: {id_s, ...}} и отсортированный список слов для поиска префикса бинарным
+    поиском. Для нечеткого поиска слова индексируются вариантами с удаленным символом: слова
+    на расстоянии 1 имеют общий вариант, и Левенштейн считается лишь для них. Индекс строится по data_links TeacherDataHandler и перестраивается только при
+    смене данных. Результаты запросов кэшируются на ttl сек.
+
+    Args:
+        ttl: время жизни результата запроса (сек.).
+        max_cached: количество запоминаемых запросов (вытесняются давно использованные).
+        min_fuzzy: минимальная длина слова запроса для нечеткого поиска.
+    """
+
+    def __init__(self, handler, ttl: float = 60.0, max_cached: int = 1000, min_fuzzy: int = 3,
+                 clock=time.monotonic):
+        self.handler = handler
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self.min_fuzzy = min_fuzzy
+        self.clock = clock
+        self.words = {}  # {слово: {id_s, ...}}
+        self.keys = []  # отсортированные слова
+        self.variants = {}  # {слово или слово без одного символа: {слово, ...}}
+        self.order = {}  # {id_s: позиция при сортировке по ФИО}
+        self.cache = OrderedDict()  # {(запрос, преподаватели): (срок, (id_s, ...))}
+        self.links = None  # data_links, для которых построен индекс
+
+    def is_stale(self) -> bool:
+        return self.links is not self.handler.data_links
+
+    def rebuild(self):
+        handler = self.handler
+        words = defaultdict(set)
+        students = handler.get_data_link_students()
+        for id_s, name in students.items():
+            id_teachers = handler.get_student_teachers(id_s)
+            data_s = handler.get_student_data_by_id(id_teachers[0], id_s) or {} if id_teachers else {}
+            text = " ".join((name, data_s.get("group", ""),
+                             *(handler.get_teacher_by_id(id_t) or "" for id_t in id_teachers)))
+            for word in self.tokens(text):
+                words[word].add(id_s)
+        self.words = dict(words)
+        self.keys = sorted(self.words)
+        variants = defaultdict(set)
+        for word in self.keys:
+            for variant in self.deletions(word):
+                variants[variant].add(word)
+        self.variants = dict(variants)
+        self.order = {id_s: i for i, id_s in enumerate(sorted(students, key=lambda item: (students[item], item)))}
+        self.cache.clear()
+        self.links = handler.data_links
+
+    @staticmethod
+    def tokens(text: str) -> list[str]:
+        return clean_text(text or "").lower().replace("ё", "е").split()
+
+    @staticmethod
+    def deletions(word: str) -> set[str]:
+        return {word, *(word[:i] + word[i + 1:] for i in range(len(word)))}
+
+    def search(self, query: str, teachers=None) -> tuple:
+        """
+        Студенты, найденные по запросу, в порядке ФИО. Пустой запрос - все студенты.
+
+        Args:
+            teachers: id преподавателей, студенты которых доступны (None - все).
+
+        Returns:
+            tuple: (id_s, ...).
+        """
+        if self.is_stale():
+            self.rebuild()
+        words = tuple(self.tokens(query))
+        key = (words, None if teachers is None else frozenset(teachers))
+        now = self.clock()
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] > now:
+            self.cache.move_to_end(key)
+            return cached[1]
+
+        ids = self._search(words)
+        if teachers is not None:
+            ids = {id_s for id_s in ids if not key[1].isdisjoint(self.handler.get_student_teachers(id_s))}
+        result = tuple(sorted(ids, key=self.order.__getitem__))
+        self.cache[key] = (now + self.ttl, result)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+        return result
+
+    def _search(self, words: tuple) -> set:
+        if not words:
+            return set(self.order)
+        result = None
+        for word in words:
+            ids = self.match_prefix(word) | self.match_fuzzy(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    def match_prefix(self, word: str) -> set:
+        ids = set()
+        for i in range(bisect_left(self.keys, word), len(self.keys)):
+            if not self.keys[i].startswith(word):
+                break
+            ids |= self.words[self.keys[i]]
+        return ids
+
+    def match_fuzzy(self, word: str) -> set:
+        ids = set()
+        if len(word) < self.min_fuzzy:
+            return ids
+        candidates = set()
+        for variant in self.deletions(word):
+            candidates |= self.variants.get(variant, set())
+        for candidate in candidates:
+            if match_two_strings(word, candidate):
+                ids |= self.words[candidate]
+        return ids
+
+    @staticmethod
+    def page(ids, offset: int, limit: int) -> tuple[list, str]:
+        """
+        Страница результатов для answer_inline_query.
+
+        Returns:
+            tuple: ([id_s, ...], next_offset - пустая строка на последней странице).
+        """
+        items = list(ids[offset:offset + limit])
+        end = offset + len(items)
+        return items, str(end) if end < len(ids) else ""
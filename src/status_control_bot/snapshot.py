@@ -0,0 +1,75 @@
+import os
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Бинарный снимок полного набора данных TeacherDataHandler (структура, индексы, значения статусов).
+Формат файла:
+    MAGIC (4 байта) | версия схемы (2 байта, big-endian) | sha256 тела (32 байта) | тело (pickle, протокол 5)
+Снимок читается одним обращением к диску. При несовпадении версии или хеша снимок отклоняется,
+и данные загружаются из json.
+"""
+
+MAGIC = b"TDHS"
+SNAPSHOT_VERSION = 2
+HEADER_SIZE = len(MAGIC) + 2 + hashlib.sha256().digest_size
+
+logger = logging.getLogger(__name__)
+
+
+def write_snapshot(file_path, payload) -> bool:
+    """Атомарная запись снимка (через временный файл)."""
+    body = pickle.dumps(payload, protocol=5)
+    header = MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big") + hashlib.sha256(body).digest()
+    # Снимок могут сохранять несколько процессов бота, поэтому временный файл у каждого свой
+    tmp_path = Path(file_path).with_name(f"{Path(file_path).name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, file_path)
+    except OSError as e:
+        logger.error(f"Ошибка записи снимка {file_path}: {e}")
+        return False
+    METRICS.add_io("write", len(header) + len(body))
+    return True
+
+
+def read_snapshot(file_path):
+    """
+    Чтение и проверка снимка.
+
+    Returns:
+        Содержимое снимка, либо None, если файла нет, он поврежден или другой версии.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.error(f"Ошибка чтения снимка {file_path}: {e}")
+        return None
+    METRICS.add_io("read", len(raw))
+
+    view = memoryview(raw)
+    if len(raw) < HEADER_SIZE or view[:len(MAGIC)] != MAGIC:
+        logger.warning(f"Файл {file_path} не является снимком данных.")
+        return None
+    version = int.from_bytes(view[len(MAGIC):len(MAGIC) + 2], "big")
+    if version != SNAPSHOT_VERSION:
+        logger.info(f"Версия снимка {file_path} ({version}) устарела, ожидается {SNAPSHOT_VERSION}.")
+        return None
+    body = view[HEADER_SIZE:]
+    if hashlib.sha256(body).digest() != view[len(MAGIC) + 2:HEADER_SIZE]:
+        logger.error(f"Снимок {file_path} поврежден (не совпадает хеш).")
+        return None
+    try:
+        return pickle.loads(body)
+    except Exception as e:
+        logger.error(f"Ошибка разбора снимка {file_path}: {e}")
+        return None
@@ -0,0 +1,282 @@
+import re
+from bisect import bisect_left, insort
+from datetime import date
+
+
+"""
+Типы статусов и их хранение. Тип задается в разделе "status_types" файла структуры:
+    {"plag_date": {"type": "date"}, "check_plag": {"type": "bool"},
+     "stage": {"type": "enum", "options": {"draft": "Черновик", "final": "Окончательный"}}}
+Для статусов без описания тип определяется по названию (infer_type): "Дата ..." - date,
+"Допуск ..." / "Отметка о допуске ..." - bool, остальные - text.
+Значения хранятся в нормализованном виде: date - "ГГГГ-ММ-ДД" (строки сортируются как даты),
+bool - "1" / "0", enum - код варианта, text - как введено. Пустая строка - значение не заполнено.
+Значения, записанные до назначения типа, разбираются при чтении (format, date_of) и заменяются
+нормализованными при следующей записи.
+"""
+
+TEXT, DATE, BOOL, ENUM = "text", "date", "bool", "enum"
+TYPES = (TEXT, DATE, BOOL, ENUM)
+
+TRUE_VALUES = {"да", "+", "1", "yes", "true", "✓", "✅", "есть", "допущен"}
+FALSE_VALUES = {"нет", "-", "0", "no", "false", "✗", "❌", "не допущен"}
+DATE_PATTERN = re.compile(r"(\d{1,2})[./-](\d{1,2})[./-](\d{4}|\d{2})")
+ISO_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def parse_date(text: str) -> date:
+    """Дата из 'ДД.ММ.ГГ', 'ДД.ММ.ГГГГ' (разделители . / -) или 'ГГГГ-ММ-ДД'. При ошибке - ValueError."""
+    text = text.strip()
+    if ISO_PATTERN.fullmatch(text):
+        return date.fromisoformat(text)
+    match = DATE_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError("ожидается дата в формате ДД.ММ.ГГГГ")
+    day, month, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    return date(year, month, day)
+
+
+class StatusType:
+    """
+    Тип статуса: разбор ввода пользователя (parse), отображение (format), дата для индекса (date_of).
+
+    Args:
+        kind: TEXT, DATE, BOOL или ENUM.
+        options: {код: название} вариантов ENUM.
+    """
+    __slots__ = ("kind", "options", "lookup")
+
+    def __init__(self, kind: str = TEXT, options: dict = None):
+        if kind not in TYPES:
+            raise ValueError(f"неизвестный тип статуса '{kind}'")
+        if kind == ENUM and not options:
+            raise ValueError("для типа enum нужны варианты значений")
+        self.kind = kind
+        self.options = dict(options or {})
+        self.lookup = {text.lower(): code for code, title in self.options.items() for text in (code, title)}
+
+    @classmethod
+    def from_json(cls, item: dict):
+        return cls(item.get("type", TEXT), item.get("options", None))
+
+    def to_json(self) -> dict:
+        item = {"type": self.kind}
+        if self.options:
+            item["options"] = dict(self.options)
+        return item
+
+    def hint(self) -> str:
+        """Подсказка для ввода значения."""
+        if self.kind == DATE:
+            return "дата ДД.ММ.ГГГГ"
+        if self.kind == BOOL:
+            return "да / нет"
+        if self.kind == ENUM:
+            return "одно из: " + ", ".join(self.options.values())
+        return ""
+
+    def parse(self, text: str) -> str:
+        """Нормализованное значение из ввода пользователя. Пустой ввод очищает значение. При ошибке - ValueError."""
+        text = (text or "").strip()
+        if not text or self.kind == TEXT:
+            return text
+        if self.kind == DATE:
+            return parse_date(text).isoformat()
+        if self.kind == BOOL:
+            lowered = text.lower()
+            if lowered in TRUE_VALUES:
+                return "1"
+            if lowered in FALSE_VALUES:
+                return "0"
+            raise ValueError("ожидается 'да' или 'нет'")
+        code = self.lookup.get(text.lower(), None)
+        if code is None:
+            raise ValueError(f"ожидается {self.hint()}")
+        return code
+
+    def normalize(self, value) -> str:
+        """Нормализованное значение, либо исходное, если его не удается разобрать (данные прежних версий)."""
+        try:
+            return self.parse(value) if isinstance(value, str) else value
+        except ValueError:
+            return value
+
+    def format(self, value) -> str:
+        """Значение для отображения."""
+        if not value or self.kind == TEXT:
+            return value
+        value = self.normalize(value)
+        if self.kind == DATE and isinstance(value, str) and ISO_PATTERN.fullmatch(value):
+            return date.fromisoformat(value).strftime("%d.%m.%Y")
+        if self.kind == BOOL:
+            return {"1": "да", "0": "нет"}.get(value, value)
+        if self.kind == ENUM:
+            return self.options.get(value, value)
+        return value
+
+    def date_of(self, value):
+        """Дата значения статуса типа DATE (None - не заполнено или не разбирается)."""
+        if self.kind != DATE or not value or not isinstance(value, str):
+            return None
+        try:
+            return date.fromisoformat(value) if len(value) == 10 and value[4] == "-" else parse_date(value)
+        except ValueError:
+            return None
+
+
+def infer_type(title: str) -> StatusType:
+    """Тип статуса по его названию (для статусов без описания в "status_types")."""
+    lowered = (title or "").lower()
+    if lowered.startswith("дата") or " дата " in f" {lowered} ":
+        return StatusType(DATE)
+    if lowered.startswith(("допуск", "отметка о допуске")):
+        return StatusType(BOOL)
+    return StatusType(TEXT)
+
+
+def build_types(data: dict) -> dict:
+    """{ключ статуса: StatusType} для перечня data["statuses"]."""
+    described = data.get("status_types", {})
+    return {key: StatusType.from_json(described[key]) if key in described else infer_type(title)
+            for key, title in data["statuses"].items()}
+
+
+def validate_types(types) -> None:
+    """Проверка раздела "status_types", при ошибке вызывает ValueError."""
+    if not isinstance(types, dict):
+        raise ValueError("некорректен ключ 'status_types'")
+    for key, item in types.items():
+        if not isinstance(item, dict):
+            raise ValueError(f"некорректное описание типа статуса '{key}'")
+        StatusType.from_json(item)
+
+
+class FileIndex:
+    """
+    Индекс по значениям файлов статусов всех студентов. Строится при первом запросе, далее
+    обновляется только по файлам, измененным после построения (журнал TeacherDataHandler.changed_files).
+    Полная перестройка - при изменении структуры (data_links), типов статусов или сбросе журнала.
+    Наследники задают содержимое индекса: reset, add, discard и finish.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.file_ids = {}  # {имя файла: id_s}
+        self.key = None  # (data_links, типы, эпоха журнала) построенного индекса
+        self.seq = 0  # номер последнего учтенного изменения журнала
+
+    def is_stale(self) -> bool:
+        handler = self.handler
+        return self.key is None or self.key[0] is not handler.data_links or \
+            self.key[1] is not handler.get_status_types() or self.key[2] != handler.files_epoch
+
+    def reset(self, types: dict):
+        """Очистка индекса перед построением."""
+
+    def add(self, id_s: int, data_f: dict, types: dict):
+        """Учет значений студента."""
+
+    def discard(self, id_s: int):
+        """Удаление значений студента из индекса."""
+
+    def finish(self):
+        """Завершение построения."""
+
+    def rebuild(self):
+        handler = self.handler
+        types = handler.get_status_types()
+        handler.preload_student_files()
+        data_dir = handler.get_data_dir()
+        self.reset(types)
+        self.file_ids = {}
+        self.seq = handler.change_seq
+        for id_s in handler.get_data_link_students():
+            data_s = handler.get_student_data_by_id(handler.get_teacher_of_student(id_s), id_s)
+            if data_s is None:
+                continue
+            self.file_ids[data_s["file"]] = id_s
+            self.add(id_s, handler.load_student_file(data_dir / data_s["file"]) or {}, types)
+        self.finish()
+        self.key = (handler.data_links, types, handler.files_epoch)
+
+    def refresh(self):
+        """Перестройка, либо учет файлов, измененных после последнего обращения."""
+        if self.is_stale():
+            self.rebuild()
+            return
+        handler = self.handler
+        names = handler.changes_since(self.seq)
+        self.seq = handler.change_seq
+        if not names:
+            return
+        if len(names) > len(self.file_ids) // 4:
+            self.rebuild()
+            return
+        types = handler.get_status_types()
+        data_dir = handler.get_data_dir()
+        for name in names:
+            id_s = self.file_ids.get(name, None)
+            if id_s is None:
+                continue
+            self.discard(id_s)
+            self.add(id_s, handler.load_student_file(data_dir / name) or {}, types)
+
+
+class DateIndex(FileIndex):
+    """Отсортированный индекс дат статусов типа DATE: {ключ: [(дата, id_s), ...]}."""
+
+    def __init__(self, handler):
+        super().__init__(handler)
+        self.entries = {}  # {ключ: [(дата, id_s), ...]} по возрастанию
+        self.values = {}  # {ключ: {id_s: дата}}
+        self.building = False  # при построении даты добавляются в конец и сортируются в finish
+
+    def reset(self, types):
+        keys = [key for key, status_type in types.items() if status_type.kind == DATE]
+        self.entries = {key: [] for key in keys}
+        self.values = {key: {} for key in keys}
+        self.building = True
+
+    def add(self, id_s, data_f, types):
+        for key, items in self.entries.items():
+            day = types[key].date_of(data_f.get(key))
+            if day is None:
+                continue
+            if self.building:
+                items.append((day, id_s))
+            else:
+                insort(items, (day, id_s))
+            self.values[key][id_s] = day
+
+    def discard(self, id_s):
+        for key, items in self.entries.items():
+            old = self.values[key].pop(id_s, None)
+            if old is not None:
+                del items[bisect_left(items, (old, id_s))]
+
+    def finish(self):
+        for items in self.entries.values():
+            items.sort()
+        self.building = False
+
+    def range(self, status_key: str, start: date = None, end: date = None) -> list:
+        """
+        Студенты с датой статуса status_key в диапазоне [start, end) по возрастанию даты.
+
+        Returns:
+            list: [(дата, id_s), ...], либо None, если статус не типа DATE.
+        """
+        self.refresh()
+        items = self.entries.get(status_key, None)
+        if items is None:
+            return None
+        lo = 0 if start is None else bisect_left(items, (start,))
+        hi = len(items) if end is None else bisect_left(items, (end,))
+        return items[lo:hi]
+
+    def count(self, status_key: str) -> int:
+        """Количество студентов с заполненной датой."""
+        self.refresh()
+        return len(self.entries.get(status_key, ()))
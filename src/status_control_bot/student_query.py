@@ -0,0 +1,248 @@
+from datetime import date
+from itertools import islice
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+from src.status_control_bot.status_types import FileIndex, DATE, BOOL, ENUM, parse_date
+
+
+"""
+Выборка студентов: фильтры по преподавателям, группам и значениям статусов, сортировка и страницы
+(offset/limit). Результат - генератор id студентов, который вычисляется по мере чтения:
+    - преподаватель - связи data_links, группа - индекс групп (строится один раз для структуры);
+    - пустое значение статуса, значения bool/enum - индекс значений (ValueIndex), диапазон дат -
+      отсортированный индекс дат (status_types.DateIndex); оба обновляются по журналу измененных файлов;
+    - равенство значения text и "заполнено" проверяются для каждого кандидата.
+Кандидаты перебираются в порядке сортировки: по заранее упорядоченному списку (имя, группа,
+преподаватель, дата), либо, если множество кандидатов из индексов мало, сортировкой только его.
+Сортировка по статусам text/bool/enum требует чтения значений всех кандидатов.
+
+    handler.query_students(StudentQuery(teachers={3}, conditions=[Condition("final_date", EMPTY)],
+                                        sort=SORT_GROUP, limit=20))
+"""
+
+EMPTY, FILLED, EQUALS, BEFORE, SINCE = "empty", "filled", "eq", "before", "since"
+OPERATIONS = (EMPTY, FILLED, EQUALS, BEFORE, SINCE)
+SORT_NAME, SORT_GROUP, SORT_TEACHER = "name", "group", "teacher"
+
+
+@dataclass(slots=True)
+class Condition:
+    """
+    Условие на значение статуса key.
+        EMPTY / FILLED - значение не заполнено / заполнено;
+        EQUALS - значение равно value (ввод пользователя, приводится к типу статуса);
+        BEFORE / SINCE - дата раньше value / не раньше value (только статусы типа date).
+    """
+    key: str
+    op: str
+    value: object = None
+
+
+@dataclass(slots=True)
+class StudentQuery:
+    """
+    Параметры выборки. Условия объединяются по "и".
+
+    Args:
+        teachers: id преподавателей (свои студенты и с дублированным доступом), None - все.
+        groups: названия групп, None - все.
+        sort: SORT_NAME, SORT_GROUP, SORT_TEACHER, либо ключ статуса.
+    """
+    teachers: Optional[set] = None
+    groups: Optional[set] = None
+    conditions: list = field(default_factory=list)
+    sort: str = SORT_NAME
+    descending: bool = False
+    offset: int = 0
+    limit: Optional[int] = None
+
+
+class ValueIndex(FileIndex):
+    """Студенты с незаполненными значениями (все статусы) и по значениям статусов bool/enum."""
+
+    def __init__(self, handler):
+        super().__init__(handler)
+        self.empty = {}  # {ключ: {id_s, ...}}
+        self.values = {}  # {ключ: {значение: {id_s, ...}}} для bool/enum
+        self.current = {}  # {ключ: {id_s: значение}} для bool/enum
+
+    def reset(self, types):
+        self.empty = {key: set() for key in types}
+        keys = [key for key, status_type in types.items() if status_type.kind in (BOOL, ENUM)]
+        self.values = {key: {} for key in keys}
+        self.current = {key: {} for key in keys}
+
+    def add(self, id_s, data_f, types):
+        for key, ids in self.empty.items():
+            value = data_f.get(key)
+            if not value:
+                ids.add(id_s)
+            elif key in self.values:
+                value = types[key].normalize(value)
+                self.values[key].setdefault(value, set()).add(id_s)
+                self.current[key][id_s] = value
+
+    def discard(self, id_s):
+        for ids in self.empty.values():
+            ids.discard(id_s)
+        for key, current in self.current.items():
+            value = current.pop(id_s, None)
+            if value is not None:
+                self.values[key][value].discard(id_s)
+
+    def empty_of(self, status_key: str) -> set:
+        self.refresh()
+        return self.empty[status_key]
+
+    def matching(self, status_key: str, value) -> set:
+        """Студенты со значением value статуса bool/enum."""
+        self.refresh()
+        return self.values[status_key].get(value, set())
+
+
+class StudentQueryEngine:
+    """
+    Выполнение StudentQuery для TeacherDataHandler. Порядок студентов по имени, группе и
+    преподавателю, а также индекс групп строятся один раз для текущей структуры (data_links).
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.value_index = ValueIndex(handler)
+        self.links = None  # data_links, для которых построены порядки
+        self.groups = {}  # {группа: {id_s, ...}}
+        self.orders = {}  # {SORT_*: [id_s, ...]}
+        self.ranks = {}  # {SORT_*: {id_s: позиция}}
+
+    def refresh(self):
+        handler = self.handler
+        if self.links is handler.data_links:
+            return
+        records = {}  # {id_s: (имя, группа, id_t владельца)}
+        for id_s, name in handler.get_data_link_students().items():
+            id_t = handler.get_teacher_of_student(id_s)
+            data_s = handler.get_student_data_by_id(id_t, id_s)
+            if data_s is not None:
+                records[id_s] = (name, data_s.get("group", ""), id_t)
+        self.groups = {}
+        for id_s, (_, group, _) in records.items():
+            self.groups.setdefault(group, set()).add(id_s)
+        by_name = sorted(records, key=lambda id_s: (records[id_s][0], id_s))
+        self.orders = {
+            SORT_NAME: by_name,
+            SORT_GROUP: sorted(by_name, key=lambda id_s: records[id_s][1]),  # сортировка устойчива
+            SORT_TEACHER: sorted(by_name, key=lambda id_s: records[id_s][2]),
+        }
+        self.ranks = {sort: {id_s: i for i, id_s in enumerate(order)} for sort, order in self.orders.items()}
+        self.links = handler.data_links
+
+    def group_members(self, group_name) -> set:
+        """id студентов группы (по индексу групп)."""
+        self.refresh()
+        return self.groups.get(group_name, set())
+
+    def value_of(self, id_s: int, status_key: str):
+        handler = self.handler
+        data_s = handler.get_student_data_by_id(handler.get_teacher_of_student(id_s), id_s)
+        if data_s is None:
+            return None
+        return (handler.load_student_file(handler.get_data_dir() / data_s["file"]) or {}).get(status_key, "")
+
+    def plan(self, query: StudentQuery) -> tuple[list, list]:
+        """
+        Разбор условий на множества-кандидаты из индексов и проверки отдельных студентов.
+        При некорректном условии вызывает ValueError.
+
+        Returns:
+            tuple: ([{id_s, ...}, ...], [функция id_s -> bool, ...]).
+        """
+        handler = self.handler
+        types = handler.get_status_types()
+        sets, checks = [], []
+        if query.teachers is not None:
+            links = handler.get_data_links_relations()
+            sets.append({id_s for id_t in query.teachers for id_s in links.get(id_t, ())})
+        if query.groups is not None:
+            sets.append(set().union(*(self.groups.get(group, ()) for group in query.groups)))
+        for condition in query.conditions:
+            key, op, value = condition.key, condition.op, condition.value
+            status_type = types.get(key, None)
+            if status_type is None:
+                raise ValueError(f"неизвестный статус '{key}'")
+            if op == EMPTY:
+                sets.append(self.value_index.empty_of(key))
+            elif op == FILLED:
+                empty = self.value_index.empty_of(key)
+                checks.append(lambda id_s, empty=empty: id_s not in empty)
+            elif op == EQUALS:
+                value = status_type.parse(value) if isinstance(value, str) else value
+                if not value:
+                    sets.append(self.value_index.empty_of(key))
+                elif status_type.kind in (BOOL, ENUM):
+                    sets.append(self.value_index.matching(key, value))
+                else:
+                    checks.append(lambda id_s, key=key, value=value, normalize=status_type.normalize:
+                                  normalize(self.value_of(id_s, key)) == value)
+            elif op in (BEFORE, SINCE):
+                if status_type.kind != DATE:
+                    raise ValueError(f"статус '{key}' не содержит дат")
+                day = value if isinstance(value, date) else parse_date(value)
+                items = handler.date_index.range(key, None, day) if op == BEFORE else \
+                    handler.date_index.range(key, day, None)
+                sets.append({id_s for _, id_s in items})
+            else:
+                raise ValueError(f"неизвестное условие '{op}'")
+        return sets, checks
+
+    def ordered(self, query: StudentQuery, allowed) -> Iterator[int]:
+        """Кандидаты в порядке сортировки (allowed - пересечение множеств из индексов, либо None - все)."""
+        handler = self.handler
+        sort = query.sort
+        if sort in self.orders:
+            order = self.orders[sort]
+            if allowed is not None and len(allowed) * 8 < len(order):
+                rank = self.ranks[sort]  # мало кандидатов - сортируется только их множество
+                return iter(sorted(allowed, key=rank.__getitem__, reverse=query.descending))
+            return reversed(order) if query.descending else iter(order)
+        status_type = handler.get_status_types().get(sort, None)
+        if status_type is None:
+            raise ValueError(f"неизвестная сортировка '{sort}'")
+        if status_type.kind == DATE:
+            return self.by_date(sort, query.descending)
+        # text/bool/enum: значения всех кандидатов, незаполненные - в конце
+        rank = self.ranks[SORT_NAME]
+        candidates = self.orders[SORT_NAME] if allowed is None else allowed
+        keyed = []
+        for id_s in candidates:
+            value = status_type.normalize(self.value_of(id_s, sort))
+            keyed.append((not value, value or "", rank[id_s], id_s))
+        keyed.sort()
+        filled = [item[3] for item in keyed if not item[0]]
+        empty = [item[3] for item in keyed if item[0]]
+        return iter([*reversed(filled), *empty] if query.descending else [*filled, *empty])
+
+    def by_date(self, status_key: str, descending: bool) -> Iterator[int]:
+        """Студенты по дате статуса (из индекса дат), затем без даты - по имени."""
+        items = self.handler.date_index.range(status_key)
+        yield from (id_s for _, id_s in (reversed(items) if descending else items))
+        dated = self.handler.date_index.values[status_key]
+        yield from (id_s for id_s in self.orders[SORT_NAME] if id_s not in dated)
+
+    def run(self, query: StudentQuery) -> Iterator[int]:
+        """
+        id студентов, удовлетворяющих запросу, в порядке сортировки со страницей offset/limit.
+        Условия проверяются сразу (ValueError), студенты вычисляются по мере чтения генератора.
+        """
+        self.refresh()
+        sets, checks = self.plan(query)
+        allowed = None
+        for ids in sorted(sets, key=len):  # пересечение начиная с наименьшего множества
+            allowed = set(ids) if allowed is None else allowed & ids
+            if not allowed:
+                return iter(())
+        candidates = self.ordered(query, allowed)
+        if allowed is not None:
+            checks.insert(0, allowed.__contains__)
+        matched = (id_s for id_s in candidates if all(check(id_s) for check in checks))
+        stop = None if query.limit is None else query.offset + query.limit
+        return islice(matched, query.offset, stop)
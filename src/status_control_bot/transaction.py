@@ -0,0 +1,207 @@
+import os
+import logging
+from pathlib import Path
+from src.status_control_bot.utils import file_signature
+from src.status_control_bot.metrics import METRICS
+
+
+"""
+Единица работы TeacherDataHandler: изменения структуры (преподаватели, студенты, статусы), записи
+и удаления файлов статусов накапливаются и применяются одним пакетом при завершении транзакции.
+
+Структура изменяется на копии (copy-on-write: копируются только затронутые словари преподавателей),
+поэтому до фиксации данные обработчика не меняются, а откат - это отказ от копии. Порядок фиксации:
+    1. запись новых и измененных файлов статусов (при ошибке - восстановление записанных);
+    2. запись файла структуры (при ошибке - восстановление файлов статусов);
+    3. удаление файлов, на которые структура больше не ссылается, и подмена данных в памяти.
+При аварийном завершении процесса на любом шаге структура не ссылается на отсутствующие файлы,
+в худшем случае на диске остаются лишние файлы статусов.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class Transaction:
+    """
+    Накопленные изменения данных обработчика. Создается через TeacherDataHandler.transaction().
+
+    Args:
+        handler: TeacherDataHandler.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.data = dict(handler.data)
+        self.data["teachers"] = dict(handler.data["teachers"])
+        self.data["shared"] = dict(handler.data.get("shared", {}))
+        self.copied = set()  # преподаватели, словари студентов которых уже скопированы
+        self.copied_shared = set()  # преподаватели, связи дублированного доступа которых уже скопированы
+        self.copied_keys = set()  # разделы data, уже скопированные edit()
+        self.files = {}  # {имя файла: данные} для записи
+        self.deleted = set()  # имена файлов для удаления
+        self.changed = False  # изменена структура
+
+    # region Чтение
+    @property
+    def teachers(self) -> dict:
+        """{преподаватель: {студент: запись}} с учетом накопленных изменений (только чтение)."""
+        return self.data["teachers"]
+
+    @property
+    def shared(self) -> dict:
+        """{преподаватель: {студент: владелец}} с учетом накопленных изменений (только чтение)."""
+        return self.data["shared"]
+
+    def has_student(self, student_name: str) -> bool:
+        return any(student_name in students for students in self.teachers.values())
+
+    def student_names(self) -> list[str]:
+        """Имена студентов в порядке структуры (однофамильцы - один раз)."""
+        return list(dict.fromkeys(name for students in self.teachers.values() for name in students))
+
+    def owner_of(self, teacher_name: str, student_name: str):
+        """Владелец записи студента, доступного преподавателю (он сам либо по связи), либо None."""
+        if student_name in self.teachers.get(teacher_name, {}):
+            return teacher_name
+        return self.shared.get(teacher_name, {}).get(student_name)
+
+    def teacher_of(self, student_name: str):
+        """Первый по порядку преподаватель-владелец студента (как get_teacher_of_student), либо None."""
+        return next((teacher_name for teacher_name, students in self.teachers.items() if student_name in students),
+                    None)
+
+    def read_file(self, name: str):
+        """Данные файла статусов с учетом накопленных записей (не изменять, см. write_file)."""
+        if name in self.files:
+            return self.files[name]
+        if name in self.deleted:
+            return None
+        return self.handler.load_student_file(self.handler.get_data_dir() / name)
+    # endregion
+
+    # region Изменение
+    def edit(self, key: str) -> dict:
+        """Изменяемая копия раздела данных (например, "statuses")."""
+        if key not in self.copied_keys:
+            self.data[key] = self.data[key].copy()
+            self.copied_keys.add(key)
+        self.changed = True
+        return self.data[key]
+
+    def replace(self, key: str, value):
+        """Замена раздела данных целиком (например, "schema")."""
+        self.data[key] = value
+        self.copied_keys.add(key)
+        self.changed = True
+
+    def edit_teacher(self, teacher_name: str) -> dict:
+        """Изменяемая копия {студент: запись} преподавателя."""
+        if teacher_name not in self.copied:
+            self.teachers[teacher_name] = dict(self.teachers[teacher_name])
+            self.copied.add(teacher_name)
+        self.changed = True
+        return self.teachers[teacher_name]
+
+    def edit_shared(self, teacher_name: str) -> dict:
+        """Изменяемая копия связей {студент: владелец} преподавателя (создается при отсутствии)."""
+        if teacher_name not in self.copied_shared:
+            self.shared[teacher_name] = dict(self.shared.get(teacher_name, {}))
+            self.copied_shared.add(teacher_name)
+        self.changed = True
+        return self.shared[teacher_name]
+
+    def share(self, teacher_name: str, student_name: str, owner: str):
+        self.edit_shared(teacher_name)[student_name] = owner
+
+    def unshare(self, teacher_name: str, student_name: str):
+        links = self.edit_shared(teacher_name)
+        links.pop(student_name, None)
+        if not links:
+            del self.shared[teacher_name]
+            self.copied_shared.discard(teacher_name)
+
+    def drop_links(self, owner: str, student_name: str = None):
+        """Удаление связей других преподавателей с записью (всеми записями при student_name=None) владельца."""
+        for teacher_name, links in list(self.shared.items()):
+            for name in [name for name, o in links.items() if o == owner and student_name in (None, name)]:
+                self.unshare(teacher_name, name)
+
+    def add_teacher(self, teacher_name: str):
+        self.teachers[teacher_name] = {}
+        self.copied.add(teacher_name)
+        self.changed = True
+
+    def remove_teacher(self, teacher_name: str) -> dict:
+        self.copied.discard(teacher_name)
+        self.changed = True
+        if teacher_name in self.shared:
+            del self.shared[teacher_name]
+            self.copied_shared.discard(teacher_name)
+        self.drop_links(teacher_name)
+        return self.teachers.pop(teacher_name)
+
+    def write_file(self, name: str, data_f: dict):
+        self.deleted.discard(name)
+        self.files[name] = data_f
+
+    def delete_file(self, name: str):
+        self.files.pop(name, None)
+        self.deleted.add(name)
+
+    def update_values(self, changes) -> bool:
+        """
+        Запись значений статусов {имя файла: {ключ: значение}} поверх текущих данных файлов.
+        Если какой-либо файл не найден, не записывается ни один.
+        """
+        current = {name: self.read_file(name) for name in changes}
+        if any(data_f is None for data_f in current.values()):
+            return False
+        for name, values in changes.items():
+            self.write_file(name, {**current[name], **values})
+        return True
+    # endregion
+
+    # region Фиксация
+    def commit(self):
+        """Применение изменений. При ошибке записи изменения откатываются и вызывается OSError."""
+        if not (self.files or self.deleted or self.changed):
+            return
+        handler = self.handler
+        data_dir = handler.get_data_dir()
+        written = []  # [(путь, прежнее содержимое или None), ...]
+        try:
+            for name, data_f in self.files.items():
+                path = data_dir / name
+                written.append((path, path.read_bytes() if path.exists() else None))
+                if not handler.save_json(path, data_f):
+                    raise OSError(f"не удалось записать файл статусов '{name}'")
+            if self.changed and not handler.save_json(handler.current_file, self.data):
+                raise OSError(f"не удалось записать файл '{handler.current_file}'")
+        except OSError:
+            self.restore(written)
+            METRICS.add_count("tx_rollbacks")
+            raise
+
+        for name in self.deleted:
+            handler.delete_file(data_dir / name)
+        handler.student_files.update(self.files)
+        handler.mark_files_changed([*self.files, *self.deleted])
+        if self.changed:
+            handler.swap_snapshot((self.data, handler.build_links(self.data), file_signature(handler.current_file)))
+        METRICS.add_count("tx_commits")
+
+    def restore(self, written):
+        """Возврат записанных файлов статусов к прежнему состоянию (новые файлы удаляются)."""
+        for path, content in reversed(written):
+            self.handler.invalidate_student_files([path.name])
+            try:
+                if content is None:
+                    Path(path).unlink(missing_ok=True)
+                else:
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(content)
+                    os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Не удалось восстановить файл '{path}' при откате транзакции: {e}")
+    # endregion
@@ -7,7 +7,7 @@ from typing import Optional
 from pathlib import Path
 from functools import wraps
 from collections import defaultdict
-from src.status_control_bot.config import DATA_DIR
+from src.status_control_bot.config import BASE_DIR, DATA_DIR
 
 
 def write_info(file_path: str, text: str, mode: str = 'w', encoding='utf-8') -> bool:
@@ -39,13 +39,11 @@ def get_important_info(file_path) -> str:
     Returns:
         str: результирующая строка.
     """
-    lines = read_file(file_path)
-    lines = [line.strip() for line in lines]
-    result = ''.join(lines)
-    if len(result) > 0:
-        return result
-    else:
+    if not os.path.exists(file_path):
         return ""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        # Пустой файл - просто пустая строка, без исключений
+        return ''.join(line.strip() for line in f)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -72,6 +70,29 @@ def read_file(filename: str) -> list[str]:
         raise FileNotFoundError(f"Файл '{filename}' не найден.")
 
 
+def file_signature(file_path) -> Optional[tuple[int, int]]:
+    """Сигнатура файла (mtime в наносекундах, размер) для отслеживания изменений.
+    Если файла нет - None."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def scan_signatures(dir_path, suffix: str = ".json", exclude=()) -> dict[str, tuple[int, int]]:
+    """Сигнатуры (mtime в наносекундах, размер) всех файлов каталога с расширением suffix
+    за один проход os.scandir. Если каталога нет - FileNotFoundError."""
+    files = {}
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.name in exclude or not entry.name.endswith(suffix) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
 def load_json(file_path):
     """Загрузка данных типа json из файла (file_path)"""
     try:
@@ -84,9 +105,16 @@ def load_json(file_path):
 
 
 def save_json(json_path, data, mode='w'):
-    """Сохранение данных (data) в файл json (json_path)"""
-    with open(json_path, mode) as f:
+    """Сохранение данных (data) в файл json (json_path). При перезаписи файл заменяется целиком
+    через временный, поэтому другие процессы бота не видят частично записанных данных."""
+    if mode != 'w':
+        with open(json_path, mode) as f:
+            json.dump(data, f)
+        return
+    tmp_path = f"{json_path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode) as f:
         json.dump(data, f)
+    os.replace(tmp_path, json_path)
 
 
 def get_teachers(filename: str) -> tuple[str, ...]:
@@ -219,17 +247,20 @@ def find_bad_groups():
     print(students_with_group)
 
 
-def make_json_from_parsing(file_path: str, statuses_file: str):
+def make_json_from_parsing(file_path: str, statuses_file: str, output_dir=None, pool=None):
     """
     Создание структуры используемого в TeacherDataHandler файлов *.json
     используя данные о студентах, преподавателях (txt, csv) и набор статусов (контролируемых параметров).
+    По умолчанию данные создаются в data/students, иначе в каталоге output_dir.
+    pool (offload.JobPool) - транслитерация имен частями в пуле процессов.
     """
     # Статусы должны быть 'чистыми'
     statuses = read_file(statuses_file)
     statuses_dict = {k: v for line in statuses for k, v in (line.strip().split("\t"),)}
     statuses_dummy = dict.fromkeys(statuses_dict.keys(), "")
 
-    Path.mkdir(Path.joinpath(DATA_DIR, "students"), exist_ok=True)
+    students_dir = Path(output_dir) if output_dir else Path.joinpath(DATA_DIR, "students")
+    Path.mkdir(students_dir, parents=True, exist_ok=True)
 
     # Читаем данные студентов/подчиненных
     lines = read_file(file_path)
@@ -238,12 +269,18 @@ def make_json_from_parsing(file_path: str, statuses_file: str):
     teachers = defaultdict(lambda: defaultdict(dict))
     groups = set()
 
-    # Разбираем данные
-    for line in lines:
-        # Разбиваем строку и сразу чистим
-        student_name, group, teacher_name = map(str.strip, line.split("\t"))
+    # Разбиваем строки и сразу чистим
+    records = [tuple(map(str.strip, line.split("\t"))) for line in lines]
+    pairs = [(teacher_name, student_name) for student_name, _, teacher_name in records]
+    if pool is None:
+        filenames = student_filenames(pairs)
+    else:
+        from src.status_control_bot.offload import chunked
+        filenames = [name for part in pool.run(student_filenames, chunked(pairs, 1000)) for name in part]
 
-        filename = create_student_filedata(teacher_name, student_name, statuses_dummy)
+    # Разбираем данные
+    for (student_name, group, teacher_name), filename in zip(records, filenames):
+        filename = create_student_filedata(teacher_name, student_name, statuses_dummy, students_dir, filename)
         if filename is None:
             print(f"Error during processing student {student_name}.")
             # raise ValueError
@@ -261,29 +298,50 @@ def make_json_from_parsing(file_path: str, statuses_file: str):
     teachers = {k: dict(v) for k, v in teachers.items()}
 
     final = {}
-    final["data_dir"] = "data/students"
+    final["data_dir"] = relative_to_base(students_dir)
     final["teachers"] = teachers
+    final["shared"] = {}
     final["statuses"] = statuses_dict
     final["groups"] = list(groups)
-    save_json("data/students/teachers.json", final)
+    save_json(Path.joinpath(students_dir, "teachers.json"), final)
+
+
+def relative_to_base(path) -> str:
+    """Путь относительно корня проекта (если он внутри проекта), иначе абсолютный."""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def student_filename(teacher_name: str, student_name: str) -> str:
+    t_name = convert_to_latin(clean_text(teacher_name), one_word=True)  # Транслитация имени преподавателя
+    s_name = convert_to_latin(clean_text(student_name), use_initials=True)  # Транслитация имени студента
+    return t_name + "__" + s_name + ".json"
+
+
+def student_filenames(pairs) -> list[str]:
+    """Имена файлов статусов для [(преподаватель, студент), ...] (задание пула процессов)."""
+    return [student_filename(teacher_name, student_name) for teacher_name, student_name in pairs]
 
 
-def create_student_filedata(teacher_name: str, student_name: str, statuses: dict) -> str:
+def create_student_filedata(teacher_name: str, student_name: str, statuses: dict, students_dir=None,
+                            filename: str = None) -> str:
     """Создание файла данных для студента
 
     Args:
         teacher_name (str): имя преподавателя.
         student_name (str): имя студента.
         statuses (dict): перечень статусов.
+        students_dir: каталог файлов статусов, по умолчанию data/students.
+        filename: готовое имя файла (иначе формируется транслитерацией имен).
 
     Returns:
         filename: при успешной записи данных json, возвращает относительное имя файла иначе None
     """
-
-    t_name = convert_to_latin(clean_text(teacher_name), one_word=True)  # Транслитация имени преподавателя
-    s_name = convert_to_latin(clean_text(student_name), use_initials=True)  # Транслитация имени студента
-    filename = t_name + "__" + s_name + ".json"
-    file_path = Path.joinpath(DATA_DIR, "students", filename)
+    filename = filename or student_filename(teacher_name, student_name)
+    file_path = Path.joinpath(Path(students_dir or Path.joinpath(DATA_DIR, "students")), filename)
     save_json(file_path, statuses)
     if Path.exists(file_path):
         return filename
@@ -361,6 +419,7 @@ def make_jsons_from_data():
     # Каталог где расположены данные
     final["data_dir"] = "data/students"
     final["teachers"] = teachers
+    final["shared"] = {}
     final["statuses"] = statuses
     final["groups"] = data.groups
     save_json(Path.joinpath(DATA_DIR, "students/teachers.json"), final)
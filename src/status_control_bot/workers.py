@@ -0,0 +1,203 @@
+import os
+import hmac
+import json
+import signal
+import asyncio
+import logging
+import zlib
+import multiprocessing
+from pathlib import Path
+from telegram import Bot, Update
+from telegram.error import TelegramError
+
+
+"""
+Запуск бота несколькими процессами-обработчиками с общим каталогом данных.
+Процесс-распределитель получает обновления (getUpdates или webhook) и передает каждое в очередь
+обработчика по хешу chat_id (без чата - id пользователя), поэтому диалог одного чата всегда
+обрабатывается одним процессом и его состояние (ConversationHandler, user_data) не расходится.
+Обработчики работают с данными через coordination.SharedStore (SHARED_STORE=1).
+
+Конфигурация читается при первом импорте config, поэтому модули бота импортируются обработчиком
+только после настройки его окружения (см. worker_env).
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def partition_key(update: Update) -> int:
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    user = update.effective_user
+    return user.id if user is not None else 0
+
+
+def worker_index(key: int, workers: int) -> int:
+    """Номер обработчика для ключа (crc32 не зависит от запуска, в отличие от hash)."""
+    return zlib.crc32(str(key).encode()) % workers
+
+
+def worker_env(index: int, workers: int) -> dict:
+    """
+    Окружение обработчика: общее хранилище, доля общего лимита отправки, напоминания, проверка
+    согласованности и уплотнение файлов статусов только в первом обработчике, свои файл лога и порт метрик.
+    """
+    from src.status_control_bot.config import SEND_RATE, LOG_FILE, METRICS_PORT
+
+    env = {"SHARED_STORE": "1", "SEND_RATE": str(SEND_RATE / workers)}
+    if index:
+        env["REMINDER_INTERVAL"] = "0"
+        env["CONSISTENCY_INTERVAL"] = "0"
+        env["STATUS_COMPACT_INTERVAL"] = "0"
+    if LOG_FILE:
+        path = Path(LOG_FILE)
+        env["LOG_FILE"] = str(path.with_name(f"{path.stem}.{index}{path.suffix}"))
+    if METRICS_PORT:
+        env["METRICS_PORT"] = str(METRICS_PORT + index)
+    return env
+
+
+# region Обработчик
+async def serve_updates(app, updates):
+    """Обработка обновлений из очереди распределителя (None - остановка)."""
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    try:
+        while True:
+            data = await asyncio.to_thread(updates.get)
+            if data is None:
+                break
+            await app.update_queue.put(Update.de_json(data, app.bot))
+    finally:
+        await app.stop()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+        await app.shutdown()
+
+
+def worker_main(index: int, env: dict, updates):
+    """Точка входа процесса-обработчика. Остановка - по None в очереди от распределителя."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.update(env)
+    from src.status_control_bot import az_bot
+
+    app = az_bot.create_bot_app(polling=False)
+    logger.info(f"Обработчик {index} запущен (pid {os.getpid()}).")
+    asyncio.run(serve_updates(app, updates))
+# endregion
+
+
+# region Распределитель
+class UpdateRouter:
+    """Передача обновлений в очереди обработчиков по ключу партиции."""
+
+    def __init__(self, queues):
+        self.queues = queues
+        self.counts = [0] * len(queues)
+
+    def route(self, update: Update) -> int:
+        index = worker_index(partition_key(update), len(self.queues))
+        self.queues[index].put(update.to_dict())
+        self.counts[index] += 1
+        return index
+
+
+async def poll_updates(bot: Bot, router: UpdateRouter, timeout: int = 30):
+    """Получение обновлений через getUpdates, завершается отменой задачи."""
+    await bot.delete_webhook()
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=Update.ALL_TYPES)
+        except TelegramError as e:
+            logger.warning(f"Ошибка получения обновлений: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            router.route(update)
+
+
+async def serve_webhook(bot: Bot, router: UpdateRouter, host: str, port: int, secret: str = ""):
+    """HTTP-сервер webhook: POST с обновлением, при заданном secret - проверка заголовка Telegram."""
+
+    async def handle(reader, writer):
+        try:
+            request = await reader.readline()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if secret and not hmac.compare_digest(headers.get("x-telegram-bot-api-secret-token", ""), secret):
+                status = "403 Forbidden"
+            elif request.split(b" ")[:1] != [b"POST"]:
+                status = "405 Method Not Allowed"
+            else:
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                router.route(Update.de_json(json.loads(body), bot))
+                status = "200 OK"
+        except (ValueError, asyncio.IncompleteReadError):
+            status = "400 Bad Request"
+        try:
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Webhook принимает обновления на порту {port}.")
+    async with server:
+        await server.serve_forever()
+
+
+async def run_front(router: UpdateRouter):
+    from src.status_control_bot.config import API_BOT_TOKEN, WEBHOOK_PORT, WEBHOOK_URL, WEBHOOK_SECRET
+
+    async with Bot(API_BOT_TOKEN) as bot:
+        if WEBHOOK_PORT:
+            await bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None,
+                                  allowed_updates=Update.ALL_TYPES)
+            await serve_webhook(bot, router, "0.0.0.0", WEBHOOK_PORT, WEBHOOK_SECRET)
+        else:
+            await poll_updates(bot, router)
+
+
+def start_workers(workers: int, target=worker_main) -> tuple[list, list]:
+    """Запуск процессов-обработчиков. Возвращает (процессы, очереди)."""
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue() for _ in range(workers)]
+    processes = [ctx.Process(target=target, args=(index, worker_env(index, workers), queues[index]),
+                             name=f"bot-worker-{index}") for index in range(workers)]
+    for process in processes:
+        process.start()
+    return processes, queues
+
+
+def stop_workers(processes, queues, timeout: float = 30.0):
+    for updates in queues:
+        updates.put(None)
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning(f"Обработчик {process.name} не завершился, процесс остановлен принудительно.")
+            process.terminate()
+
+
+def run_workers(workers: int):
+    """Запуск бота: распределитель в текущем процессе и workers процессов-обработчиков."""
+    from src.status_control_bot.config import LOG_LEVEL, LOG_FILE, LOG_JSON
+    from src.status_control_bot.log_setup import setup_logging
+
+    setup_logging(level=LOG_LEVEL, log_file=LOG_FILE, json_format=LOG_JSON)
+    processes, queues = start_workers(workers)
+    print(f"Запуск бота: {workers} обработчиков")
+    try:
+        asyncio.run(run_front(UpdateRouter(queues)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(processes, queues)
+# endregion
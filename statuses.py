@@ -0,0 +1,69 @@
+import sys
+import argparse
+from src.status_control_bot.az_teacher_data_handler import TeacherDataHandler
+from src.status_control_bot.schema_evolution import schema_state, compact
+from src.status_control_bot.status_types import TYPES, StatusType
+from src.status_control_bot.config import TEACHERS_FILE
+
+
+"""
+Изменение перечня статусов (файлы статусов студентов приводятся к перечню при чтении и записи,
+либо уплотнением).
+
+    python statuses.py list
+    python statuses.py add plag_date "Дата прохождения проверки на плагиат" --type date
+    python statuses.py type stage enum --option draft=Черновик --option final=Окончательный
+    python statuses.py drop ready_0105
+    python statuses.py compact
+"""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Перечень статусов")
+    parser.add_argument("--teachers-file", default=TEACHERS_FILE, help="файл teachers.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="статусы и версия перечня")
+    add = commands.add_parser("add", help="добавить статус")
+    add.add_argument("key")
+    add.add_argument("title")
+    add.add_argument("--type", choices=TYPES, help="тип статуса (по умолчанию - по названию)")
+    add.add_argument("--option", action="append", default=[], help="вариант enum: код=название")
+    kind = commands.add_parser("type", help="назначить тип статуса")
+    kind.add_argument("key")
+    kind.add_argument("type", choices=TYPES)
+    kind.add_argument("--option", action="append", default=[], help="вариант enum: код=название")
+    drop = commands.add_parser("drop", help="удалить статус")
+    drop.add_argument("key")
+    commands.add_parser("compact", help="перезаписать файлы, не соответствующие перечню")
+    args = parser.parse_args(argv)
+
+    handler = TeacherDataHandler(args.teachers_file)
+    options = dict(item.partition("=")[::2] for item in getattr(args, "option", []))
+    if args.command == "add":
+        try:
+            status_type = StatusType(args.type, options) if args.type else None
+        except ValueError as e:
+            print(f"Некорректный тип статуса: {e}.")
+            return 1
+        if not handler.add_status(args.key, args.title, status_type):
+            return 1
+    elif args.command == "type":
+        if not handler.set_status_type(args.key, args.type, options):
+            return 1
+    elif args.command == "drop":
+        if args.key not in handler.get_statuses():
+            print(f"Статус '{args.key}' не найден.")
+            return 1
+        handler.delete_statuses(args.key)
+    elif args.command == "compact":
+        print(f"Перезаписано файлов: {compact(handler)}")
+
+    state = schema_state(handler.data)
+    types = handler.get_status_types()
+    for key, title in handler.get_statuses().items():
+        print(f"{key}: {title} [{types[key].kind}]")
+    print(f"Версия перечня: {state['version']}, файлы уплотнены до версии {state['compacted']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())